@@ -0,0 +1,56 @@
+import argparse  
+import random  
+import time  
+from pydantic import ValidationError  
+from .schemas import CredentialAttributes, validate_attributes_batch  
+  
+def make_rows(count, invalid_ratio=0.05, seed=0):  
+    """Synthetic attribute rows, about invalid_ratio of them invalid."""  
+    rng = random.Random(seed)  
+    rows = []  
+    for i in range(count):  
+        row = {"person_hash": f"person-hash-{i:08d}", "biometric_score": f"{rng.uniform(0, 100):.1f}",  
+               "controller_did": f"did:sov:bot{i}"}  
+        if rng.random() < invalid_ratio:  
+            row[rng.choice(["person_hash", "biometric_score", "controller_did"])] = "bad"  
+        rows.append(row)  
+    return rows  
+  
+def per_object(rows):  
+    valid, errors = [], []  
+    for index, row in enumerate(rows):  
+        try:  
+            valid.append((index, CredentialAttributes(**row)))  
+        except ValidationError as e:  
+            errors.append((index, str(e)))  
+    return valid, errors  
+  
+def measure(func, rows, repeat):  
+    """Best records/s over `repeat` runs, and the result of the last one."""  
+    best = float("inf")  
+    for _ in range(repeat):  
+        started = time.perf_counter()  
+        result = func(rows)  
+        best = min(best, time.perf_counter() - started)  
+    return len(rows) / best, result  
+  
+def main(argv=None):  
+    parser = argparse.ArgumentParser(description="Compare per-object and batch CredentialAttributes validation.")  
+    parser.add_argument("--records", type=int, default=100000)  
+    parser.add_argument("--invalid-ratio", type=float, default=0.05)  
+    parser.add_argument("--repeat", type=int, default=3)  
+    args = parser.parse_args(argv)  
+  
+    rows = make_rows(args.records, args.invalid_ratio)  
+    print(f"### VALIDATING {len(rows)} RECORDS ({args.invalid_ratio:.0%} invalid) ###")  
+    baseline, expected = measure(per_object, rows, args.repeat)  
+    batch, result = measure(validate_attributes_batch, rows, args.repeat)  
+    same = [i for i, _ in result[0]] == [i for i, _ in expected[0]] and result[1] == expected[1]  
+    print(f"   per-object: {baseline:>12,.0f} records/s")  
+    print(f"   batch:      {batch:>12,.0f} records/s ({batch / baseline:.1f}x)")  
+    print(f"   {'✅' if same else '❌'} {len(result[0])} valid, {len(result[1])} invalid "  
+          f"{'(same as per-object)' if same else '(DIFFERS from per-object)'}")  
+    return 0 if same else 1  
+  
+if __name__ == "__main__":  
+    raise SystemExit(main())
\ No newline at end of file
@@ -0,0 +1,155 @@
+import argparse  
+import asyncio  
+import csv  
+import time  
+from .config import ISSUER_URL, HOLDER_URL, USE_WEBHOOKS, BULK_CONCURRENCY  
+from .client import get_async_client, run_async  
+from .utils import load_state  
+from .schemas import CredentialAttributes, validate_attributes_batch  
+from .issue_cred import issue_credential  
+from .webhooks import webhook_events  
+from .registry_rotation import RegistryRotator  
+  
+async def issue_bulk(items, cred_def_id, concurrency=BULK_CONCURRENCY, issuer=None, holder=None, bus=None,  
+                     on_result=None, rotator=None):  
+    """Issue one credential per (conn_id, CredentialAttributes) item, many at once.  
+  
+    At most `concurrency` exchanges are in flight; items are pulled lazily from  
+    the iterable. Returns (results, summary): one result dict per item, in input  
+    order, with "ok" and either "result" or "error"; the summary has totals,  
+    elapsed seconds and throughput in credentials/s. on_result, if given, is  
+    called with each result as it completes. With a RegistryRotator, every  
+    offer reserves a registry slot first.  
+    """  
+    issuer = issuer or get_async_client(ISSUER_URL)  
+    holder = holder or get_async_client(HOLDER_URL)  
+    pending = enumerate(items)  
+    results = []  
+  
+    async def worker():  
+        for index, (conn_id, attributes) in pending:  
+            item = {"index": index, "conn_id": conn_id}  
+            try:  
+                if rotator is not None:  
+                    await rotator.reserve()  
+                try:  
+                    item["result"] = await issue_credential(conn_id, cred_def_id, attributes,  
+                                                            issuer=issuer, holder=holder, bus=bus)  
+                finally:  
+                    if rotator is not None:  
+                        rotator.release()  
+                item["ok"] = True  
+            except Exception as e:  
+                item["error"] = str(e) or type(e).__name__  
+                item["ok"] = False  
+            results.append(item)  
+            if on_result:  
+                on_result(item)  
+  
+    started = time.monotonic()  
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))  
+    elapsed = time.monotonic() - started  
+  
+    results.sort(key=lambda item: item["index"])  
+    succeeded = sum(1 for item in results if item["ok"])  
+    summary = {  
+        "total": len(results),  
+        "succeeded": succeeded,  
+        "failed": len(results) - succeeded,  
+        "elapsed": round(elapsed, 3),  
+        "throughput": round(succeeded / elapsed, 2) if elapsed > 0 else 0.0  
+    }  
+    return results, summary  
+  
+def _read_rows(path):  
+    """(lines, conn_ids, rows, invalid) of a CSV batch; rows without connection_id are invalid."""  
+    lines, conn_ids, rows, invalid = [], [], [], []  
+    with open(path, newline='') as f:  
+        for line, row in enumerate(csv.DictReader(f), start=2):  
+            conn_id = row.pop("connection_id", None)  
+            if not conn_id:  
+                invalid.append((line, "missing connection_id"))  
+                continue  
+            lines.append(line)  
+            conn_ids.append(conn_id)  
+            rows.append({k: v for k, v in row.items() if v})  
+    return lines, conn_ids, rows, invalid  
+  
+def read_batch(path):  
+    """Read a CSV batch (connection_id, person_hash, biometric_score, controller_did).  
+  
+    Returns (items, invalid): valid (conn_id, CredentialAttributes) pairs and  
+    (line, error) for rows that fail validation. The batch is validated at  
+    once (see schemas.validate_attributes_batch); valid rows are wrapped with  
+    model_construct, so only the invalid ones are validated per row, for  
+    their error message.  
+    """  
+    lines, conn_ids, rows, invalid = _read_rows(path)  
+    valid, errors = validate_attributes_batch(rows)  
+    items = [(conn_ids[index], CredentialAttributes.model_construct(**row)) for index, row in valid]  
+    invalid = sorted(invalid + [(lines[index], error) for index, error in errors])  
+    return items, invalid  
+  
+def check_batch(path):  
+    """Validate a CSV batch without issuing anything.  
+  
+    Returns (valid, invalid): the number of valid rows and (line, error) for  
+    the others.  
+    """  
+    lines, _, rows, invalid = _read_rows(path)  
+    valid, errors = validate_attributes_batch(rows)  
+    invalid = sorted(invalid + [(lines[index], error) for index, error in errors])  
+    return len(valid), invalid  
+  
+def main(argv=None):  
+    parser = argparse.ArgumentParser(description="Issue personhood credentials in bulk.")  
+    parser.add_argument("batch", help="CSV with connection_id, person_hash, biometric_score, controller_did")  
+    parser.add_argument("--concurrency", type=int, default=BULK_CONCURRENCY,  
+                        help=f"exchanges in flight (default {BULK_CONCURRENCY})")  
+    parser.add_argument("--rotate-registries", action="store_true",  
+                        help="provision the next revocation registry before the active one fills up")  
+    parser.add_argument("--check", action="store_true", help="only validate the batch, issue nothing")  
+    args = parser.parse_args(argv)  
+  
+    print("### BULK ISSUANCE ###")  
+  
+    if args.check:  
+        valid, invalid = check_batch(args.batch)  
+        for line, error in invalid:  
+            print(f"   ⚠️ Line {line}: {error}")  
+        print(f"\n   SUMMARY: {valid} valid, {len(invalid)} invalid")  
+        return {"valid": valid, "invalid": len(invalid)}  
+  
+    cred_def_id = load_state().get("cred_def_id")  
+    if not cred_def_id:  
+        print("❌ Error: 'cred_def_id' not found.")  
+        return  
+  
+    items, invalid = read_batch(args.batch)  
+    for line, error in invalid:  
+        print(f"   ⚠️ Line {line} skipped: {error}")  
+    print(f"   {len(items)} credential(s) to issue, concurrency {args.concurrency}...")  
+  
+    async def run():  
+        rotator = await RegistryRotator(cred_def_id).start() if args.rotate_registries else None  
+        if not USE_WEBHOOKS:  
+            # Without events, every issued credential took a slot of the active registry  
+            on_result = (lambda item: item["ok"] and rotator.record_issued()) if rotator else None  
+            return await issue_bulk(items, cred_def_id, args.concurrency, on_result=on_result, rotator=rotator)  
+        async with webhook_events() as bus:  
+            if rotator:  
+                rotator.attach(bus)  
+            return await issue_bulk(items, cred_def_id, args.concurrency, bus=bus, rotator=rotator)  
+  
+    results, summary = run_async(run())  
+  
+    for item in results:  
+        if not item["ok"]:  
+            print(f"   ❌ #{item['index']} ({item['conn_id']}): {item['error']}")  
+  
+    print(f"\n   SUMMARY: {summary['succeeded']}/{summary['total']} issued, {summary['failed']} failed, "  
+          f"{len(invalid)} invalid in {summary['elapsed']}s ({summary['throughput']} credentials/s)")  
+    return summary  
+  
+if __name__ == "__main__":  
+    main()
\ No newline at end of file
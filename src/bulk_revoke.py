@@ -0,0 +1,185 @@
+import argparse  
+import asyncio  
+import csv  
+import requests  
+from collections import defaultdict  
+from .config import (ISSUER_URL, REVOCATION_CONCURRENCY, REVOCATION_BATCH_SIZE, REVOCATION_BATCH_WINDOW,  
+                     REVOCATION_RETRY_MAX_DELAY)  
+from .client import get_async_client, run_async  
+from .revoke_cred import revoke_response  
+from .state_store import DEFAULT_NAMESPACE  
+from .utils import find_credential_records, save_credential_record  
+  
+async def mark_revoked(issuer, rev_reg_id, cred_rev_id):  
+    """Revoke a credential without publishing it (it stays pending on the Issuer)."""  
+    resp = await revoke_response(rev_reg_id, cred_rev_id, publish=False, issuer=issuer)  
+    if resp.status_code != 200:  
+        raise requests.HTTPError(f"Status: {resp.status_code}, Response: {resp.text}", response=resp)  
+  
+async def publish_registry(issuer, rev_reg_id, cred_rev_ids):  
+    """Publish the pending revocations of one registry in a single ledger write."""  
+    resp = await issuer.publish_revocations({rev_reg_id: list(cred_rev_ids)})  
+    if resp.status_code != 200:  
+        raise requests.HTTPError(f"Status: {resp.status_code}, Response: {resp.text}", response=resp)  
+  
+def record_revoked(rev_reg_id, cred_rev_ids, namespace=DEFAULT_NAMESPACE):  
+    """Mark the state store's credential records of published revocations revoked."""  
+    for cred_rev_id in cred_rev_ids:  
+        for record in find_credential_records(namespace, rev_reg_id=rev_reg_id, cred_rev_id=cred_rev_id):  
+            save_credential_record({"cred_ex_id": record["cred_ex_id"], "state": "revoked"}, namespace)  
+  
+async def publish_pending(issuer, pending, namespace=DEFAULT_NAMESPACE):  
+    """Publish {rev_reg_id: [cred_rev_id]} concurrently; return {rev_reg_id: error} for failures.  
+  
+    The credential records of every published registry are marked revoked.  
+    """  
+    registries = list(pending)  
+    outcomes = await asyncio.gather(*(publish_registry(issuer, rr, pending[rr]) for rr in registries),  
+                                    return_exceptions=True)  
+    errors = {rr: str(outcome) for rr, outcome in zip(registries, outcomes) if isinstance(outcome, Exception)}  
+    for rev_reg_id in registries:  
+        if rev_reg_id not in errors:  
+            record_revoked(rev_reg_id, pending[rev_reg_id], namespace)  
+    return errors  
+  
+async def revoke_bulk(pairs, issuer=None, concurrency=REVOCATION_CONCURRENCY, namespace=DEFAULT_NAMESPACE):  
+    """Revoke many (rev_reg_id, cred_rev_id) pairs with one publication per registry.  
+  
+    Every pair is first marked revoked with publish=False (at most `concurrency`  
+    at once), then each registry is published once and its credential records  
+    in `namespace` are marked revoked. Returns a summary with the revoked  
+    count, failed pairs, per-registry publish errors and ledger writes.  
+    """  
+    issuer = issuer or get_async_client(ISSUER_URL)  
+    semaphore = asyncio.Semaphore(concurrency)  
+    pending = defaultdict(list)  
+    failed = []  
+  
+    async def mark(rev_reg_id, cred_rev_id):  
+        async with semaphore:  
+            try:  
+                await mark_revoked(issuer, rev_reg_id, cred_rev_id)  
+                pending[rev_reg_id].append(cred_rev_id)  
+            except Exception as e:  
+                failed.append(((rev_reg_id, cred_rev_id), str(e)))  
+  
+    await asyncio.gather(*(mark(rr, cr) for rr, cr in pairs))  
+    publish_errors = await publish_pending(issuer, pending, namespace)  
+  
+    return {  
+        "revoked": sum(len(ids) for ids in pending.values()),  
+        "failed": failed,  
+        "registries": len(pending),  
+        "publish_errors": publish_errors,  
+        "ledger_writes": len(pending) - len(publish_errors)  
+    }  
+  
+class RevocationBatcher:  
+    """Coalesces streaming revocations into one publication per registry per window.  
+  
+    add() marks a revocation pending right away; pending revocations are  
+    published when max_batch of them accumulate or `window` seconds after the  
+    first one, whichever comes first. Registries whose publication fails are  
+    kept pending and retried after window * 2**n seconds (n consecutive failed  
+    flushes, capped at max_retry_delay); `errors` holds their latest error.  
+    """  
+  
+    def __init__(self, issuer=None, max_batch=REVOCATION_BATCH_SIZE, window=REVOCATION_BATCH_WINDOW,  
+                 max_retry_delay=REVOCATION_RETRY_MAX_DELAY):  
+        self.issuer = issuer  
+        self.max_batch = max_batch  
+        self.window = window  
+        self.max_retry_delay = max_retry_delay  
+        self.ledger_writes = 0  
+        self.errors = {}  
+        self._failures = 0  
+        self._pending = defaultdict(list)  
+        self._count = 0  
+        self._timer = None  
+  
+    async def add(self, rev_reg_id, cred_rev_id):  
+        self.issuer = self.issuer or get_async_client(ISSUER_URL)  
+        await mark_revoked(self.issuer, rev_reg_id, cred_rev_id)  
+        self._pending[rev_reg_id].append(cred_rev_id)  
+        self._count += 1  
+  
+        if self._count >= self.max_batch:  
+            await self.flush()  
+        elif self._timer is None:  
+            self._timer = asyncio.create_task(self._flush_later(self.window))  
+  
+    async def _flush_later(self, delay):  
+        await asyncio.sleep(delay)  
+        self._timer = None  
+        await self.flush()  
+  
+    async def flush(self):  
+        """Publish everything pending now; return {rev_reg_id: error} for failures."""  
+        if self._timer is not None and self._timer is not asyncio.current_task():  
+            self._timer.cancel()  
+            self._timer = None  
+        if not self._pending:  
+            return {}  
+  
+        pending, self._pending, self._count = self._pending, defaultdict(list), 0  
+        errors = await publish_pending(self.issuer, pending)  
+        self.ledger_writes += len(pending) - len(errors)  
+        for rev_reg_id in pending:  
+            self.errors.pop(rev_reg_id, None)  
+        self.errors.update(errors)  
+        for rev_reg_id in errors:  
+            self._pending[rev_reg_id].extend(pending[rev_reg_id])  
+            self._count += len(pending[rev_reg_id])  
+  
+        if not errors:  
+            self._failures = 0  
+        else:  
+            self._failures += 1  
+            if self._timer is None:  
+                delay = min(self.window * 2 ** self._failures, self.max_retry_delay)  
+                self._timer = asyncio.create_task(self._flush_later(delay))  
+        return errors  
+  
+    async def close(self):  
+        """Flush one last time without scheduling retries; return {rev_reg_id: error} for failures."""  
+        errors = await self.flush()  
+        if self._timer is not None:  
+            self._timer.cancel()  
+            self._timer = None  
+        return errors  
+  
+    async def __aenter__(self):  
+        return self  
+  
+    async def __aexit__(self, *exc):  
+        await self.close()  
+  
+def read_pairs(path):  
+    """Read (rev_reg_id, cred_rev_id) pairs from a CSV with those columns."""  
+    with open(path, newline='') as f:  
+        return [(row["rev_reg_id"], row["cred_rev_id"]) for row in csv.DictReader(f)]  
+  
+def main(argv=None):  
+    parser = argparse.ArgumentParser(description="Revoke credentials in bulk, publishing once per registry.")  
+    parser.add_argument("batch", help="CSV with rev_reg_id, cred_rev_id")  
+    parser.add_argument("--concurrency", type=int, default=REVOCATION_CONCURRENCY,  
+                        help=f"revocations marked at once (default {REVOCATION_CONCURRENCY})")  
+    args = parser.parse_args(argv)  
+  
+    print("### BULK REVOCATION ###")  
+  
+    pairs = read_pairs(args.batch)  
+    print(f"   {len(pairs)} credential(s) to revoke...")  
+    summary = run_async(revoke_bulk(pairs, concurrency=args.concurrency))  
+  
+    for (rev_reg_id, cred_rev_id), error in summary["failed"]:  
+        print(f"   ❌ {rev_reg_id} / {cred_rev_id}: {error}")  
+    for rev_reg_id, error in summary["publish_errors"].items():  
+        print(f"   ❌ Publication failed for {rev_reg_id}: {error}")  
+  
+    print(f"\n   SUMMARY: {summary['revoked']} revoked, {len(summary['failed'])} failed, "  
+          f"{summary['ledger_writes']} ledger write(s) for {summary['registries']} registries")  
+    return summary  
+  
+if __name__ == "__main__":  
+    main()
\ No newline at end of file
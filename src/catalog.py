@@ -0,0 +1,137 @@
+import argparse  
+import asyncio  
+import json  
+import time  
+from pydantic import ValidationError  
+from .config import AGENT_URLS, CATALOG_CONCURRENCY  
+from .client import get_client, run_async  
+from .schemas import CredentialCatalog  
+from .state_store import namespace_for  
+from .utils import save_states  
+from .issuer_setup import get_issuer_did, find_schema, find_cred_def, ensure_schema, ensure_cred_def  
+  
+def load_catalog(path):  
+    """Read and validate a catalog file (see catalog.json)."""  
+    with open(path, 'r') as f:  
+        return CredentialCatalog(**json.load(f))  
+  
+def agent_url(issuer):  
+    """Admin URL of a catalog issuer: an AGENT_URLS name or a URL."""  
+    return AGENT_URLS.get(issuer, issuer)  
+  
+async def apply_catalog(catalog, dry_run=False, concurrency=CATALOG_CONCURRENCY, clients=None):  
+    """Diff the catalog against the issuers' ledger artifacts and create what is missing.  
+  
+    Schemas are handled concurrently and each credential definition starts  
+    as soon as its schema exists, so slow tails generations overlap; at most  
+    `concurrency` agent operations run at once. With dry_run nothing is  
+    created. Returns one result per artifact with kind, issuer, key, id and  
+    status ("exists", "created", "missing" or "error" with the error).  
+    """  
+    clients = clients or {}  
+    semaphore = asyncio.Semaphore(max(1, concurrency))  
+    results = []  
+    dids = {}  
+  
+    async def call(func, *args, **kwargs):  
+        # The setup engine is sync: run each step in a worker thread  
+        async with semaphore:  
+            return await asyncio.to_thread(func, *args, **kwargs)  
+  
+    def client_for(issuer):  
+        return clients.get(issuer) or get_client(agent_url(issuer))  
+  
+    async def issuer_did(issuer):  
+        if issuer not in dids:  
+            dids[issuer] = asyncio.ensure_future(call(get_issuer_did, client_for(issuer)))  
+        return await dids[issuer]  
+  
+    def record(kind, issuer, key, artifact_id=None, status=None, error=None):  
+        item = {"kind": kind, "issuer": issuer, "key": key, "id": artifact_id, "status": status}  
+        if error is not None:  
+            item["status"], item["error"] = "error", str(error) or type(error).__name__  
+        results.append(item)  
+        return item  
+  
+    async def apply_schema(spec):  
+        issuer, key = spec.issuer, f"{spec.name}:{spec.version}"  
+        client = client_for(issuer)  
+        try:  
+            did = await issuer_did(issuer)  
+            if dry_run:  
+                schema_id = await call(find_schema, client, did, spec.name, spec.version)  
+                record("schema", issuer, key, schema_id, "exists" if schema_id else "missing")  
+            else:  
+                schema_id, created = await call(ensure_schema, client, did, spec.name, spec.version, spec.attributes)  
+                record("schema", issuer, key, schema_id, "created" if created else "exists")  
+        except Exception as e:  
+            record("schema", issuer, key, error=e)  
+            for cred in spec.cred_defs:  
+                record("cred_def", issuer, f"{key}:{cred.tag}", error=f"schema {key} unavailable")  
+            return  
+  
+        async def apply_cred_def(cred):  
+            cred_key = f"{key}:{cred.tag}"  
+            try:  
+                if schema_id is None:  
+                    record("cred_def", issuer, cred_key, None, "missing")  
+                elif dry_run:  
+                    cred_def_id = await call(find_cred_def, client, did, schema_id, cred.tag)  
+                    record("cred_def", issuer, cred_key, cred_def_id, "exists" if cred_def_id else "missing")  
+                else:  
+                    cred_def_id, created = await call(ensure_cred_def, client, did, schema_id, cred.tag,  
+                                                      cred.revocation_registry_size, cred.support_revocation)  
+                    record("cred_def", issuer, cred_key, cred_def_id, "created" if created else "exists")  
+            except Exception as e:  
+                record("cred_def", issuer, cred_key, error=e)  
+  
+        await asyncio.gather(*(apply_cred_def(cred) for cred in spec.cred_defs))  
+  
+    await asyncio.gather(*(apply_schema(spec) for spec in catalog.schemas))  
+    results.sort(key=lambda item: (item["issuer"], item["key"], item["kind"] != "schema"))  
+    return results  
+  
+def save_catalog_state(results):  
+    """Keep the ids of existing/created artifacts in each issuer's state namespace."""  
+    by_issuer = {}  
+    for item in results:  
+        if item["id"]:  
+            by_issuer.setdefault(item["issuer"], {})[f"{item['kind']}:{item['key']}"] = item["id"]  
+    for issuer, values in by_issuer.items():  
+        save_states(values, namespace=namespace_for(issuer))  
+  
+def main(argv=None):  
+    parser = argparse.ArgumentParser(description="Manage the issuers' schemas and credential definitions.")  
+    commands = parser.add_subparsers(dest="command", required=True)  
+    apply = commands.add_parser("apply", help="create every artifact of the catalog that is missing")  
+    apply.add_argument("catalog", help="catalog JSON file (see catalog.json)")  
+    apply.add_argument("--dry-run", action="store_true", help="only show what is missing")  
+    apply.add_argument("--concurrency", type=int, default=CATALOG_CONCURRENCY,  
+                       help=f"agent operations at once (default {CATALOG_CONCURRENCY})")  
+    args = parser.parse_args(argv)  
+  
+    print("### CREDENTIAL CATALOG ###")  
+    try:  
+        catalog = load_catalog(args.catalog)  
+    except (OSError, ValueError, ValidationError) as e:  
+        print(f"❌ Invalid catalog: {e}")  
+        return 1  
+  
+    started = time.monotonic()  
+    results = run_async(apply_catalog(catalog, dry_run=args.dry_run, concurrency=args.concurrency))  
+    elapsed = time.monotonic() - started  
+  
+    icons = {"exists": "✅", "created": "🆕", "missing": "➕", "error": "❌"}  
+    for item in results:  
+        print(f"   {icons[item['status']]} {item['kind']:<8} {item['issuer']}:{item['key']} "  
+              f"{item['id'] or item.get('error', '')}")  
+    if not args.dry_run:  
+        save_catalog_state(results)  
+  
+    counts = {status: sum(1 for item in results if item["status"] == status) for status in icons}  
+    print(f"\n   SUMMARY: {counts['exists']} existing, {counts['created']} created, "  
+          f"{counts['missing']} missing, {counts['error']} failed in {elapsed:.1f}s")  
+    return 1 if counts["error"] else 0  
+  
+if __name__ == "__main__":  
+    raise SystemExit(main())
\ No newline at end of file
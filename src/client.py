@@ -0,0 +1,282 @@
+import asyncio  
+import threading  
+import weakref  
+import httpx  
+import requests  
+from requests.adapters import HTTPAdapter  
+from .config import HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_LONG_READ_TIMEOUT  
+from .retry import within_deadline  
+from .flow_control import AgentLimiter, get_agent_limiter  
+from . import codec  
+  
+JSON_HEADERS = {"Content-Type": "application/json"}  
+  
+def sampled(timeout):  
+    """Whether a call's latency feeds the adaptive limit: not for the long create/upload calls."""  
+    return timeout != HTTP_LONG_READ_TIMEOUT  
+  
+def encode_body(payload):  
+    """(body, headers) for a JSON payload, encoded with the fast codec; (None, None) without one."""  
+    if payload is None:  
+        return None, None  
+    return codec.dumps(payload), JSON_HEADERS  
+  
+class AdminEndpoints:  
+    """Typed helpers for the ACA-Py admin endpoints used by the scripts.  
+  
+    Each helper returns whatever the transport's get/post returns: a response for  
+    AgentClient, an awaitable response for AsyncAgentClient.  
+    """  
+  
+    # Connections / out-of-band  
+    def get_connections(self, **params):  
+        return self.get("/connections", params=params)  
+  
+    def get_connection(self, conn_id: str):  
+        return self.get(f"/connections/{conn_id}")  
+  
+    def create_invitation(self, payload: dict, multi_use: bool = False):  
+        params = {"multi_use": "true"} if multi_use else None  
+        return self.post("/out-of-band/create-invitation", json=payload, params=params)  
+  
+    def receive_invitation(self, invitation: dict, alias: str = None):  
+        params = {"alias": alias} if alias else None  
+        return self.post("/out-of-band/receive-invitation", json=invitation, params=params)  
+  
+    # Wallet / AnonCreds ledger artifacts  
+    def get_public_did(self):  
+        return self.get("/wallet/did/public")  
+  
+    def create_schema(self, payload: dict):  
+        return self.post("/anoncreds/schema", json=payload)  
+  
+    def get_schemas(self, **params):  
+        return self.get("/anoncreds/schemas", params=params)  
+  
+    def create_cred_def(self, payload: dict):  
+        return self.post("/anoncreds/credential-definition", json=payload,  
+                         timeout=HTTP_LONG_READ_TIMEOUT)  
+  
+    def get_cred_defs(self, **params):  
+        return self.get("/anoncreds/credential-definitions", params=params)  
+  
+    # Issue credential 2.0  
+    def send_offer(self, payload: dict):  
+        return self.post("/issue-credential-2.0/send-offer", json=payload)  
+  
+    def get_cred_ex_records(self, **params):  
+        return self.get("/issue-credential-2.0/records", params=params)  
+  
+    def get_cred_ex_record(self, cred_ex_id: str):  
+        return self.get(f"/issue-credential-2.0/records/{cred_ex_id}")  
+  
+    def send_request(self, cred_ex_id: str):  
+        return self.post(f"/issue-credential-2.0/records/{cred_ex_id}/send-request")  
+  
+    def issue_credential(self, cred_ex_id: str, comment: str = None):  
+        payload = {"comment": comment} if comment else {}  
+        return self.post(f"/issue-credential-2.0/records/{cred_ex_id}/issue", json=payload)  
+  
+    def store_credential(self, cred_ex_id: str, credential_id: str = None):  
+        payload = {"credential_id": credential_id} if credential_id else {}  
+        return self.post(f"/issue-credential-2.0/records/{cred_ex_id}/store", json=payload)  
+  
+    def get_credentials(self, **params):  
+        return self.get("/credentials", params=params)  
+  
+    # Present proof 2.0  
+    def send_proof_request(self, payload: dict):  
+        return self.post("/present-proof-2.0/send-request", json=payload)  
+  
+    def get_pres_ex_record(self, pres_ex_id: str):  
+        return self.get(f"/present-proof-2.0/records/{pres_ex_id}")  
+  
+    def verify_presentation(self, pres_ex_id: str):  
+        return self.post(f"/present-proof-2.0/records/{pres_ex_id}/verify-presentation")  
+  
+    # Revocation  
+    def revoke(self, payload: dict):  
+        return self.post("/anoncreds/revocation/revoke", json=payload)  
+  
+    def publish_revocations(self, rrid2crid: dict):  
+        return self.post("/anoncreds/revocation/publish-revocations", json={"rrid2crid": rrid2crid})  
+  
+    # Revocation registries  
+    def get_active_registry(self, cred_def_id: str):  
+        return self.get(f"/anoncreds/revocation/active-registry/{cred_def_id}")  
+  
+    def get_registries(self, **params):  
+        return self.get("/anoncreds/revocation/registries", params=params)  
+  
+    def get_registry(self, rev_reg_id: str):  
+        return self.get(f"/anoncreds/revocation/registry/{rev_reg_id}")  
+  
+    def get_issued_count(self, rev_reg_id: str):  
+        return self.get(f"/anoncreds/revocation/registry/{rev_reg_id}/issued")  
+  
+    def get_issued_details(self, rev_reg_id: str):  
+        return self.get(f"/anoncreds/revocation/registry/{rev_reg_id}/issued/details")  
+  
+    def create_rev_reg_def(self, payload: dict):  
+        return self.post("/anoncreds/revocation-registry-definition", json=payload,  
+                         timeout=HTTP_LONG_READ_TIMEOUT)  
+  
+    def upload_tails(self, rev_reg_id: str):  
+        return self.put(f"/anoncreds/registry/{rev_reg_id}/tails-file", timeout=HTTP_LONG_READ_TIMEOUT)  
+  
+    def create_rev_list(self, rev_reg_id: str):  
+        return self.post("/anoncreds/revocation-list", json={"rev_reg_def_id": rev_reg_id},  
+                         timeout=HTTP_LONG_READ_TIMEOUT)  
+  
+    def set_active_registry(self, rev_reg_id: str):  
+        return self.put(f"/anoncreds/registry/{rev_reg_id}/active")  
+  
+class AgentClient(AdminEndpoints):  
+    """Pooled, keep-alive client for one ACA-Py admin API.  
+  
+    Calls go through the agent's shared AgentLimiter (rate limit and adaptive  
+    concurrency limit).  
+    """  
+  
+    def __init__(self, base_url: str, pool_size: int = HTTP_POOL_SIZE,  
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,  
+                 read_timeout: float = HTTP_READ_TIMEOUT,  
+                 limiter: AgentLimiter = None):  
+        self.base_url = base_url.rstrip("/")  
+        self.limiter = limiter or get_agent_limiter(self.base_url)  
+        self.timeout = (connect_timeout, read_timeout)  
+        self.session = requests.Session()  
+        self.session.headers.update({"Connection": "keep-alive"})  
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)  
+        self.session.mount("http://", adapter)  
+        self.session.mount("https://", adapter)  
+  
+    def _timeout(self, timeout):  
+        if timeout is None:  
+            timeout = self.timeout  
+        elif not isinstance(timeout, tuple):  
+            timeout = (self.timeout[0], timeout)  
+        # Never wait past the caller's deadline (see retry.deadline)  
+        return within_deadline(*timeout)  
+  
+    def get(self, path: str, params: dict = None, timeout=None) -> requests.Response:  
+        with self.limiter.slot(sampled(timeout)) as call:  
+            return call.done(self.session.get(f"{self.base_url}{path}", params=params,  
+                                              timeout=self._timeout(timeout)))  
+  
+    def post(self, path: str, json: dict = None, params: dict = None, timeout=None) -> requests.Response:  
+        with self.limiter.slot(sampled(timeout)) as call:  
+            body, headers = encode_body(json)  
+            return call.done(self.session.post(f"{self.base_url}{path}", data=body, headers=headers,  
+                                               params=params, timeout=self._timeout(timeout)))  
+  
+    def put(self, path: str, json: dict = None, params: dict = None, timeout=None) -> requests.Response:  
+        with self.limiter.slot(sampled(timeout)) as call:  
+            body, headers = encode_body(json)  
+            return call.done(self.session.put(f"{self.base_url}{path}", data=body, headers=headers,  
+                                              params=params, timeout=self._timeout(timeout)))  
+  
+    def delete(self, path: str, timeout=None) -> requests.Response:  
+        with self.limiter.slot(sampled(timeout)) as call:  
+            return call.done(self.session.delete(f"{self.base_url}{path}", timeout=self._timeout(timeout)))  
+  
+    def close(self):  
+        self.session.close()  
+  
+class AsyncAgentClient(AdminEndpoints):  
+    """asyncio counterpart of AgentClient, backed by a pooled httpx.AsyncClient."""  
+  
+    def __init__(self, base_url: str, pool_size: int = HTTP_POOL_SIZE,  
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,  
+                 read_timeout: float = HTTP_READ_TIMEOUT,  
+                 transport: httpx.AsyncBaseTransport = None,  
+                 limiter: AgentLimiter = None):  
+        self.base_url = base_url.rstrip("/")  
+        self.limiter = limiter or get_agent_limiter(self.base_url)  
+        self.connect_timeout = connect_timeout  
+        self.read_timeout = read_timeout  
+        self.session = httpx.AsyncClient(  
+            base_url=self.base_url,  
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),  
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),  
+            transport=transport,  
+        )  
+  
+    def _timeout(self, timeout):  
+        if timeout is None:  
+            timeout = (self.connect_timeout, self.read_timeout)  
+        elif not isinstance(timeout, tuple):  
+            timeout = (self.connect_timeout, timeout)  
+        connect, read = within_deadline(*timeout)  
+        return httpx.Timeout(read, connect=connect)  
+  
+    async def get(self, path: str, params: dict = None, timeout=None) -> httpx.Response:  
+        async with self.limiter.aslot(sampled(timeout)) as call:  
+            return call.done(await self.session.get(path, params=params, timeout=self._timeout(timeout)))  
+  
+    async def post(self, path: str, json: dict = None, params: dict = None, timeout=None) -> httpx.Response:  
+        async with self.limiter.aslot(sampled(timeout)) as call:  
+            body, headers = encode_body(json)  
+            return call.done(await self.session.post(path, content=body, headers=headers, params=params,  
+                                                     timeout=self._timeout(timeout)))  
+  
+    async def put(self, path: str, json: dict = None, params: dict = None, timeout=None) -> httpx.Response:  
+        async with self.limiter.aslot(sampled(timeout)) as call:  
+            body, headers = encode_body(json)  
+            return call.done(await self.session.put(path, content=body, headers=headers, params=params,  
+                                                    timeout=self._timeout(timeout)))  
+  
+    async def delete(self, path: str, timeout=None) -> httpx.Response:  
+        async with self.limiter.aslot(sampled(timeout)) as call:  
+            return call.done(await self.session.delete(path, timeout=self._timeout(timeout)))  
+  
+    async def aclose(self):  
+        await self.session.aclose()  
+  
+_clients = {}  
+_clients_lock = threading.Lock()  
+# httpx pools are bound to the event loop that opened them  
+_async_clients = weakref.WeakKeyDictionary()  
+  
+def get_client(agent_url: str) -> AgentClient:  
+    """Return the shared client for an agent URL, creating it on first use."""  
+    client = _clients.get(agent_url)  
+    if client is None:  
+        with _clients_lock:  
+            client = _clients.get(agent_url)  
+            if client is None:  
+                client = AgentClient(agent_url)  
+                _clients[agent_url] = client  
+    return client  
+  
+def get_async_client(agent_url: str) -> AsyncAgentClient:  
+    """Return the shared async client for an agent URL on the running event loop."""  
+    loop = asyncio.get_running_loop()  
+    clients = _async_clients.setdefault(loop, {})  
+    client = clients.get(agent_url)  
+    if client is None:  
+        client = AsyncAgentClient(agent_url)  
+        clients[agent_url] = client  
+    return client  
+  
+def close_clients():  
+    """Close every shared client and drop its pooled connections."""  
+    with _clients_lock:  
+        for client in _clients.values():  
+            client.close()  
+        _clients.clear()  
+  
+async def aclose_clients():  
+    """Close the shared async clients of the running event loop."""  
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})  
+    for client in clients.values():  
+        await client.aclose()  
+  
+def run_async(coro):  
+    """Run a coroutine to completion from sync code, closing its async clients afterwards."""  
+    async def _main():  
+        try:  
+            return await coro  
+        finally:  
+            await aclose_clients()  
+    return asyncio.run(_main())
\ No newline at end of file
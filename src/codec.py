@@ -0,0 +1,32 @@
+import json  
+  
+try:  
+    import orjson  
+except ImportError:  # optional: stdlib json is used without it  
+    orjson = None  
+  
+BACKEND = "orjson" if orjson is not None else "json"  
+  
+def dumps(obj, pretty=False) -> bytes:  
+    """UTF-8 JSON; pretty indents by 2."""  
+    if orjson is not None:  
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0))  
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":") if not pretty else None,  
+                      indent=2 if pretty else None).encode()  
+  
+def dumps_text(obj, pretty=False) -> str:  
+    return dumps(obj, pretty).decode()  
+  
+def loads(data):  
+    """Parse JSON from bytes or str."""  
+    if orjson is not None:  
+        return orjson.loads(data)  
+    return json.loads(data)  
+  
+def response_json(resp):  
+    """Body of a requests/httpx response, parsed with the fast decoder."""  
+    return loads(resp.content)  
+  
+def copy(obj):  
+    """Deep copy of JSON-compatible data."""  
+    return loads(dumps(obj))
\ No newline at end of file
@@ -2,6 +2,143 @@
 ISSUER_URL = "http://localhost:8001"  
 HOLDER_URL = "http://localhost:8011"  
 VERIFIER_URL = "http://localhost:8021"  
+# Agent names used in webhook URLs  
+AGENT_URLS = {"issuer": ISSUER_URL, "holder": HOLDER_URL, "verifier": VERIFIER_URL}  
   
 # File to persist state between scripts  
-STATE_FILE = "system_state.json"
\ No newline at end of file
+STATE_FILE = "system_state.json"  
+# State backend: "json" (STATE_FILE) or "sqlite" (STATE_DB, safe for concurrent workers)  
+STATE_BACKEND = "json"  
+STATE_DB = "system_state.db"  
+  
+# Admin API HTTP client (connection pool size per agent, timeouts in seconds)  
+HTTP_POOL_SIZE = 20  
+HTTP_CONNECT_TIMEOUT = 5.0  
+HTTP_READ_TIMEOUT = 30.0  
+# Credential definitions generate and upload the tails file synchronously  
+HTTP_LONG_READ_TIMEOUT = 300.0  
+  
+# Webhook receiver (agents post events to http://<host>:WEBHOOK_PORT/webhooks/<agent>)  
+# Needs the agents started with docker-compose.webhooks.yml  
+USE_WEBHOOKS = False  
+WEBHOOK_HOST = "0.0.0.0"  
+WEBHOOK_PORT = 8090  
+# Latest event payloads kept per (topic, record id)  
+EVENT_HISTORY_SIZE = 10000  
+  
+# Credential exchange: seconds allowed per state transition, and the  
+# polling interval used when no webhook event bus is available  
+ISSUANCE_STATE_TIMEOUT = 15.0  
+ISSUANCE_POLL_INTERVAL = 0.25  
+# The Bot answers offers and stores credentials by itself  
+# (--auto-respond-credential-offer --auto-store-credential in docker-compose.yml)  
+HOLDER_AUTO_RESPOND = True  
+  
+# Bulk issuance: credential exchanges in flight at once  
+BULK_CONCURRENCY = 50  
+  
+# Bulk revocation: revocations marked at once, and when streaming revocations  
+# are published (whichever comes first: count per batch or window in seconds).  
+# A failed publication is retried with backoff, at most this many seconds apart  
+REVOCATION_CONCURRENCY = 20  
+REVOCATION_BATCH_SIZE = 500  
+REVOCATION_BATCH_WINDOW = 5.0  
+REVOCATION_RETRY_MAX_DELAY = 60.0  
+  
+# Verification pipeline: presentation exchanges in flight, and connections  
+# allowed to wait for a free slot  
+VERIFY_CONCURRENCY = 50  
+VERIFY_QUEUE_SIZE = 1000  
+  
+# Verification cache (opt-in): seconds a successful verification is reused  
+# for the same connection and cred def, and maximum number of entries; with  
+# no revocation source attached, entries live at most UNWATCHED_TTL seconds  
+VERIFICATION_CACHE_TTL = 300.0  
+VERIFICATION_CACHE_SIZE = 10000  
+VERIFICATION_CACHE_UNWATCHED_TTL = 5.0  
+  
+# Connection id cache: maximum aliases kept, seconds a "not found" is cached,  
+# and page size of the startup preload sweep  
+CONNECTION_CACHE_SIZE = 10000  
+CONNECTION_NEGATIVE_TTL = 5.0  
+CONNECTION_PAGE_SIZE = 100  
+  
+# Page size when listing exchange records  
+RECORDS_PAGE_SIZE = 100  
+  
+# Connection bootstrap: handshakes in flight at once, seconds to wait for a  
+# connection to become active, and polling interval when webhooks are off  
+BOOTSTRAP_CONCURRENCY = 50  
+CONNECTION_READY_TIMEOUT = 30.0  
+CONNECTION_POLL_INTERVAL = 0.2  
+  
+# Invitation pool: refill when fewer than LOW invitations are left, up to HIGH;  
+# invitations created at once while refilling, and bots served by one  
+# multi-use invitation before it is retired, and seconds get() waits for the  
+# refill of an empty pool  
+INVITATION_POOL_LOW = 20  
+INVITATION_POOL_HIGH = 100  
+INVITATION_REFILL_CONCURRENCY = 10  
+INVITATION_MAX_USES = 100  
+INVITATION_WAIT_TIMEOUT = 30.0  
+  
+# Retries: consecutive failures that open an endpoint's circuit breaker and  
+# seconds before a trial call; retries allowed per request (shared budget)  
+# plus a minimum trickle of retries per second  
+CIRCUIT_FAILURE_THRESHOLD = 5  
+CIRCUIT_RESET_TIMEOUT = 30.0  
+RETRY_BUDGET_RATIO = 0.2  
+RETRY_BUDGET_MIN_PER_SECOND = 10.0  
+  
+# Admin API flow control per agent: requests per second (None = unlimited) and  
+# burst, and the adaptive in-flight limit (starting at the agents' wallet pool,  
+# max_connections 5 in docker-compose.yml); latency above tolerance x its  
+# baseline counts as congestion  
+AGENT_RATE_LIMIT = 500.0  
+AGENT_RATE_BURST = 100  
+ADAPTIVE_LIMIT_INITIAL = 5  
+ADAPTIVE_LIMIT_MIN = 1  
+ADAPTIVE_LIMIT_MAX = HTTP_POOL_SIZE  
+ADAPTIVE_LATENCY_TOLERANCE = 2.0  
+  
+# Seconds the schema/cred def ids validated by issuer_setup are trusted  
+# without asking the agent (run with --refresh to revalidate at once)  
+ISSUER_SETUP_CACHE_TTL = 86400.0  
+  
+# Credential catalog: agent operations (listings, creations) run at once  
+CATALOG_CONCURRENCY = 8  
+  
+# Revocation registry rotation: fraction of a registry's slots in use at which  
+# the next registry is provisioned in the background  
+REGISTRY_PROVISION_THRESHOLD = 0.8  
+  
+# Tails-file cache: upstream tails server, local content-addressed store,  
+# caching proxy address, and memory-mapped files kept open  
+TAILS_SERVER_URL = "http://localhost:6543"  
+TAILS_CACHE_DIR = ".tails_cache"  
+TAILS_PROXY_HOST = "0.0.0.0"  
+TAILS_PROXY_PORT = 6544  
+TAILS_CACHE_OPEN_FILES = 64  
+  
+# Non-revocation interval of proof requests: "genesis" (from 0 to now),  
+# "window" (last NON_REVOKED_WINDOW seconds), "bucket" (`to` rounded down to  
+# NON_REVOKED_BUCKET seconds) or "latest-delta" (latest published revocation  
+# list). Only "genesis" denies a revocation published this second; the others  
+# trade that freshness for reuse and are opt-in  
+NON_REVOKED_POLICY = "genesis"  
+NON_REVOKED_WINDOW = 300  
+NON_REVOKED_BUCKET = 60  
+  
+# Offline admin API simulator (src/simulator.py): log-normal latency of admin  
+# calls (median seconds, sigma) with slower routes overridden, latency of  
+# messages between agents, and share of calls failed with a 5xx  
+SIM_LATENCY_MEDIAN = 0.02  
+SIM_LATENCY_SIGMA = 0.5  
+SIM_MESSAGE_LATENCY = 0.01  
+SIM_ERROR_RATE = 0.0  
+SIM_SLOW_ROUTES = {  
+    "create_cred_def": (2.0, 0.3),  
+    "create_rev_reg_def": (1.0, 0.3),  
+    "verify_presentation": (0.05, 0.5),  
+    "publish_revocations": (0.5, 0.3),  
+}
\ No newline at end of file
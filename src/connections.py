@@ -0,0 +1,116 @@
+import threading  
+import time  
+from collections import OrderedDict  
+from .config import AGENT_URLS, CONNECTION_CACHE_SIZE, CONNECTION_NEGATIVE_TTL, CONNECTION_PAGE_SIZE  
+from .client import get_client  
+  
+# Connection states after which a cached connection id must not be used  
+CLOSED_STATES = {"abandoned", "deleted", "error"}  
+  
+def fetch_connection_id(agent_url, alias):  
+    """Fetch the active connection ID for an alias from the agent (no cache)."""  
+    resp = get_client(agent_url).get_connections(alias=alias, state="active")  
+    results = resp.json()['results']  
+    if results:  
+        return results[0]['connection_id']  
+    return None  
+  
+class ConnectionResolver:  
+    """Caches alias -> connection_id per agent URL.  
+  
+    Misses are cached too, for negative_ttl seconds, and the least recently  
+    used entry is evicted beyond max_size. Attached to the event bus, entries  
+    follow connection state changes: closed connections are dropped and  
+    connections becoming active replace negative entries.  
+    """  
+  
+    def __init__(self, max_size=CONNECTION_CACHE_SIZE, negative_ttl=CONNECTION_NEGATIVE_TTL, clock=time.monotonic):  
+        self.max_size = max_size  
+        self.negative_ttl = negative_ttl  
+        self.clock = clock  
+        self._entries = OrderedDict()  
+        self._by_conn = {}  
+        self._lock = threading.Lock()  
+  
+    def __len__(self):  
+        return len(self._entries)  
+  
+    def resolve(self, agent_url, alias):  
+        """Connection ID for an alias, from cache or a single admin call."""  
+        key = (agent_url, alias)  
+        with self._lock:  
+            entry = self._entries.get(key)  
+            if entry is not None:  
+                conn_id, expires = entry  
+                if expires is None or expires > self.clock():  
+                    self._entries.move_to_end(key)  
+                    return conn_id  
+                self._remove(key)  
+  
+        conn_id = fetch_connection_id(agent_url, alias)  
+        with self._lock:  
+            self._store(key, conn_id)  
+        return conn_id  
+  
+    def preload(self, agent_url, page_size=CONNECTION_PAGE_SIZE):  
+        """Cache every active connection of an agent in one paginated sweep; returns the count."""  
+        client = get_client(agent_url)  
+        loaded, offset = 0, 0  
+        while True:  
+            results = client.get_connections(state="active", limit=page_size, offset=offset).json()['results']  
+            with self._lock:  
+                for conn in results:  
+                    if conn.get("alias"):  
+                        self._store((agent_url, conn["alias"]), conn["connection_id"])  
+                        loaded += 1  
+            if len(results) < page_size:  
+                return loaded  
+            offset += page_size  
+  
+    def invalidate(self, agent_url, alias):  
+        with self._lock:  
+            self._remove((agent_url, alias))  
+  
+    def invalidate_connection(self, conn_id):  
+        with self._lock:  
+            key = self._by_conn.get(conn_id)  
+            if key is not None:  
+                self._remove(key)  
+  
+    def clear(self):  
+        with self._lock:  
+            self._entries.clear()  
+            self._by_conn.clear()  
+  
+    def on_connection_event(self, agent, topic, payload):  
+        """Event bus callback for the "connections" topic."""  
+        conn_id = payload.get("connection_id")  
+        state = payload.get("state")  
+        if state in CLOSED_STATES:  
+            self.invalidate_connection(conn_id)  
+        elif state == "active" and payload.get("alias") and agent in AGENT_URLS:  
+            with self._lock:  
+                self._store((AGENT_URLS[agent], payload["alias"]), conn_id)  
+  
+    def attach(self, bus):  
+        bus.subscribe("connections", self.on_connection_event)  
+  
+    def _store(self, key, conn_id):  
+        self._remove(key)  
+        expires = None if conn_id else self.clock() + self.negative_ttl  
+        self._entries[key] = (conn_id, expires)  
+        if conn_id:  
+            self._by_conn[conn_id] = key  
+        while len(self._entries) > self.max_size:  
+            self._remove(next(iter(self._entries)))  
+  
+    def _remove(self, key):  
+        entry = self._entries.pop(key, None)  
+        if entry is not None and entry[0]:  
+            self._by_conn.pop(entry[0], None)  
+  
+_resolver = ConnectionResolver()  
+  
+def get_connection_resolver() -> ConnectionResolver:  
+    """Process-wide resolver used by utils.get_connection_id."""  
+    return _resolver
\ No newline at end of file
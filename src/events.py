@@ -0,0 +1,121 @@
+import asyncio  
+from collections import OrderedDict, defaultdict  
+from .config import EVENT_HISTORY_SIZE  
+from .connections import get_connection_resolver  
+  
+# Field holding the record id in each ACA-Py webhook topic  
+RECORD_ID_FIELDS = {  
+    "connections": "connection_id",  
+    "out_of_band": "oob_id",  
+    "issue_credential_v2_0": "cred_ex_id",  
+    "present_proof_v2_0": "pres_ex_id",  
+    "issuer_cred_rev": "cred_ex_id",  
+    "revocation-notification": "thread_id",  
+}  
+  
+def record_id(topic, payload):  
+    """Id of the record an event refers to, or None for topics without one."""  
+    field = RECORD_ID_FIELDS.get(topic)  
+    return payload.get(field) if field else None  
+  
+class EventBus:  
+    """In-process pub/sub for agent webhook events.  
+  
+    Subscribers are called synchronously as callback(agent, topic, payload).  
+    The latest payload of each (topic, record id) is kept so a caller that  
+    starts waiting after the event arrived is still answered at once.  
+    """  
+  
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE):  
+        self.history_size = history_size  
+        self._subscribers = defaultdict(list)  
+        self._waiters = defaultdict(list)  
+        self._latest = OrderedDict()  
+  
+    def subscribe(self, topic, callback):  
+        """Call callback for every event on topic ("*" for all topics)."""  
+        self._subscribers[topic].append(callback)  
+  
+    def unsubscribe(self, topic, callback):  
+        if callback in self._subscribers.get(topic, []):  
+            self._subscribers[topic].remove(callback)  
+  
+    def publish(self, topic, payload, agent=None):  
+        keys = []  
+        rec_id = record_id(topic, payload)  
+        if rec_id is not None:  
+            keys.append((topic, rec_id))  
+        # Exchange threads are shared by both parties, so they are indexed per agent  
+        thread_id = payload.get("thread_id")  
+        if thread_id and agent:  
+            keys.append((topic, agent, thread_id))  
+  
+        for key in keys:  
+            self._record(key, payload)  
+  
+        for callback in self._subscribers.get(topic, []) + self._subscribers.get("*", []):  
+            callback(agent, topic, payload)  
+  
+    def _record(self, key, payload):  
+        self._latest[key] = payload  
+        self._latest.move_to_end(key)  
+        while len(self._latest) > self.history_size:  
+            self._latest.popitem(last=False)  
+  
+        state = payload.get("state")  
+        for states, future in self._waiters.pop(key, []):  
+            if future.done():  
+                continue  
+            if state in states:  
+                future.set_result(payload)  
+            else:  
+                self._waiters[key].append((states, future))  
+  
+    def latest(self, topic, rec_id):  
+        """Last payload seen for a record, or None."""  
+        return self._latest.get((topic, rec_id))  
+  
+    def latest_thread(self, agent, topic, thread_id):  
+        """Last payload an agent sent for an exchange thread, or None."""  
+        return self._latest.get((topic, agent, thread_id))  
+  
+    async def wait_for_state(self, topic, rec_id, states, timeout=None):  
+        """Wait until a record reaches one of states and return its payload.  
+  
+        Raises asyncio.TimeoutError if no matching event arrives in time.  
+        """  
+        return await self._wait((topic, rec_id), states, timeout)  
+  
+    async def wait_for_thread(self, agent, topic, thread_id, states, timeout=None):  
+        """Like wait_for_state, for the record an agent holds for an exchange thread."""  
+        return await self._wait((topic, agent, thread_id), states, timeout)  
+  
+    async def _wait(self, key, states, timeout):  
+        states = {states} if isinstance(states, str) else set(states)  
+        latest = self._latest.get(key)  
+        if latest is not None and latest.get("state") in states:  
+            return latest  
+  
+        future = asyncio.get_running_loop().create_future()  
+        self._waiters[key].append((states, future))  
+        try:  
+            return await asyncio.wait_for(future, timeout)  
+        finally:  
+            if not future.done():  
+                future.cancel()  
+            waiters = [w for w in self._waiters.get(key, []) if w[1] is not future]  
+            if waiters:  
+                self._waiters[key] = waiters  
+            else:  
+                self._waiters.pop(key, None)  
+  
+_bus = None  
+  
+def get_event_bus() -> EventBus:  
+    """Process-wide event bus fed by the webhook server."""  
+    global _bus  
+    if _bus is None:  
+        _bus = EventBus()  
+        # Keep the shared connection id cache in step with connection state changes  
+        get_connection_resolver().attach(_bus)  
+    return _bus
\ No newline at end of file
@@ -0,0 +1,242 @@
+import asyncio  
+import threading  
+import time  
+from collections import deque  
+from contextlib import contextmanager, asynccontextmanager  
+import httpx  
+import requests  
+from .config import (AGENT_RATE_LIMIT, AGENT_RATE_BURST, ADAPTIVE_LIMIT_INITIAL, ADAPTIVE_LIMIT_MIN,  
+                     ADAPTIVE_LIMIT_MAX, ADAPTIVE_LATENCY_TOLERANCE)  
+  
+# Responses meaning the agent is shedding load  
+OVERLOAD_STATUS = frozenset({429, 503})  
+# Exceptions meaning the agent did not answer in time or at all; any other  
+# error raised in a slot is the caller's and says nothing about the agent's load  
+TRANSPORT_ERRORS = (httpx.TransportError, requests.ConnectionError, requests.Timeout, ConnectionError,  
+                    TimeoutError)  
+  
+class TokenBucket:  
+    """Request rate limiter: `rate` requests per second with bursts of `burst`.  
+  
+    Callers reserve a token and sleep until it is due, so waiting callers are  
+    served in arrival order with O(1) work each. rate=None disables it.  
+    """  
+  
+    def __init__(self, rate, burst, clock=time.monotonic):  
+        self.rate = rate  
+        self.burst = burst  
+        self.clock = clock  
+        self.tokens = float(burst)  
+        self._updated = clock()  
+        self._lock = threading.Lock()  
+  
+    def reserve(self):  
+        """Take a token; return the seconds to wait before using it."""  
+        if self.rate is None:  
+            return 0.0  
+        with self._lock:  
+            now = self.clock()  
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)  
+            self._updated = now  
+            self.tokens -= 1  
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate  
+  
+    def acquire_sync(self):  
+        wait = self.reserve()  
+        if wait:  
+            time.sleep(wait)  
+  
+    async def acquire(self):  
+        wait = self.reserve()  
+        if wait:  
+            await asyncio.sleep(wait)  
+  
+class AdaptiveLimit:  
+    """AIMD concurrency limit driven by observed latency.  
+  
+    The limit grows by about one per round of calls while latency stays within  
+    `tolerance` times its baseline, and is cut by `backoff` (at most once per  
+    round trip) when latency rises above it or the agent sheds load. Latencies  
+    under min_latency count as min_latency, so sub-millisecond jitter is not  
+    mistaken for congestion.  
+    """  
+  
+    def __init__(self, initial=ADAPTIVE_LIMIT_INITIAL, min_limit=ADAPTIVE_LIMIT_MIN, max_limit=ADAPTIVE_LIMIT_MAX,  
+                 tolerance=ADAPTIVE_LATENCY_TOLERANCE, backoff=0.9, smoothing=0.05, min_latency=0.01,  
+                 clock=time.monotonic):  
+        self.limit = float(initial)  
+        self.min_limit = min_limit  
+        self.max_limit = max_limit  
+        self.tolerance = tolerance  
+        self.backoff = backoff  
+        self.smoothing = smoothing  
+        self.min_latency = min_latency  
+        self.clock = clock  
+        self.baseline = None  
+        self._last_decrease = None  
+        self._lock = threading.Lock()  
+  
+    def current(self):  
+        """Calls allowed in flight right now."""  
+        return max(1, int(self.limit))  
+  
+    def on_sample(self, latency, overloaded=False):  
+        latency = max(latency, self.min_latency)  
+        with self._lock:  
+            if self.baseline is None:  
+                self.baseline = latency  
+            congested = overloaded or latency > self.baseline * self.tolerance  
+            if congested:  
+                self._decrease(latency)  
+                # Follow a lasting latency shift, slowly  
+                self.baseline += (latency - self.baseline) * self.smoothing / 10  
+            else:  
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)  
+                self.baseline += (latency - self.baseline) * self.smoothing  
+  
+    def on_overload(self):  
+        """The agent shed load on a call whose latency is not sampled."""  
+        with self._lock:  
+            self._decrease(self.baseline or self.min_latency)  
+  
+    def _decrease(self, round_trip):  
+        now = self.clock()  
+        if self._last_decrease is None or now - self._last_decrease >= round_trip:  
+            self.limit = max(self.min_limit, self.limit * self.backoff)  
+            self._last_decrease = now  
+  
+class Call:  
+    """Outcome of one admin call, reported back to the limiter."""  
+  
+    def __init__(self):  
+        self.overloaded = False  
+  
+    def done(self, response):  
+        self.overloaded = getattr(response, "status_code", None) in OVERLOAD_STATUS  
+        return response  
+  
+class AgentLimiter:  
+    """Rate limit plus adaptive concurrency limit for one agent's admin API.  
+  
+    Shared by every client of the agent (sync and async), so the learned  
+    limit survives across event loops, and the limit is one in-flight budget  
+    for the agent: sync calls of every thread and async calls of every event  
+    loop are counted together, so they never exceed the wallet's connections  
+    between them. Calls made with sample=False (the long create/upload calls)  
+    hold a slot but their latency is not sampled; an overload still cuts the  
+    limit.  
+    """  
+  
+    def __init__(self, name, rate=AGENT_RATE_LIMIT, burst=AGENT_RATE_BURST, adaptive=None, clock=time.monotonic):  
+        self.name = name  
+        self.bucket = TokenBucket(rate, burst, clock)  
+        self.adaptive = adaptive or AdaptiveLimit(clock=clock)  
+        self.clock = clock  
+        self.in_flight = 0  
+        self._cond = threading.Condition()  
+        # (loop, future) of async callers waiting for a slot, woken one per release  
+        self._waiters = deque()  
+  
+    def stats(self):  
+        return {  
+            "limit": self.adaptive.current(),  
+            "in_flight": self.in_flight,  
+            "baseline_latency": self.adaptive.baseline,  
+            "rate": self.bucket.rate  
+        }  
+  
+    def _record(self, started, call, error, sample):  
+        if error is not None and not isinstance(error, Exception):  
+            return  
+        overloaded = call.overloaded or isinstance(error, TRANSPORT_ERRORS)  
+        if sample:  
+            self.adaptive.on_sample(self.clock() - started, overloaded)  
+        elif overloaded:  
+            self.adaptive.on_overload()  
+  
+    def _try_acquire(self):  
+        # Called with self._cond held  
+        if self.in_flight < self.adaptive.current():  
+            self.in_flight += 1  
+            return True  
+        return False  
+  
+    def _release(self):  
+        with self._cond:  
+            self.in_flight -= 1  
+            self._cond.notify()  
+            self._wake_one()  
+  
+    def _wake_one(self):  
+        # Called with self._cond held; the waiter may belong to another thread's loop  
+        while self._waiters:  
+            loop, waiter = self._waiters.popleft()  
+            if not loop.is_closed():  
+                loop.call_soon_threadsafe(_wake, waiter)  
+                return  
+  
+    @contextmanager  
+    def slot(self, sample=True):  
+        """Hold one in-flight slot for a sync call."""  
+        self.bucket.acquire_sync()  
+        with self._cond:  
+            self._cond.wait_for(self._try_acquire)  
+        call, started, error = Call(), self.clock(), None  
+        try:  
+            yield call  
+        except BaseException as e:  
+            error = e  
+            raise  
+        finally:  
+            self._record(started, call, error, sample)  
+            self._release()  
+  
+    @asynccontextmanager  
+    async def aslot(self, sample=True):  
+        """Hold one in-flight slot for an async call on the running loop."""  
+        await self.bucket.acquire()  
+        loop = asyncio.get_running_loop()  
+        while True:  
+            with self._cond:  
+                if self._try_acquire():  
+                    break  
+                waiter = loop.create_future()  
+                self._waiters.append((loop, waiter))  
+            try:  
+                await waiter  
+            except asyncio.CancelledError:  
+                with self._cond:  
+                    try:  
+                        self._waiters.remove((loop, waiter))  
+                    except ValueError:  
+                        # Already woken: pass the wake-up on  
+                        self._wake_one()  
+                raise  
+        call, started, error = Call(), self.clock(), None  
+        try:  
+            yield call  
+        except BaseException as e:  
+            error = e  
+            raise  
+        finally:  
+            self._record(started, call, error, sample)  
+            self._release()  
+  
+def _wake(waiter):  
+    if not waiter.done():  
+        waiter.set_result(None)  
+  
+_limiters = {}  
+_limiters_lock = threading.Lock()  
+  
+def get_agent_limiter(agent_url):  
+    """Shared limiter for an agent URL."""  
+    with _limiters_lock:  
+        if agent_url not in _limiters:  
+            _limiters[agent_url] = AgentLimiter(agent_url)  
+        return _limiters[agent_url]  
+  
+def reset_agent_limiters():  
+    """Forget every agent's learned limit."""  
+    with _limiters_lock:  
+        _limiters.clear()
\ No newline at end of file
@@ -0,0 +1,137 @@
+import asyncio  
+from collections import deque  
+from .config import (INVITATION_POOL_LOW, INVITATION_POOL_HIGH, INVITATION_REFILL_CONCURRENCY, INVITATION_MAX_USES,  
+                     INVITATION_WAIT_TIMEOUT)  
+from .client import get_async_client  
+  
+class InvitationPool:  
+    """Pre-created out-of-band invitations of one inviter, handed out in O(1).  
+  
+    A background task keeps between low and high invitations ready: whenever  
+    a handout leaves fewer than low, it creates invitations (refill_concurrency  
+    at a time) until high are pooled again. Single-use invitations are handed  
+    out once; multi-use invitations serve up to max_uses bots each. Use as an  
+    async context manager, or call start() and close().  
+    """  
+  
+    def __init__(self, inviter, alias, multi_use=False, low=INVITATION_POOL_LOW, high=INVITATION_POOL_HIGH,  
+                 refill_concurrency=INVITATION_REFILL_CONCURRENCY, max_uses=INVITATION_MAX_USES):  
+        if not 0 <= low < high:  
+            raise ValueError("InvitationPool needs 0 <= low < high")  
+        self.inviter = get_async_client(inviter) if isinstance(inviter, str) else inviter  
+        self.alias = alias  
+        self.multi_use = multi_use  
+        self.low = low  
+        self.high = high  
+        self.refill_concurrency = refill_concurrency  
+        self.max_uses = max_uses if multi_use else 1  
+        self.created = 0  
+        self.handed_out = 0  
+        self.last_error = None  
+        self.refill_failures = 0  
+        self._ready = deque()  
+        self._uses = 0  
+        self._refill = asyncio.Event()  
+        self._available = asyncio.Event()  
+        self._task = None  
+  
+    def __len__(self):  
+        return len(self._ready)  
+  
+    async def start(self):  
+        """Fill the pool up to high and start the background refill."""  
+        await self._fill()  
+        self._task = asyncio.create_task(self._refill_loop())  
+        return self  
+  
+    async def close(self):  
+        if self._task is not None:  
+            self._task.cancel()  
+            try:  
+                await self._task  
+            except asyncio.CancelledError:  
+                pass  
+            self._task = None  
+  
+    async def __aenter__(self):  
+        return await self.start()  
+  
+    async def __aexit__(self, exc_type, exc, tb):  
+        await self.close()  
+  
+    def take(self):  
+        """Hand out an invitation at once, or None if the pool is empty."""  
+        if not self._ready:  
+            self._refill.set()  
+            return None  
+        invite = self._ready[0]  
+        self._uses += 1  
+        if self._uses >= self.max_uses:  
+            self._ready.popleft()  
+            self._uses = 0  
+        if not self._ready:  
+            self._available.clear()  
+        if len(self._ready) < self.low:  
+            self._refill.set()  
+        self.handed_out += 1  
+        return invite  
+  
+    async def get(self, timeout=INVITATION_WAIT_TIMEOUT):  
+        """Hand out an invitation, waiting for the refill if the pool ran dry.  
+  
+        Waits at most timeout seconds (None: no limit). If the background  
+        refill is failing by then, RuntimeError is raised with its last error,  
+        otherwise asyncio.TimeoutError. A pool that was not started creates  
+        the one invitation it hands out, within the same timeout.  
+        """  
+        loop = asyncio.get_running_loop()  
+        deadline = None if timeout is None else loop.time() + timeout  
+        while True:  
+            invite = self.take()  
+            if invite is not None:  
+                return invite  
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())  
+            if self._task is None:  
+                await asyncio.wait_for(self._create(), remaining)  
+                continue  
+            try:  
+                await asyncio.wait_for(self._available.wait(), remaining)  
+            except asyncio.TimeoutError:  
+                if self.refill_failures:  
+                    raise RuntimeError(f"No invitation within {timeout}s, refill failed "  
+                                       f"{self.refill_failures} time(s): {self.last_error}") from self.last_error  
+                raise  
+  
+    async def _create(self):  
+        resp = await self.inviter.create_invitation(  
+            {"alias": self.alias, "handshake_protocols": ["https://didcomm.org/didexchange/1.0"]},  
+            multi_use=self.multi_use)  
+        if resp.status_code != 200:  
+            raise RuntimeError(f"Invitation not created: {resp.status_code} {resp.text}")  
+        self._ready.append(resp.json())  
+        self.created += 1  
+        self._available.set()  
+  
+    async def _fill(self):  
+        while len(self._ready) < self.high:  
+            missing = min(self.high - len(self._ready), self.refill_concurrency)  
+            results = await asyncio.gather(*(self._create() for _ in range(missing)), return_exceptions=True)  
+            errors = [r for r in results if isinstance(r, Exception)]  
+            if errors:  
+                self.last_error = errors[0]  
+                if len(errors) == len(results):  
+                    raise errors[0]  
+  
+    async def _refill_loop(self):  
+        while True:  
+            await self._refill.wait()  
+            self._refill.clear()  
+            try:  
+                await self._fill()  
+                self.refill_failures = 0  
+            except Exception as e:  
+                # Agent unavailable: try again shortly  
+                self.last_error = e  
+                self.refill_failures += 1  
+                await asyncio.sleep(1.0)  
+                self._refill.set()
\ No newline at end of file
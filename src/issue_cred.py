@@ -1,21 +1,220 @@
+import asyncio  
 import requests  
 import json  
 import time  
 import sys  
 import uuid  
-from .config import ISSUER_URL, HOLDER_URL  
-from .utils import load_state, get_connection_id  
+from .config import (ISSUER_URL, HOLDER_URL, USE_WEBHOOKS, ISSUANCE_STATE_TIMEOUT, ISSUANCE_POLL_INTERVAL,  
+                     HOLDER_AUTO_RESPOND)  
+from .client import get_client, get_async_client, run_async  
+from .utils import load_state, get_connection_id, save_credential_record  
 from .retry import retry_with_backoff  
 from .schemas import CredentialAttributes  
+from .webhooks import webhook_events  
+from .records import find_cred_ex_record, find_credential  
+from .codec import response_json  
   
-@retry_with_backoff(max_attempts=3, initial_delay=1.0)  
+def build_offer_payload(conn_id, cred_def_id, attributes):  
+    """Build the AnonCreds credential offer for a validated set of attributes."""  
+    return {  
+        "connection_id": conn_id,  
+        "credential_preview": {  
+            "@type": "issue-credential/2.0/credential-preview",  
+            "attributes": [  
+                {"name": "person_hash", "value": attributes.person_hash},  
+                {"name": "biometric_score", "value": attributes.biometric_score},  
+                {"name": "timestamp", "value": attributes.timestamp},  
+                {"name": "controller_did", "value": attributes.controller_did}  
+            ]  
+        },  
+        "filter": {"anoncreds": {"cred_def_id": cred_def_id}},  
+        "auto_remove": False  
+    }  
+  
+@retry_with_backoff(max_attempts=3, initial_delay=1.0, circuit="issuer:send-offer")  
 def send_credential_offer(payload):  
     """Send credential offer with automatic retry"""  
-    resp = requests.post(f"{ISSUER_URL}/issue-credential-2.0/send-offer", json=payload)  
+    resp = get_client(ISSUER_URL).send_offer(payload)  
+    if resp.status_code != 200:  
+        raise requests.HTTPError(f"Status: {resp.status_code}, Response: {resp.text}", response=resp)  
+    return resp  
+  
+@retry_with_backoff(max_attempts=3, initial_delay=1.0, circuit="issuer:send-offer")  
+async def send_credential_offer_async(issuer, payload):  
+    """Async variant of send_credential_offer"""  
+    resp = await issuer.send_offer(payload)  
     if resp.status_code != 200:  
-        raise requests.HTTPError(f"Status: {resp.status_code}, Response: {resp.text}")  
+        raise requests.HTTPError(f"Status: {resp.status_code}, Response: {resp.text}", response=resp)  
     return resp  
   
+class ExchangeError(Exception):  
+    """A credential exchange was abandoned or could not progress."""  
+  
+class ExchangeTimeout(ExchangeError):  
+    """A credential exchange missed the deadline of one of its states."""  
+  
+class CredentialExchange:  
+    """Issuer-side state machine for one credential exchange.  
+  
+    offer-sent -> request-received -> credential-issued -> done. The exchange is  
+    tracked by its thread id on both agents and advances as soon as each  
+    transition is observed: through webhook events when an event bus is given,  
+    otherwise by polling the records of that thread. Every state has its own  
+    deadline instead of fixed sleeps. With holder_auto (HOLDER_AUTO_RESPOND),  
+    the Bot answers the offer and stores the credential by itself and only  
+    the issuer acts. A failed action raises ExchangeError with the agent's  
+    answer, unless the record had already moved past it.  
+    """  
+  
+    TOPIC = "issue_credential_v2_0"  
+  
+    def __init__(self, issuer, holder, bus=None, state_timeout=None, poll_interval=None, holder_auto=None):  
+        self.issuer = issuer  
+        self.holder = holder  
+        self.bus = bus  
+        self.holder_auto = HOLDER_AUTO_RESPOND if holder_auto is None else holder_auto  
+        self.state_timeout = state_timeout or ISSUANCE_STATE_TIMEOUT  
+        self.poll_interval = poll_interval or ISSUANCE_POLL_INTERVAL  
+        self.state = None  
+        self.thread_id = None  
+        self.cred_ex_id = None  
+        self.holder_cred_ex_id = None  
+        self.transitions = []  
+        self._started = None  
+  
+    async def run(self, payload):  
+        """Drive the exchange to done and return its summary."""  
+        self._started = time.monotonic()  
+        record = response_json(await send_credential_offer_async(self.issuer, payload))  
+        record = record.get("cred_ex_record", record)  
+        self.cred_ex_id = record["cred_ex_id"]  
+        self.thread_id = record["thread_id"]  
+        self._advance("offer-sent")  
+  
+        # offer-sent -> request-received: the Bot answers the offer  
+        if not self.holder_auto:  
+            record = await self._wait("holder", ("offer-received", "request-sent", "credential-received", "done"))  
+            self.holder_cred_ex_id = record["cred_ex_id"]  
+            if record["state"] == "offer-received":  
+                await self._act("holder", "send-request", await self.holder.send_request(self.holder_cred_ex_id),  
+                                ("request-sent", "credential-received", "done"))  
+        record = await self._wait("issuer", ("request-received", "credential-issued", "done"))  
+        self._advance("request-received")  
+  
+        # request-received -> credential-issued  
+        if record["state"] == "request-received":  
+            advanced = await self._act("issuer", "issue", await self.issuer.issue_credential(self.cred_ex_id),  
+                                       ("credential-issued", "done"))  
+            if advanced is None:  
+                await self._wait("issuer", ("credential-issued", "done"))  
+        self._advance("credential-issued")  
+  
+        # credential-issued -> done: the Bot stores the credential  
+        if self.holder_auto:  
+            record = await self._wait("holder", ("done",))  
+        else:  
+            record = await self._wait("holder", ("credential-received", "done"))  
+            if record["state"] == "credential-received":  
+                resp = await self.holder.store_credential(self.holder_cred_ex_id,  
+                                                          credential_id=self.holder_cred_ex_id)  
+                if await self._act("holder", "store", resp, ("done",)) is None:  
+                    record = await self._wait("holder", ("done",))  
+        self.holder_cred_ex_id = record["cred_ex_id"]  
+        self._advance("done")  
+  
+        return {  
+            "cred_ex_id": self.holder_cred_ex_id,  
+            "issuer_cred_ex_id": self.cred_ex_id,  
+            "thread_id": self.thread_id,  
+            "state": self.state,  
+            "stored": True,  
+            "transitions": self.transitions  
+        }  
+  
+    def _advance(self, state):  
+        self.state = state  
+        self.transitions.append((state, round(time.monotonic() - self._started, 3)))  
+  
+    async def _act(self, role, action, resp, advanced):  
+        """Check the agent's answer to an action on this thread.  
+  
+        A 4xx because the record already moved on (e.g. the agent took the  
+        step itself) is benign: the re-read record is returned if its state is  
+        in advanced. None means the action succeeded.  
+        """  
+        if 200 <= resp.status_code < 300:  
+            return None  
+        if 400 <= resp.status_code < 500:  
+            record = await self._fetch(self.issuer if role == "issuer" else self.holder)  
+            if record is not None and record.get("state") in advanced:  
+                return record  
+        raise ExchangeError(f"Thread {self.thread_id}: {role} {action} failed with {resp.status_code}: {resp.text}")  
+  
+    async def _wait(self, role, states):  
+        """Wait for the role's record of this thread to reach one of states."""  
+        client = self.issuer if role == "issuer" else self.holder  
+        wanted = set(states) | {"abandoned"}  
+  
+        if self.bus is not None:  
+            try:  
+                record = await self.bus.wait_for_thread(role, self.TOPIC, self.thread_id, wanted, self.state_timeout)  
+            except asyncio.TimeoutError:  
+                # A webhook may have been lost: check the record once  
+                record = await self._fetch(client)  
+        else:  
+            record = await self._poll(client, wanted)  
+  
+        if record is None or record.get("state") not in wanted:  
+            raise ExchangeTimeout(f"Thread {self.thread_id}: {role} did not reach {sorted(states)} "  
+                                  f"after '{self.state}' within {self.state_timeout}s")  
+        if record["state"] == "abandoned":  
+            raise ExchangeError(f"Thread {self.thread_id}: {role} abandoned the exchange "  
+                                f"({record.get('error_msg')})")  
+        return record  
+  
+    async def _poll(self, client, wanted):  
+        deadline = time.monotonic() + self.state_timeout  
+        while True:  
+            record = await self._fetch(client)  
+            if record is not None and record.get("state") in wanted:  
+                return record  
+            if time.monotonic() >= deadline:  
+                return record  
+            await asyncio.sleep(self.poll_interval)  
+  
+    async def _fetch(self, client):  
+        return await find_cred_ex_record(client, thread_id=self.thread_id)  
+  
+async def issue_credential(conn_id, cred_def_id, attributes, issuer=None, holder=None, bus=None, holder_auto=None):  
+    """Offer a credential and drive the exchange until the Bot has stored it.  
+  
+    Returns the exchange summary (see CredentialExchange.run); raises  
+    ExchangeError if it is abandoned, stalls or an agent refuses a step.  
+    """  
+    exchange = CredentialExchange(issuer or get_async_client(ISSUER_URL),  
+                                  holder or get_async_client(HOLDER_URL), bus=bus, holder_auto=holder_auto)  
+    return await exchange.run(build_offer_payload(conn_id, cred_def_id, attributes))  
+  
+def credential_record(result, conn_id, cred_def_id, credential=None):  
+    """Per-credential state record for an issued exchange (see utils.save_credential_record)."""  
+    credential = credential or {}  
+    return {  
+        "cred_ex_id": result["issuer_cred_ex_id"],  
+        "holder_cred_ex_id": result["cred_ex_id"],  
+        "thread_id": result["thread_id"],  
+        "connection_id": conn_id,  
+        "cred_def_id": cred_def_id,  
+        "referent": credential.get("referent"),  
+        "rev_reg_id": credential.get("rev_reg_id"),  
+        "cred_rev_id": credential.get("cred_rev_id"),  
+        "person_hash": (credential.get("attrs") or {}).get("person_hash"),  
+        "state": "issued"  
+    }  
+  
+async def find_holder_credential(controller_did, holder=None):  
+    """The Bot's stored credential for a controller DID, looked up by attribute"""  
+    return await find_credential(holder or get_async_client(HOLDER_URL), controller_did=controller_did)  
+  
 def main():  
     print("### 3. ISSUING CREDENTIAL (ANONCREDS FORMAT) ###")  
   
@@ -42,78 +241,43 @@ def main():
         controller_did=f"did:sov:{uuid.uuid4().hex[:32]}"  # Generated dynamically  
     )  
   
-    payload = {  
-        "connection_id": conn_id_issuer,  
-        "credential_preview": {  
-            "@type": "issue-credential/2.0/credential-preview",  
-            "attributes": [  
-                {"name": "person_hash", "value": attributes.person_hash},  
-                {"name": "biometric_score", "value": attributes.biometric_score},  
-                {"name": "timestamp", "value": attributes.timestamp},  
-                {"name": "controller_did", "value": attributes.controller_did}  
-            ]  
-        },  
-        "filter": {"anoncreds": {"cred_def_id": cred_def_id}},  
-        "auto_remove": False  
-    }  
-  
-    # Use the function with retry  
-    try:  
-        resp = send_credential_offer(payload)  
-        print("   [Issuer] Offer sent successfully!")  
-  
-    except Exception as e:  
-        print(f"\n❌ ISSUER ERROR after 3 attempts: {e}")  
-        return  
-  
-    print("   [Bot] Processing...")  
-    time.sleep(3)  
-  
-    # 3. Bot (Holder) logic - remains the same  
-    try:  
-        all_records = requests.get(f"{HOLDER_URL}/issue-credential-2.0/records").json()['results']  
-        if not all_records:  
-            print("❌ ERROR: Bot received nothing.")  
+    async def exchange(bus=None):  
+        try:  
+            result = await issue_credential(conn_id_issuer, cred_def_id, attributes, bus=bus)  
+        except requests.HTTPError as e:  
+            print(f"\n❌ ISSUER ERROR after 3 attempts: {e}")  
+            return  
+        except ExchangeError as e:  
+            print(f"❌ ERROR: {e}")  
+            return  
+        except Exception as e:  
+            print(f"Bot error: {e}")  
             return  
   
-        target_record = all_records[-1].get('cred_ex_record', all_records[-1])  
-        cred_ex_id = target_record['cred_ex_id']  
-        state_cred = target_record['state']  
-  
-        print(f"   -> Record: {cred_ex_id} | State: {state_cred}")  
-  
-        # Automation  
-        if state_cred == "offer-received":  
-            requests.post(f"{HOLDER_URL}/issue-credential-2.0/records/{cred_ex_id}/send-request")  
-            time.sleep(2)  
-            rec = requests.get(f"{HOLDER_URL}/issue-credential-2.0/records/{cred_ex_id}").json()  
-            state_cred = rec.get('cred_ex_record', rec)['state']  
-  
-        if state_cred == "credential-received":  
-            requests.post(f"{HOLDER_URL}/issue-credential-2.0/records/{cred_ex_id}/store",  
-                          json={"credential_id": cred_ex_id})  
-            print("   ✅ Credential stored!")  
-  
-        elif state_cred == "request-sent":  
-            print("   ⚠️ State 'request-sent'. Forcing Issuer...")  
-            iss_recs = requests.get(f"{ISSUER_URL}/issue-credential-2.0/records", params={"state": "request-received"}).json()['results']  
-            if iss_recs:  
-                 t = iss_recs[-1].get('cred_ex_record', iss_recs[-1])  
-                 requests.post(f"{ISSUER_URL}/issue-credential-2.0/records/{t['cred_ex_id']}/issue", json={"comment":"force"})  
-                 print("   [Issuer] Issued.")  
-                 time.sleep(2)  
-                 requests.post(f"{HOLDER_URL}/issue-credential-2.0/records/{cred_ex_id}/store", json={"credential_id": cred_ex_id})  
-                 print("   ✅ Credential stored!")  
-  
-        elif state_cred == "done":  
-             print("   ✅ Already completed.")  
+        # 3. Bot (Holder) result  
+        for state, elapsed in result["transitions"]:  
+            print(f"   -> {state} (+{elapsed}s)")  
+        print(f"   -> Record: {result['cred_ex_id']} | Thread: {result['thread_id']}")  
+        print("   ✅ Credential stored!")  
   
         # Validation  
-        final = requests.get(f"{HOLDER_URL}/credentials").json()['results']  
-        print(f"\n   SUMMARY: The Bot has {len(final)} credential(s).")  
+        try:  
+            credential = await find_holder_credential(attributes.controller_did)  
+            save_credential_record(credential_record(result, conn_id_issuer, cred_def_id, credential))  
+            if credential:  
+                print(f"\n   SUMMARY: The Bot holds credential {credential['referent']}.")  
+            else:  
+                print("\n   SUMMARY: Credential not found in the Bot's wallet.")  
+        except Exception as e:  
+            print(f"Bot error: {e}")  
+  
+    async def run():  
+        if not USE_WEBHOOKS:  
+            return await exchange()  
+        async with webhook_events() as bus:  
+            return await exchange(bus)  
   
-    except Exception as e:  
-        print(f"Bot error: {e}")  
+    run_async(run())  
   
 if __name__ == "__main__":  
     main()
\ No newline at end of file
@@ -1,104 +1,163 @@
-import requests  
+import hashlib  
 import json  
 import sys  
 import time  
-from .config import ISSUER_URL  
-from .utils import save_state, load_state  
+from .config import ISSUER_URL, ISSUER_SETUP_CACHE_TTL  
+from .client import get_client  
+from .utils import save_states, load_state  
   
-def main():  
+# Governance artifacts registered by the Government  
+SCHEMA_NAME = "personhood_credential_revocable"  
+SCHEMA_VERSION = "2.0"  
+SCHEMA_ATTRIBUTES = ["person_hash", "biometric_score", "timestamp", "controller_did"]  
+CRED_DEF_TAG = "gov_revocable_v1"  
+REVOCATION_REGISTRY_SIZE = 1000  
+  
+# State key of the validated setup cache  
+SETUP_STATE_KEY = "issuer_setup"  
+  
+class IssuerNotReady(Exception):  
+    """The issuer agent is unreachable or has no public DID."""  
+  
+class IssuerSetupError(Exception):  
+    """A schema or credential definition could not be found or created."""  
+  
+def setup_fingerprint(agent_url=ISSUER_URL, name=SCHEMA_NAME, version=SCHEMA_VERSION, attributes=SCHEMA_ATTRIBUTES,  
+                      tag=CRED_DEF_TAG, registry_size=REVOCATION_REGISTRY_SIZE):  
+    """Hash of everything the cached ids depend on: a change forces revalidation."""  
+    spec = [agent_url, name, version, sorted(attributes), tag, registry_size]  
+    return hashlib.sha256(json.dumps(spec).encode()).hexdigest()  
+  
+def cached_setup(state, fingerprint, ttl=ISSUER_SETUP_CACHE_TTL, now=None):  
+    """The cached setup if it matches the fingerprint and was validated less than ttl seconds ago."""  
+    cached = state.get(SETUP_STATE_KEY)  
+    if not cached or cached.get("fingerprint") != fingerprint:  
+        return None  
+    if (now if now is not None else time.time()) - cached.get("validated_at", 0) > ttl:  
+        return None  
+    if state.get("schema_id") != cached.get("schema_id") or state.get("cred_def_id") != cached.get("cred_def_id"):  
+        return None  
+    return cached  
+  
+def get_issuer_did(issuer):  
+    try:  
+        did_resp = issuer.get_public_did()  
+    except Exception as e:  
+        raise IssuerNotReady(f"Connection error with agent: {e}")  
+    if did_resp.status_code != 200 or not did_resp.json().get('result'):  
+        raise IssuerNotReady("Issuer has no Public DID.")  
+    return did_resp.json()['result']['did']  
+  
+def find_schema(issuer, issuer_did, name=SCHEMA_NAME, version=SCHEMA_VERSION):  
+    """Id of the issuer's schema with this name and version, or None."""  
+    resp = issuer.get_schemas(schema_issuer_id=issuer_did, schema_name=name, schema_version=version)  
+    if resp.status_code != 200:  
+        raise IssuerSetupError(f"Error listing schemas: {resp.text}")  
+    schema_ids = resp.json().get("schema_ids") or []  
+    return schema_ids[0] if schema_ids else None  
+  
+def find_cred_def(issuer, issuer_did, schema_id, tag=CRED_DEF_TAG):  
+    """Id of the issuer's credential definition for a schema and tag, or None."""  
+    resp = issuer.get_cred_defs(schema_id=schema_id, issuer_id=issuer_did)  
+    if resp.status_code != 200:  
+        raise IssuerSetupError(f"Error listing credential definitions: {resp.text}")  
+    for cred_def_id in resp.json().get("credential_definition_ids") or []:  
+        if cred_def_id.endswith(f":{tag}") or cred_def_id.endswith(f"/{tag}"):  
+            return cred_def_id  
+    return None  
+  
+def ensure_schema(issuer, issuer_did, name=SCHEMA_NAME, version=SCHEMA_VERSION, attributes=SCHEMA_ATTRIBUTES):  
+    """Return (schema_id, created): listed first, created only when missing."""  
+    schema_id = find_schema(issuer, issuer_did, name, version)  
+    if schema_id:  
+        return schema_id, False  
+  
+    resp = issuer.create_schema({  
+        "schema": {"name": name, "version": version, "attrNames": list(attributes), "issuerId": issuer_did},  
+        "options": {"type": "finished"}  
+    })  
+    if resp.status_code == 200:  
+        return resp.json()["schema_state"]["schema_id"], True  
+    # Created concurrently by another process since the listing  
+    schema_id = find_schema(issuer, issuer_did, name, version) if "already exists" in resp.text else None  
+    if not schema_id:  
+        raise IssuerSetupError(f"Error creating Schema: {resp.text}")  
+    return schema_id, False  
+  
+def ensure_cred_def(issuer, issuer_did, schema_id, tag=CRED_DEF_TAG, registry_size=REVOCATION_REGISTRY_SIZE,  
+                    support_revocation=True):  
+    """Return (cred_def_id, created): listed first, created only when missing."""  
+    cred_def_id = find_cred_def(issuer, issuer_did, schema_id, tag)  
+    if cred_def_id:  
+        return cred_def_id, False  
+  
+    # With revocation this generates and uploads the tails file: slow  
+    options = {"support_revocation": support_revocation}  
+    if support_revocation:  
+        options["revocation_registry_size"] = registry_size  
+    resp = issuer.create_cred_def({  
+        "credential_definition": {"schemaId": schema_id, "tag": tag, "issuerId": issuer_did},  
+        "options": options  
+    })  
+    if resp.status_code == 200:  
+        return resp.json()["credential_definition_state"]["credential_definition_id"], True  
+    cred_def_id = find_cred_def(issuer, issuer_did, schema_id, tag) if "already exists" in resp.text else None  
+    if not cred_def_id:  
+        raise IssuerSetupError(f"Error creating CredDef: {resp.text}")  
+    return cred_def_id, False  
+  
+def setup_issuer(issuer=None, refresh=False, ttl=ISSUER_SETUP_CACHE_TTL):  
+    """Idempotently make sure the schema and credential definition exist.  
+  
+    Returns a dict with schema_id, cred_def_id, created (artifacts created by  
+    this run) and cached. When the state holds ids validated for the same  
+    setup less than ttl seconds ago, they are returned without calling the  
+    agent at all; otherwise the agent's list endpoints are checked first and  
+    only missing artifacts are created.  
+    """  
+    fingerprint = setup_fingerprint()  
+    state = load_state()  
+    if not refresh:  
+        cached = cached_setup(state, fingerprint, ttl)  
+        if cached:  
+            return {"schema_id": cached["schema_id"], "cred_def_id": cached["cred_def_id"],  
+                    "issuer_did": cached.get("issuer_did"), "created": [], "cached": True}  
+  
+    issuer = issuer or get_client(ISSUER_URL)  
+    issuer_did = get_issuer_did(issuer)  
+    schema_id, schema_created = ensure_schema(issuer, issuer_did)  
+    cred_def_id, cred_def_created = ensure_cred_def(issuer, issuer_did, schema_id)  
+  
+    save_states({  
+        "schema_id": schema_id,  
+        "cred_def_id": cred_def_id,  
+        SETUP_STATE_KEY: {"fingerprint": fingerprint, "schema_id": schema_id, "cred_def_id": cred_def_id,  
+                          "issuer_did": issuer_did, "validated_at": time.time()}  
+    })  
+    created = [name for name, flag in (("schema", schema_created), ("cred_def", cred_def_created)) if flag]  
+    return {"schema_id": schema_id, "cred_def_id": cred_def_id, "issuer_did": issuer_did,  
+            "created": created, "cached": False}  
+  
+def main(refresh=False):  
     print("### 2. CONFIGURING ISSUER (ASKAR-ANONCREDS + REVOCATION) ###")  
   
-    # 1. Verify DID  
     try:  
-        did_resp = requests.get(f"{ISSUER_URL}/wallet/did/public")  
-        if did_resp.status_code != 200 or not did_resp.json().get('result'):  
-            print(f"ERROR: Issuer has no Public DID.")  
-            return  
-        issuer_did = did_resp.json()['result']['did']  
-        print(f"   DID Detected: {issuer_did}")  
-    except:  
-        print("Connection error with agent.")  
+        result = setup_issuer(refresh=refresh)  
+    except IssuerNotReady as e:  
+        print(f"ERROR: {e}")  
         return  
+    except IssuerSetupError as e:  
+        print(e)  
+        sys.exit(1)  
   
-    # 2. Create Schema  
-    print("   Creating Schema (AnonCreds Standard)...")  
-  
-    schema_payload = {  
-        "schema": {  
-            "name": "personhood_credential_revocable",  
-            "version": "2.0",  
-            "attrNames": ["person_hash", "biometric_score", "timestamp", "controller_did"],  
-            "issuerId": issuer_did  
-        },  
-        "options": {  
-            "type": "finished"  
-        }  
-    }  
-  
-    resp_schema = requests.post(f"{ISSUER_URL}/anoncreds/schema", json=schema_payload)  
-  
-    if resp_schema.status_code != 200:  
-        if "already exists" in resp_schema.text:  
-            print("   Schema already exists on ledger. Fetching ID...")  
-            # Fetch existing schema  
-            resp = requests.get(f"{ISSUER_URL}/anoncreds/schemas",  
-                              params={"schema_issuer_id": issuer_did,  
-                                      "schema_name": "personhood_credential_revocable",  
-                                      "schema_version": "2.0"})  
-            if resp.status_code == 200 and resp.json()["schema_ids"]:  
-                schema_id = resp.json()["schema_ids"][0]  
-            else:  
-                print(f"Error fetching existing schema: {resp.text}")  
-                sys.exit(1)  
-        else:  
-            print(f"Error creating Schema: {resp_schema.text}")  
-            sys.exit(1)  
+    if result["cached"]:  
+        print("   Using validated setup from local state (no agent calls).")  
     else:  
-        schema_state = resp_schema.json()["schema_state"]  
-        schema_id = schema_state["schema_id"]  
-  
-    save_state("schema_id", schema_id)  
-    print(f"   [OK] Schema ID: {schema_id}")  
-  
-    # 3. Create Credential Definition WITH REVOCATION  
-    print("   Creating Credential Definition (Supports Revocation)...")  
-    print("   (This may take a while because it generates and uploads the Tails File)")  
-  
-    cred_def_payload = {  
-        "credential_definition": {  
-            "schemaId": schema_id,  
-            "tag": "gov_revocable_v1",  
-            "issuerId": issuer_did  
-        },  
-        "options": {  
-            "support_revocation": True,  
-            "revocation_registry_size": 1000  
-        }  
-    }  
-  
-    resp_cd = requests.post(f"{ISSUER_URL}/anoncreds/credential-definition", json=cred_def_payload)  
-  
-    if resp_cd.status_code != 200:  
-        if "already exists" in resp_cd.text:  
-            print("   Credential Definition already exists on ledger. Fetching ID...")  
-            # Fetch existing cred_def by schema_id  
-            resp = requests.get(f"{ISSUER_URL}/anoncreds/credential-definitions",  
-                              params={"schema_id": schema_id})  
-            if resp.status_code == 200 and resp.json()["credential_definition_ids"]:  
-                cred_def_id = resp.json()["credential_definition_ids"][0]  
-                print(f"   [OK] Existing Cred Def ID: {cred_def_id}")  
-            else:  
-                print(f"Error fetching existing cred_def: {resp.text}")  
-                sys.exit(1)  
-        else:  
-            print(f"Error creating CredDef: {resp_cd.text}")  
-            sys.exit(1)  
-    else:  
-        cd_state = resp_cd.json()["credential_definition_state"]  
-        cred_def_id = cd_state["credential_definition_id"]  
-  
-    save_state("cred_def_id", cred_def_id)  
-    print(f"   [OK] Cred Def ID: {cred_def_id}")  
+        print(f"   DID Detected: {result['issuer_did']}")  
+        for name in ("schema", "cred_def"):  
+            print(f"   {'Created' if name in result['created'] else 'Found existing'} {name}.")  
+    print(f"   [OK] Schema ID: {result['schema_id']}")  
+    print(f"   [OK] Cred Def ID: {result['cred_def_id']}")  
   
 if __name__ == "__main__":  
-    main()
\ No newline at end of file
+    main(refresh="--refresh" in sys.argv[1:])
\ No newline at end of file
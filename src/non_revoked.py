@@ -0,0 +1,108 @@
+import time  
+from .config import NON_REVOKED_POLICY, NON_REVOKED_WINDOW, NON_REVOKED_BUCKET  
+from .verification_cache import revoked_registry  
+  
+def cred_def_of(rev_reg_id):  
+    """Cred def id of a legacy rev_reg_id ("DID:4:<cred_def_id>:CL_ACCUM:<tag>"), or None."""  
+    parts = rev_reg_id.split(":")  
+    if len(parts) > 4 and parts[1] == "4" and parts[-2] == "CL_ACCUM":  
+        return ":".join(parts[2:-2])  
+    return None  
+  
+class FromGenesis:  
+    """Non-revocation from the beginning of time to now: a new interval every second."""  
+  
+    def __init__(self, clock=time.time):  
+        self.clock = clock  
+  
+    def interval(self, cred_def_id=None):  
+        return {"from": 0, "to": int(self.clock())}  
+  
+class SlidingWindow:  
+    """Any revocation state from the last `window` seconds is accepted."""  
+  
+    def __init__(self, window=NON_REVOKED_WINDOW, clock=time.time):  
+        self.window = window  
+        self.clock = clock  
+  
+    def interval(self, cred_def_id=None):  
+        now = int(self.clock())  
+        return {"from": max(0, now - int(self.window)), "to": now}  
+  
+class Bucketed:  
+    """Non-revocation at `to` rounded down to a `bucket`-second boundary.  
+  
+    Every request in the same bucket asks for the same timestamp, so holders  
+    and verifiers reuse the revocation states they computed for it.  
+    """  
+  
+    def __init__(self, bucket=NON_REVOKED_BUCKET, clock=time.time):  
+        self.bucket = max(1, int(bucket))  
+        self.clock = clock  
+  
+    def interval(self, cred_def_id=None):  
+        to = int(self.clock()) // self.bucket * self.bucket  
+        return {"from": to, "to": to}  
+  
+class LatestDelta:  
+    """Non-revocation as of the latest revocation list published for the cred def.  
+  
+    Nothing changed in the registries since that list, so proving against it  
+    is as good as proving against now, and the timestamp only moves when a  
+    revocation is published. Publications are learned from revocation events  
+    (attach), record_published() or the registries' current revocation lists  
+    (refresh). While no publication is known for a cred def, `to` is now.  
+    """  
+  
+    def __init__(self, clock=time.time):  
+        self.clock = clock  
+        self.published = {}  
+  
+    def record_published(self, cred_def_id, timestamp=None):  
+        timestamp = int(self.clock() if timestamp is None else timestamp)  
+        self.published[cred_def_id] = max(self.published.get(cred_def_id, 0), timestamp)  
+  
+    def interval(self, cred_def_id=None):  
+        to = self.published.get(cred_def_id)  
+        to = int(self.clock()) if to is None else to  
+        return {"from": to, "to": to}  
+  
+    async def refresh(self, client, cred_def_id):  
+        """Learn the latest revocation list timestamp of the cred def's registries.  
+  
+        Reads each registry (GET /anoncreds/revocation/registry/{id}) and keeps  
+        the newest `revocation_list.timestamp`. Returns it, or None if no  
+        registry reports one.  
+        """  
+        resp = await client.get_registries(cred_def_id=cred_def_id)  
+        latest = None  
+        for rev_reg_id in resp.json().get("rev_reg_ids", []):  
+            registry = (await client.get_registry(rev_reg_id)).json().get("result") or {}  
+            timestamp = (registry.get("revocation_list") or {}).get("timestamp")  
+            if timestamp is not None:  
+                latest = max(latest or 0, int(timestamp))  
+        if latest is not None:  
+            self.record_published(cred_def_id, latest)  
+        return latest  
+  
+    def attach(self, bus):  
+        """Track publications from revocation events published on an event bus."""  
+        def on_event(agent, topic, payload):  
+            rev_reg_id = revoked_registry(topic, payload)  
+            if not rev_reg_id:  
+                return  
+            cred_def_id = payload.get("cred_def_id") or cred_def_of(rev_reg_id)  
+            if cred_def_id:  
+                timestamp = payload.get("timestamp")  
+                self.record_published(cred_def_id, timestamp if isinstance(timestamp, int) else None)  
+        bus.subscribe("*", on_event)  
+        return on_event  
+  
+POLICIES = {"genesis": FromGenesis, "window": SlidingWindow, "bucket": Bucketed, "latest-delta": LatestDelta}  
+  
+def make_policy(name=None, **kwargs):  
+    """Non-revocation interval policy by name (NON_REVOKED_POLICY by default)."""  
+    name = name or NON_REVOKED_POLICY  
+    if name not in POLICIES:  
+        raise ValueError(f"Unknown non-revocation policy {name!r}, expected one of {sorted(POLICIES)}")  
+    return POLICIES[name](**kwargs)
\ No newline at end of file
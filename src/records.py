@@ -0,0 +1,96 @@
+from .config import RECORDS_PAGE_SIZE  
+from .codec import response_json, dumps_text  
+  
+class AdminRecord:  
+    """Read-only view of a parsed admin API record.  
+  
+    The record only holds the parsed dict: the fields the scripts use are  
+    properties reading it (None when missing), and everything else, nested  
+    structures included, is read from it when accessed. Records also behave  
+    like that dict (record["key"], get, in).  
+    """  
+    __slots__ = ("_raw",)  
+    FIELDS = ()  
+  
+    def __init_subclass__(cls, **kwargs):  
+        super().__init_subclass__(**kwargs)  
+        for field in cls.__dict__.get("FIELDS", ()):  
+            setattr(cls, field, property(lambda self, field=field: self._raw.get(field)))  
+  
+    def __init__(self, raw):  
+        self._raw = raw  
+  
+    def __getattr__(self, name):  
+        # Rarely used fields, read lazily from the parsed record  
+        try:  
+            return self._raw[name]  
+        except KeyError:  
+            raise AttributeError(name) from None  
+  
+    def __getitem__(self, key):  
+        return self._raw[key]  
+  
+    def __contains__(self, key):  
+        return key in self._raw  
+  
+    def __eq__(self, other):  
+        if isinstance(other, AdminRecord):  
+            return self._raw == other._raw  
+        return self._raw == other  
+  
+    def __repr__(self):  
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)  
+        return f"{type(self).__name__}({fields})"  
+  
+    def get(self, key, default=None):  
+        return self._raw.get(key, default)  
+  
+    def to_dict(self):  
+        return self._raw  
+  
+class CredExRecord(AdminRecord):  
+    __slots__ = ()  
+    FIELDS = ("cred_ex_id", "thread_id", "connection_id", "role", "state", "updated_at")  
+  
+class Credential(AdminRecord):  
+    __slots__ = ()  
+    FIELDS = ("referent", "cred_def_id", "schema_id", "rev_reg_id", "cred_rev_id")  
+  
+    @property  
+    def attrs(self):  
+        return self._raw.get("attrs", {})  
+  
+def unwrap(record):  
+    """Exchange listings wrap each record in {"cred_ex_record": ...} depending on the endpoint."""  
+    return record.get("cred_ex_record", record)  
+  
+def _filters(**filters):  
+    return {key: value for key, value in filters.items() if value is not None}  
+  
+async def iter_cred_ex_records(client, page_size=RECORDS_PAGE_SIZE, **filters):  
+    """Yield credential exchange records matching server-side filters, one page at a time."""  
+    offset = 0  
+    while True:  
+        resp = await client.get_cred_ex_records(limit=page_size, offset=offset, **_filters(**filters))  
+        page = response_json(resp)["results"]  
+        for record in page:  
+            yield CredExRecord(unwrap(record))  
+        if len(page) < page_size:  
+            return  
+        offset += page_size  
+  
+async def find_cred_ex_record(client, thread_id=None, connection_id=None, role=None, state=None):  
+    """Newest credential exchange record matching the filters, or None.  
+  
+    The agent filters and returns a single record, so the cost does not grow  
+    with the number of exchanges it keeps.  
+    """  
+    params = _filters(thread_id=thread_id, connection_id=connection_id, role=role, state=state)  
+    results = response_json(await client.get_cred_ex_records(limit=1, descending="true", **params))["results"]  
+    return CredExRecord(unwrap(results[0])) if results else None  
+  
+async def find_credential(client, **attributes):  
+    """First credential in a wallet whose attributes have the given values, or None."""  
+    wql = {f"attr::{name}::value": value for name, value in attributes.items()}  
+    results = response_json(await client.get_credentials(wql=dumps_text(wql), count=1))["results"]  
+    return Credential(results[0]) if results else None
\ No newline at end of file
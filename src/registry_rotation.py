@@ -0,0 +1,180 @@
+import asyncio  
+import uuid  
+from .config import ISSUER_URL, REGISTRY_PROVISION_THRESHOLD  
+from .client import get_async_client  
+from .issuer_setup import REVOCATION_REGISTRY_SIZE  
+from .state_store import namespace_for  
+from .utils import load_state, save_states  
+  
+class RegistryError(Exception):  
+    """A revocation registry could not be provisioned or activated."""  
+  
+def issuer_id_of(cred_def_id):  
+    """Issuer DID of a credential definition id (legacy "DID:3:CL:..." or did:indy ".../anoncreds/...")."""  
+    if cred_def_id.startswith("did:"):  
+        return cred_def_id.split("/anoncreds/")[0]  
+    return cred_def_id.split(":")[0]  
+  
+def check(resp, what):  
+    if resp.status_code != 200:  
+        raise RegistryError(f"{what} failed: {resp.status_code} {resp.text}")  
+    return resp.json()  
+  
+class RegistryRotator:  
+    """Keeps a ready revocation registry behind the active one of a cred def.  
+  
+    Issued slots are counted per rev_reg_id, from issuer_cred_rev events when  
+    attached to the bus or through record_issued(), and offers in flight  
+    (reserve/release) count as used. Once the active registry is `threshold`  
+    full, the next registry, as large as the active one, is created, its tails  
+    file uploaded and its revocation list published in the background. When  
+    issued plus in-flight credentials fill the active registry, new issuances  
+    are switched over to it in one call, and offers that would not fit wait  
+    for the switch, so concurrent issuance never overflows a registry. The  
+    registry ids are kept in the cred def's state namespace.  
+    """  
+  
+    def __init__(self, cred_def_id, issuer=None, registry_size=REVOCATION_REGISTRY_SIZE,  
+                 threshold=REGISTRY_PROVISION_THRESHOLD):  
+        self.cred_def_id = cred_def_id  
+        self.issuer = issuer or get_async_client(ISSUER_URL)  
+        self.registry_size = registry_size  
+        self.threshold = threshold  
+        self.namespace = namespace_for(cred_def_id=cred_def_id)  
+        self.active = None  
+        self.standby = None  
+        self.usage = {}  
+        self.sizes = {}  
+        self.switches = 0  
+        self.in_flight = 0  
+        self.last_error = None  
+        self._provisioning = None  
+        self._switching = None  
+        self._lock = asyncio.Lock()  
+  
+    async def start(self):  
+        """Load the active registry and its usage from the agent, and any standby from the state."""  
+        record = check(await self.issuer.get_active_registry(self.cred_def_id), "Active registry lookup")["result"]  
+        self.active = record["revoc_reg_id"]  
+        self.sizes[self.active] = record.get("max_cred_num") or self.registry_size  
+        issued = check(await self.issuer.get_issued_count(self.active), "Issued count")["result"]  
+        self.usage[self.active] = issued  
+        standby = load_state(self.namespace).get("standby_rev_reg_id")  
+        if standby and standby != self.active:  
+            self.standby = standby  
+            self.usage.setdefault(standby, 0)  
+            self.sizes.setdefault(standby, self.sizes[self.active])  
+        self._check(self.active)  
+        return self  
+  
+    def stats(self):  
+        return {  
+            "active": self.active,  
+            "used": self.usage.get(self.active, 0),  
+            "size": self.sizes.get(self.active),  
+            "in_flight": self.in_flight,  
+            "standby": self.standby,  
+            "switches": self.switches  
+        }  
+  
+    def record_issued(self, rev_reg_id=None, count=1):  
+        """Count issued credentials (in the active registry unless rev_reg_id is given)."""  
+        rev_reg_id = rev_reg_id or self.active  
+        self.usage[rev_reg_id] = self.usage.get(rev_reg_id, 0) + count  
+        self._check(rev_reg_id)  
+  
+    async def reserve(self):  
+        """Claim a slot for an offer about to be sent; waits while a full registry is switched.  
+  
+        With no free slot and no switch under way (a previous one failed), the  
+        switch is retried; raises RegistryError if it fails, rather than  
+        overflowing the active registry.  
+        """  
+        while self._free() <= 0:  
+            if self._switching is None:  
+                self._check(self.active)  
+            try:  
+                await asyncio.shield(self._switching)  
+            except Exception as e:  
+                raise RegistryError(f"Registry {self.active} is full and the switch failed: {e}") from e  
+        self.in_flight += 1  
+        self._check(self.active)  
+  
+    def release(self):  
+        """The offer of a reserve() is done (issued or failed)."""  
+        self.in_flight = max(0, self.in_flight - 1)  
+  
+    def _free(self):  
+        size = self.sizes.get(self.active, self.registry_size)  
+        return size - self.usage.get(self.active, 0) - self.in_flight  
+  
+    def on_event(self, agent, topic, payload):  
+        if payload.get("state") == "issued" and payload.get("cred_def_id") == self.cred_def_id:  
+            self.record_issued(payload.get("rev_reg_id"))  
+  
+    def attach(self, bus):  
+        bus.subscribe("issuer_cred_rev", self.on_event)  
+  
+    def _check(self, rev_reg_id):  
+        if rev_reg_id != self.active:  
+            return  
+        used, size = self.usage.get(rev_reg_id, 0) + self.in_flight, self.sizes.get(rev_reg_id, self.registry_size)  
+        if used >= size * self.threshold and self.standby is None and self._provisioning is None:  
+            self._provisioning = self._spawn(self._provision())  
+        if used >= size and self._switching is None:  
+            self._switching = self._spawn(self.rotate())  
+  
+    def _spawn(self, coro):  
+        # Background work: failures are kept in last_error  
+        future = asyncio.ensure_future(coro)  
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  
+        return future  
+  
+    async def _provision(self):  
+        try:  
+            size = self.sizes.get(self.active, self.registry_size)  
+            payload = {  
+                "revocation_registry_definition": {  
+                    "credDefId": self.cred_def_id,  
+                    "issuerId": issuer_id_of(self.cred_def_id),  
+                    "tag": uuid.uuid4().hex[:8],  
+                    "maxCredNum": size  
+                },  
+                "options": {}  
+            }  
+            state = check(await self.issuer.create_rev_reg_def(payload),  
+                          "Registry creation")["revocation_registry_definition_state"]  
+            rev_reg_id = state["revocation_registry_definition_id"]  
+            check(await self.issuer.upload_tails(rev_reg_id), "Tails upload")  
+            check(await self.issuer.create_rev_list(rev_reg_id), "Revocation list publication")  
+            self.standby = rev_reg_id  
+            self.usage[rev_reg_id] = 0  
+            self.sizes[rev_reg_id] = size  
+            self._save()  
+            return rev_reg_id  
+        except Exception as e:  
+            self.last_error = e  
+            raise  
+        finally:  
+            self._provisioning = None  
+  
+    async def rotate(self):  
+        """Make the standby registry the active one, provisioning it first if needed."""  
+        try:  
+            async with self._lock:  
+                if self.standby is None:  
+                    # Not ready in time: provision inline (the slow path this class avoids)  
+                    await (self._provisioning or self._provision())  
+                check(await self.issuer.set_active_registry(self.standby), "Registry activation")  
+                self.active, self.standby = self.standby, None  
+                self.switches += 1  
+                self._save()  
+                return self.active  
+        except Exception as e:  
+            self.last_error = e  
+            raise  
+        finally:  
+            self._switching = None  
+  
+    def _save(self):  
+        save_states({"active_rev_reg_id": self.active, "standby_rev_reg_id": self.standby}, namespace=self.namespace)
\ No newline at end of file
@@ -1,34 +1,294 @@
+import asyncio  
+import contextvars  
+import inspect  
+import threading  
 import time  
 import random  
+from contextlib import contextmanager  
 from functools import wraps  
 from typing import Callable, Type, Tuple  
+from .config import (CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, RETRY_BUDGET_RATIO,  
+                     RETRY_BUDGET_MIN_PER_SECOND)  
+  
+# HTTP statuses worth retrying; any other status fails at once  
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})  
+  
+class CircuitOpenError(Exception):  
+    """The endpoint's circuit breaker is open: the call was not attempted."""  
+  
+class DeadlineExceeded(TimeoutError):  
+    """The caller's deadline passed before the call could be made."""  
+  
+def status_code_of(exc):  
+    """HTTP status carried by an exception (requests/httpx style), or None."""  
+    return getattr(getattr(exc, "response", None), "status_code", None)  
+  
+def is_retryable(exc):  
+    """Network errors and RETRYABLE_STATUS responses are retried; 4xx and breaker/deadline errors are not."""  
+    if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):  
+        return False  
+    status = status_code_of(exc)  
+    return status is None or status in RETRYABLE_STATUS  
+  
+# Deadlines: absolute time.monotonic() values, inherited by asyncio tasks  
+_deadline = contextvars.ContextVar("retry_deadline", default=None)  
+  
+@contextmanager  
+def deadline(seconds):  
+    """Bound everything inside the block (retries, sleeps, HTTP timeouts) to `seconds`.  
+  
+    Nested deadlines can only shorten the outer one.  
+    """  
+    current = _deadline.get()  
+    new = time.monotonic() + seconds  
+    token = _deadline.set(new if current is None else min(current, new))  
+    try:  
+        yield  
+    finally:  
+        _deadline.reset(token)  
+  
+def remaining_time():  
+    """Seconds left before the current deadline, or None without one."""  
+    current = _deadline.get()  
+    return None if current is None else current - time.monotonic()  
+  
+def within_deadline(connect, read):  
+    """(connect, read) timeouts capped to the remaining time; raises DeadlineExceeded if none is left."""  
+    remaining = remaining_time()  
+    if remaining is None:  
+        return connect, read  
+    if remaining <= 0:  
+        raise DeadlineExceeded("Deadline exceeded")  
+    return min(connect, remaining), min(read, remaining)  
+  
+class CircuitBreaker:  
+    """Closed / open / half-open breaker for one endpoint.  
+  
+    After failure_threshold consecutive failures the circuit opens and calls  
+    fail fast with CircuitOpenError. After reset_timeout seconds one trial  
+    call is let through (half-open): success closes the circuit, failure  
+    opens it again.  
+    """  
+  
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"  
+  
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT,  
+                 clock=time.monotonic):  
+        self.name = name  
+        self.failure_threshold = failure_threshold  
+        self.reset_timeout = reset_timeout  
+        self.clock = clock  
+        self.state = self.CLOSED  
+        self.failures = 0  
+        self._opened_at = None  
+        self._trial = False  
+        self._lock = threading.Lock()  
+  
+    def before_call(self):  
+        """Raise CircuitOpenError unless a call may go through now."""  
+        with self._lock:  
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:  
+                self.state = self.HALF_OPEN  
+                self._trial = False  
+            if self.state == self.CLOSED:  
+                return  
+            if self.state == self.HALF_OPEN and not self._trial:  
+                self._trial = True  
+                return  
+            raise CircuitOpenError(f"Circuit '{self.name}' is {self.state}")  
+  
+    def record_success(self):  
+        with self._lock:  
+            self.state = self.CLOSED  
+            self.failures = 0  
+            self._trial = False  
+  
+    def release_trial(self):  
+        """End a half-open trial without an outcome (cancelled, or a failure that says nothing about the endpoint)."""  
+        with self._lock:  
+            self._trial = False  
+  
+    def record_failure(self):  
+        with self._lock:  
+            self.failures += 1  
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:  
+                self.state = self.OPEN  
+                self._opened_at = self.clock()  
+                self._trial = False  
+  
+class RetryBudget:  
+    """Retries allowed as a fraction of requests, shared by every caller.  
+  
+    Each request deposits `ratio` tokens and each retry spends one, so during  
+    an outage retries add at most `ratio` extra load. min_per_second tokens  
+    trickle in over time so a quiet client can still retry.  
+    """  
+  
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, min_per_second=RETRY_BUDGET_MIN_PER_SECOND, clock=time.monotonic):  
+        self.ratio = ratio  
+        self.min_per_second = min_per_second  
+        self.capacity = max(10.0, 10 * min_per_second)  
+        self.clock = clock  
+        self.tokens = float(min_per_second)  
+        self._updated = clock()  
+        self._lock = threading.Lock()  
+  
+    def _refill(self):  
+        now = self.clock()  
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.min_per_second)  
+        self._updated = now  
+  
+    def record_request(self):  
+        with self._lock:  
+            self._refill()  
+            self.tokens = min(self.capacity, self.tokens + self.ratio)  
+  
+    def try_spend(self):  
+        """Take one retry from the budget; False if it is exhausted."""  
+        with self._lock:  
+            self._refill()  
+            if self.tokens < 1:  
+                return False  
+            self.tokens -= 1  
+            return True  
+  
+_breakers = {}  
+_budget = RetryBudget()  
+_registry_lock = threading.Lock()  
+  
+def get_circuit_breaker(name):  
+    """Shared circuit breaker for an endpoint name."""  
+    with _registry_lock:  
+        if name not in _breakers:  
+            _breakers[name] = CircuitBreaker(name)  
+        return _breakers[name]  
+  
+def get_retry_budget():  
+    """Process-wide retry budget."""  
+    return _budget  
+  
+def reset_retry_state():  
+    """Forget every circuit breaker and refill the shared retry budget."""  
+    global _budget  
+    with _registry_lock:  
+        _breakers.clear()  
+        _budget = RetryBudget()  
   
 def retry_with_backoff(  
     max_attempts: int = 3,  
     initial_delay: float = 1.0,  
     max_delay: float = 10.0,  
     backoff_factor: float = 2.0,  
-    exceptions: Tuple[Type[Exception], ...] = (Exception,)  
+    exceptions: Tuple[Type[Exception], ...] = (Exception,),  
+    retryable: Callable[[Exception], bool] = is_retryable,  
+    circuit: str = None,  
+    budget: RetryBudget = None  
 ):  
+    """Retry with exponential backoff and jitter.  
+  
+    Only exceptions that `retryable` accepts are retried, and only while the  
+    retry budget (the shared one unless given) allows it and the sleep fits  
+    in the current deadline(). With `circuit`, calls go through the named  
+    endpoint's circuit breaker. An Exception outside `exceptions` is not  
+    retried but still counts as a breaker failure; only cancellation and other  
+    non-Exception BaseExceptions leave the breaker's state alone. Each call  
+    deposits one request in the retry budget, however many attempts it makes.  
+    """  
+    def next_sleep(delay):  
+        # Jitter to avoid thundering herd  
+        jitter = random.uniform(0.1, 0.3) * delay  
+        return min(delay + jitter, max_delay)  
+  
+    def before_attempt():  
+        remaining = remaining_time()  
+        if remaining is not None and remaining <= 0:  
+            raise DeadlineExceeded("Deadline exceeded before the call")  
+        if circuit:  
+            get_circuit_breaker(circuit).before_call()  
+  
+    def after_failure(e, attempt, delay):  
+        """Seconds to sleep before the next attempt, or None to give up."""  
+        can_retry = retryable(e)  
+        if circuit:  
+            breaker = get_circuit_breaker(circuit)  
+            if can_retry:  
+                breaker.record_failure()  
+            else:  
+                # A 4xx says nothing about the endpoint's health: keep the state  
+                breaker.release_trial()  
+            # Stop as soon as this failure opened the circuit  
+            can_retry = can_retry and breaker.state == CircuitBreaker.CLOSED  
+        if not can_retry or attempt == max_attempts - 1:  
+            return None  
+        pause = next_sleep(delay)  
+        remaining = remaining_time()  
+        if remaining is not None and pause >= remaining:  
+            return None  
+        if not (budget or get_retry_budget()).try_spend():  
+            return None  
+        return pause  
+  
+    def after_success():  
+        if circuit:  
+            get_circuit_breaker(circuit).record_success()  
+  
+    def after_abort(e):  
+        if circuit:  
+            breaker = get_circuit_breaker(circuit)  
+            if isinstance(e, Exception):  
+                # An unexpected error from the dependency is still a failure  
+                breaker.record_failure()  
+            else:  
+                # Cancelled or interrupted: free the half-open trial  
+                breaker.release_trial()  
+  
     def decorator(func: Callable):  
+        if inspect.iscoroutinefunction(func):  
+            @wraps(func)  
+            async def async_wrapper(*args, **kwargs):  
+                delay = initial_delay  
+                (budget or get_retry_budget()).record_request()  
+  
+                for attempt in range(max_attempts):  
+                    before_attempt()  
+                    try:  
+                        result = await func(*args, **kwargs)  
+                    except exceptions as e:  
+                        pause = after_failure(e, attempt, delay)  
+                        if pause is None:  
+                            raise  
+  
+                        await asyncio.sleep(pause)  
+                        delay *= backoff_factor  
+                    except BaseException as e:  
+                        after_abort(e)  
+                        raise  
+                    else:  
+                        after_success()  
+                        return result  
+            return async_wrapper  
+  
         @wraps(func)  
         def wrapper(*args, **kwargs):  
             delay = initial_delay  
-            last_exception = None  
+            (budget or get_retry_budget()).record_request()  
   
             for attempt in range(max_attempts):  
+                before_attempt()  
                 try:  
-                    return func(*args, **kwargs)  
+                    result = func(*args, **kwargs)  
                 except exceptions as e:  
-                    last_exception = e  
-                    if attempt == max_attempts - 1:  
-                        break  
+                    pause = after_failure(e, attempt, delay)  
+                    if pause is None:  
+                        raise  
   
-                    # Jitter to avoid thundering herd  
-                    jitter = random.uniform(0.1, 0.3) * delay  
-                    time.sleep(min(delay + jitter, max_delay))  
+                    time.sleep(pause)  
                     delay *= backoff_factor  
-  
-            raise last_exception  
+                except BaseException as e:  
+                    after_abort(e)  
+                    raise  
+                else:  
+                    after_success()  
+                    return result  
         return wrapper  
     return decorator
\ No newline at end of file
@@ -0,0 +1,198 @@
+from .issuer_setup import REVOCATION_REGISTRY_SIZE  
+from .state_store import DEFAULT_NAMESPACE  
+from .utils import find_credential_records  
+from .verification_cache import REVOCATION_TOPICS  
+  
+def revoked_slot(topic, payload):  
+    """(rev_reg_id, cred_rev_id) a revocation event refers to, or None if it is not one."""  
+    if topic not in REVOCATION_TOPICS:  
+        return None  
+    state = REVOCATION_TOPICS[topic]  
+    if state and payload.get("state") != state:  
+        return None  
+    if payload.get("rev_reg_id") and payload.get("cred_rev_id") is not None:  
+        return payload["rev_reg_id"], int(payload["cred_rev_id"])  
+    # Revocation notifications carry "<format>::<rev_reg_id>::<cred_rev_id>"  
+    parts = str(payload.get("thread_id", "")).split("::")  
+    return (parts[1], int(parts[2])) if len(parts) == 3 and parts[2].isdigit() else None  
+  
+class RevocationIndex:  
+    """Revoked slots of each revocation registry as a bitset.  
+  
+    Each rev_reg_id gets a bytearray with one bit per cred_rev_id (125  
+    bytes for a 1000-slot registry, grown on demand), so is_revoked() is a  
+    dict lookup and a bit test. Slots are set from revocation events  
+    (attach), the credential records marked revoked in the state store, the  
+    registry's revocation list, and the registry's issued records on the  
+    issuer. Verifier-side connections bound to the credential they last  
+    presented (bind, bind_exchange) can be pre-screened before a presentation  
+    exchange, until the person is issued a credential that is not revoked.  
+    """  
+  
+    def __init__(self, registry_size=REVOCATION_REGISTRY_SIZE):  
+        self.registry_size = registry_size  
+        self._bits = {}  
+        self._bindings = {}  
+        # (rev_reg_id, person_hash) -> cred_rev_id of issued credentials  
+        self._slots = {}  
+        # person_hash -> (rev_reg_id, cred_rev_id) of a credential issued and not revoked  
+        self._current = {}  
+  
+    def __len__(self):  
+        """Number of revoked slots across all registries."""  
+        return sum(bin(byte).count("1") for bits in self._bits.values() for byte in bits)  
+  
+    def _bitset(self, rev_reg_id, cred_rev_id):  
+        bits = self._bits.get(rev_reg_id)  
+        if bits is None:  
+            bits = self._bits[rev_reg_id] = bytearray((self.registry_size >> 3) + 1)  
+        if cred_rev_id >> 3 >= len(bits):  
+            bits.extend(bytes((cred_rev_id >> 3) + 1 - len(bits)))  
+        return bits  
+  
+    def mark_revoked(self, rev_reg_id, cred_rev_id):  
+        cred_rev_id = int(cred_rev_id)  
+        self._bitset(rev_reg_id, cred_rev_id)[cred_rev_id >> 3] |= 1 << (cred_rev_id & 7)  
+  
+    def is_revoked(self, rev_reg_id, cred_rev_id):  
+        bits = self._bits.get(rev_reg_id)  
+        if bits is None:  
+            return False  
+        cred_rev_id = int(cred_rev_id)  
+        return cred_rev_id >> 3 < len(bits) and bool(bits[cred_rev_id >> 3] & (1 << (cred_rev_id & 7)))  
+  
+    def revoked_count(self, rev_reg_id):  
+        return sum(bin(byte).count("1") for byte in self._bits.get(rev_reg_id, b""))  
+  
+    def apply_revocation_list(self, rev_reg_id, revocation_list):  
+        """Replace a registry's bitset with a ledger revocation list (one 0/1 per slot, index = cred_rev_id)."""  
+        bits = bytearray((len(revocation_list) >> 3) + 1)  
+        for cred_rev_id, revoked in enumerate(revocation_list):  
+            if revoked:  
+                bits[cred_rev_id >> 3] |= 1 << (cred_rev_id & 7)  
+        self._bits[rev_reg_id] = bits  
+  
+    def apply_delta(self, rev_reg_id, revoked):  
+        """Mark the cred_rev_ids revoked by a ledger delta."""  
+        for cred_rev_id in revoked:  
+            self.mark_revoked(rev_reg_id, cred_rev_id)  
+  
+    def load_records(self, namespace=DEFAULT_NAMESPACE):  
+        """Load the credential records of the state store; returns how many are revoked.  
+  
+        Revoked records are marked. The slot of every record with a  
+        person_hash is kept, so bind_exchange() can bind the verifier  
+        connections presenting it and prescreen() knows when a person was  
+        issued a new credential. The records' connection ids are the  
+        issuer's, so no connection is bound here.  
+        """  
+        loaded = 0  
+        for record in find_credential_records(namespace):  
+            rev_reg_id, cred_rev_id = record.get("rev_reg_id"), record.get("cred_rev_id")  
+            if not rev_reg_id or cred_rev_id is None:  
+                continue  
+            revoked = record.get("state") == "revoked"  
+            person_hash = record.get("person_hash")  
+            if person_hash:  
+                self._slots[(rev_reg_id, person_hash)] = int(cred_rev_id)  
+                if not revoked:  
+                    self._current[person_hash] = (rev_reg_id, int(cred_rev_id))  
+            if revoked:  
+                self.mark_revoked(rev_reg_id, cred_rev_id)  
+                loaded += 1  
+        return loaded  
+  
+    async def sync_revocation_list(self, client, rev_reg_id):  
+        """Replace a registry's bitset with its current revocation list; returns the revoked count.  
+  
+        Reads the registry's `revocation_list` (GET  
+        /anoncreds/revocation/registry/{id}), so it works against any agent  
+        that resolves the registry, not only the issuer. Returns None if no  
+        revocation list is available.  
+        """  
+        resp = await client.get_registry(rev_reg_id)  
+        if resp.status_code != 200:  
+            return None  
+        rev_list = ((resp.json().get("result") or {}).get("revocation_list") or {}).get("revocationList")  
+        if rev_list is None:  
+            return None  
+        self.apply_revocation_list(rev_reg_id, rev_list)  
+        return self.revoked_count(rev_reg_id)  
+  
+    async def sync_registry(self, issuer, rev_reg_id):  
+        """Mark the revoked slots of a registry from the issuer's issued records; returns how many."""  
+        resp = await issuer.get_issued_details(rev_reg_id)  
+        if resp.status_code != 200:  
+            return 0  
+        revoked = [int(r["cred_rev_id"]) for r in resp.json() if r.get("state") == "revoked"]  
+        self.apply_delta(rev_reg_id, revoked)  
+        return len(revoked)  
+  
+    def bind(self, conn_id, rev_reg_id, cred_rev_id, person_hash=None):  
+        """Remember which credential a connection presents, for prescreen()."""  
+        self._bindings[conn_id] = (rev_reg_id, int(cred_rev_id), person_hash)  
+  
+    def unbind(self, conn_id):  
+        self._bindings.pop(conn_id, None)  
+  
+    def bind_presentation(self, conn_id, presentation):  
+        """Bind a connection to the credential of an AnonCreds presentation it sent.  
+  
+        The slot is the identifier's cred_rev_id when the presentation  
+        discloses it, else the issued credential (see load_records) with the  
+        same rev_reg_id and revealed person_hash. Returns True if bound.  
+        """  
+        person_hash = None  
+        groups = (presentation.get("requested_proof") or {}).get("revealed_attr_groups") or {}  
+        for group in groups.values():  
+            person_hash = person_hash or ((group.get("values") or {}).get("person_hash") or {}).get("raw")  
+        for identifier in presentation.get("identifiers") or []:  
+            rev_reg_id = identifier.get("rev_reg_id")  
+            cred_rev_id = identifier.get("cred_rev_id")  
+            if cred_rev_id is None:  
+                cred_rev_id = self._slots.get((rev_reg_id, person_hash))  
+            if rev_reg_id and cred_rev_id is not None:  
+                self.bind(conn_id, rev_reg_id, cred_rev_id, person_hash)  
+                return True  
+        return False  
+  
+    async def bind_exchange(self, verifier, conn_id, pres_ex_id):  
+        """Bind a verifier-side connection from a presentation exchange the verifier received.  
+  
+        Every presentation re-binds the connection: the credential presented  
+        last is the one that counts. A verified presentation whose slot is  
+        unknown drops the previous binding.  
+        """  
+        resp = await verifier.get_pres_ex_record(pres_ex_id)  
+        if resp.status_code != 200:  
+            return False  
+        record = resp.json()  
+        presentation = ((record.get("by_format") or {}).get("pres") or {}).get("anoncreds") or {}  
+        if self.bind_presentation(conn_id, presentation):  
+            return True  
+        if str(record.get("verified")).lower() == "true":  
+            self.unbind(conn_id)  
+        return False  
+  
+    def prescreen(self, conn_id):  
+        """rev_reg_id of the connection's credential if it is known to be revoked, else None.  
+  
+        A person issued a credential since (see load_records) is not  
+        pre-screened, so the next exchange shows which credential they hold.  
+        """  
+        binding = self._bindings.get(conn_id)  
+        if binding is None or not self.is_revoked(binding[0], binding[1]):  
+            return None  
+        current = self._current.get(binding[2]) if binding[2] else None  
+        if current is not None and not self.is_revoked(*current):  
+            return None  
+        return binding[0]  
+  
+    def attach(self, bus):  
+        """Mark slots on revocation events published on an event bus."""  
+        def on_event(agent, topic, payload):  
+            slot = revoked_slot(topic, payload)  
+            if slot:  
+                self.mark_revoked(*slot)  
+        bus.subscribe("*", on_event)  
+        return on_event
\ No newline at end of file
@@ -1,9 +1,31 @@
-import requests  
 import json  
 import sys  
 import time  
 from .config import ISSUER_URL, HOLDER_URL  
-from .utils import load_state, save_state  
+from .client import get_client, get_async_client, run_async  
+from .utils import load_state, save_state, find_credential_records, save_credential_record  
+  
+async def revoke(rev_reg_id, cred_rev_id, publish=True, issuer=None):  
+    """Revoke one credential on the Issuer.  
+  
+    Returns (status_code, text) of the revocation call.  
+    """  
+    resp = await revoke_response(rev_reg_id, cred_rev_id, publish, issuer)  
+    return resp.status_code, resp.text  
+  
+async def revoke_response(rev_reg_id, cred_rev_id, publish=True, issuer=None):  
+    """Revoke one credential on the Issuer and return the admin API response."""  
+    issuer = issuer or get_async_client(ISSUER_URL)  
+  
+    # REMOVE connection_id - not required for published revocation  
+    revoke_payload = {  
+        "rev_reg_id": rev_reg_id,  
+        "cred_rev_id": cred_rev_id,  
+        "publish": publish,  
+        "notify": False  
+    }  
+  
+    return await issuer.revoke(revoke_payload)  
   
 def main():  
     print("### 5. REVOKING CREDENTIAL (ANONCREDS MANUAL) ###")  
@@ -11,7 +33,7 @@ def main():
     # 1. Fetch credential from Holder (more reliable)  
     print("   Fetching credential from Holder...")  
     try:  
-        creds_resp = requests.get(f"{HOLDER_URL}/credentials")  
+        creds_resp = get_client(HOLDER_URL).get_credentials(count=1)  
         if creds_resp.status_code != 200:  
             print("❌ Error fetching credentials from Holder")  
             return  
@@ -36,26 +58,20 @@ def main():
     # 2. Send Revocation Request  
     print("   Sending revocation order...")  
   
-    # REMOVE connection_id - not required for published revocation  
-    revoke_payload = {  
-        "rev_reg_id": rev_reg_id,  
-        "cred_rev_id": cred_rev_id,  
-        "publish": True,  
-        "notify": False  # Add this line  
-    }  
-  
     try:  
-        revoke_resp = requests.post(f"{ISSUER_URL}/anoncreds/revocation/revoke", json=revoke_payload)  
+        status_code, text = run_async(revoke(rev_reg_id, cred_rev_id))  
   
-        if revoke_resp.status_code == 200:  
+        if status_code == 200:  
             print("\n   ✅ SUCCESS: Credential REVOKED and published to Ledger!")  
+            for record in find_credential_records(rev_reg_id=rev_reg_id, cred_rev_id=cred_rev_id):  
+                save_credential_record({"cred_ex_id": record["cred_ex_id"], "state": "revoked"})  
             print("   -----------------------------------------------------")  
             print("   FINAL TEST: Run 'script 4' now.")  
             print("   The Bank MUST deny access (Invalid Signature).")  
             print("   -----------------------------------------------------")  
         else:  
-            print(f"\n❌ Revocation failed: {revoke_resp.status_code}")  
-            print(f"Details: {revoke_resp.text}")  
+            print(f"\n❌ Revocation failed: {status_code}")  
+            print(f"Details: {text}")  
   
     except Exception as e:  
         print(f"❌ Exception: {e}")  
@@ -1,12 +1,16 @@
-from pydantic import BaseModel, Field, field_validator  
-from typing import Optional  
+from pydantic import BaseModel, Field, StringConstraints, TypeAdapter, ValidationError, field_validator  
+from typing import List, Optional  
+from typing_extensions import Annotated, NotRequired, TypedDict  
 import time  
   
+SCORE_PATTERN = r'^\d{1,3}(\.\d)?$'  
+CONTROLLER_DID_PATTERN = r'^did:sov:[a-zA-Z0-9]+$'  
+  
 class CredentialAttributes(BaseModel):  
     person_hash: str = Field(..., min_length=8, max_length=128)  
-    biometric_score: str = Field(..., pattern=r'^\d{1,3}(\.\d)?$')  
+    biometric_score: str = Field(..., pattern=SCORE_PATTERN)  
     timestamp: str = Field(default_factory=lambda: str(int(time.time())))  
-    controller_did: str = Field(..., pattern=r'^did:sov:[a-zA-Z0-9]+$')  
+    controller_did: str = Field(..., pattern=CONTROLLER_DID_PATTERN)  
   
     @field_validator('biometric_score')  
     @classmethod  
@@ -16,6 +20,59 @@ class CredentialAttributes(BaseModel):
             raise ValueError('Score must be between 0 and 100')  
         return v  
   
+class CredentialAttributesRow(TypedDict):  
+    """CredentialAttributes as a plain dict, for validate_attributes_batch."""  
+    person_hash: Annotated[str, StringConstraints(min_length=8, max_length=128)]  
+    biometric_score: Annotated[str, StringConstraints(pattern=SCORE_PATTERN)]  
+    timestamp: NotRequired[str]  
+    controller_did: Annotated[str, StringConstraints(pattern=CONTROLLER_DID_PATTERN)]  
+  
+_ATTRIBUTE_ROWS = TypeAdapter(List[CredentialAttributesRow])  
+  
+def validate_attributes_batch(rows, chunk_size=10000):  
+    """Validate many CredentialAttributes dicts, a chunk at a time.  
+  
+    Each chunk is checked by one list validation in pydantic-core, without  
+    building a model per row, then the score range is checked in a single  
+    pass. Rows with errors are validated by CredentialAttributes itself for  
+    the same message. Returns (valid, errors): (index, validated dict with  
+    timestamp set) and (index, error message) pairs, in row order.  
+  
+    The gain depends on how clean the rows are (benchmark_validation, 20,000  
+    rows, pydantic 2.14): about 4x the per-object rate with no invalid rows,  
+    but only 1.2x to 2x with 5% invalid. A chunk with errors is validated a  
+    second time without them, and invalid rows still go through the model  
+    for their message. That is the same work the per-object path pays for  
+    them. Onboarding files are mostly valid, so the separate schema is kept.  
+    """  
+    rows = list(rows)  
+    valid, errors = [], []  
+    for start in range(0, len(rows), chunk_size):  
+        chunk = rows[start:start + chunk_size]  
+        try:  
+            good = range(len(chunk))  
+            validated = _ATTRIBUTE_ROWS.validate_python(chunk)  
+        except ValidationError as e:  
+            bad = {error["loc"][0] for error in e.errors()}  
+            good = [i for i in range(len(chunk)) if i not in bad]  
+            validated = _ATTRIBUTE_ROWS.validate_python([chunk[i] for i in good])  
+        timestamp = str(int(time.time()))  
+        accepted = set()  
+        for i, row in zip(good, validated):  
+            if float(row["biometric_score"]) <= 100:  
+                row.setdefault("timestamp", timestamp)  
+                valid.append((start + i, row))  
+                accepted.add(i)  
+        for i in range(len(chunk)):  
+            if i in accepted:  
+                continue  
+            try:  
+                valid.append((start + i, CredentialAttributes(**chunk[i]).model_dump()))  
+            except ValidationError as e:  
+                errors.append((start + i, str(e)))  
+    valid.sort(key=lambda item: item[0])  
+    return valid, errors  
+  
 class ProofRequest(BaseModel):  
     connection_id: str  
     presentation_request: dict  
@@ -25,4 +82,19 @@ class ProofRequest(BaseModel):
     def validate_connection_id(cls, v):  
         if not v or len(v) < 10:  
             raise ValueError('Invalid connection ID')  
-        return v
\ No newline at end of file
+        return v  
+  
+class CredDefSpec(BaseModel):  
+    tag: str = Field(..., min_length=1)  
+    support_revocation: bool = True  
+    revocation_registry_size: int = Field(1000, ge=4, le=32768)  
+  
+class SchemaSpec(BaseModel):  
+    name: str = Field(..., min_length=1)  
+    version: str = Field(..., pattern=r'^\d+(\.\d+)*$')  
+    attributes: List[str] = Field(..., min_length=1)  
+    issuer: str = "issuer"  # agent name in AGENT_URLS, or an admin URL  
+    cred_defs: List[CredDefSpec] = []  
+  
+class CredentialCatalog(BaseModel):  
+    schemas: List[SchemaSpec]
\ No newline at end of file
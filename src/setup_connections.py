@@ -1,33 +1,188 @@
-import requests  
+import asyncio  
 import time  
-from .config import ISSUER_URL, HOLDER_URL, VERIFIER_URL  
+from .config import (ISSUER_URL, HOLDER_URL, VERIFIER_URL, USE_WEBHOOKS, BOOTSTRAP_CONCURRENCY,  
+                     CONNECTION_READY_TIMEOUT, CONNECTION_POLL_INTERVAL)  
+from .client import get_async_client, run_async  
+from .connections import CLOSED_STATES, get_connection_resolver  
 from .utils import save_state  
+from .webhooks import webhook_events  
   
-def connect_agents(inviter_url, invitee_url, alias_inviter, alias_invitee):  
-    print(f"--- Connecting {alias_inviter} -> {alias_invitee} ---")  
+# Connection states meaning the handshake is complete (RFC 23 "completed" = "active")  
+READY_STATES = {"active", "completed"}  
+  
+class ConnectionNotReady(Exception):  
+    """A connection did not become active in time, or was closed."""  
+  
+def _client(agent):  
+    return get_async_client(agent) if isinstance(agent, str) else agent  
+  
+async def _fetch_connection(client, conn_id=None, filters=None):  
+    if conn_id is not None:  
+        resp = await client.get_connection(conn_id)  
+        return resp.json() if resp.status_code == 200 else None  
+    results = (await client.get_connections(**filters)).json()['results']  
+    return results[0] if results else None  
+  
+async def wait_until_active(client, conn_id=None, invitation_msg_id=None, their_did=None, bus=None,  
+                            timeout=CONNECTION_READY_TIMEOUT, poll_interval=CONNECTION_POLL_INTERVAL):  
+    """Wait for a connection (by id, by the invitation it answers or by the peer's DID) to become active.  
+  
+    Uses connection events when a bus is given, otherwise polls every  
+    poll_interval seconds. Returns the connection record; raises  
+    ConnectionNotReady on timeout or if the connection is closed.  
+    """  
+    filters = {k: v for k, v in (("invitation_msg_id", invitation_msg_id), ("their_did", their_did)) if v}  
+    deadline = time.monotonic() + timeout  
+    wanted = READY_STATES | CLOSED_STATES  
+    record = None  
+    while True:  
+        record = await _fetch_connection(client, conn_id, filters)  
+        if record is not None:  
+            conn_id = record["connection_id"]  
+            if record.get("state") in wanted:  
+                break  
+        remaining = deadline - time.monotonic()  
+        if remaining <= 0:  
+            break  
+        if bus is not None and conn_id is not None:  
+            try:  
+                record = await bus.wait_for_state("connections", conn_id, wanted, remaining)  
+                break  
+            except asyncio.TimeoutError:  
+                continue  
+        await asyncio.sleep(min(poll_interval, remaining))  
+  
+    state = record.get("state") if record else None  
+    if state not in READY_STATES:  
+        raise ConnectionNotReady(f"Connection {conn_id or invitation_msg_id or their_did} is '{state}' "  
+                                 f"after {timeout}s")  
+    return record  
+  
+async def connect_pair(inviter, invitee, alias_inviter, alias_invitee, bus=None,  
+                       timeout=CONNECTION_READY_TIMEOUT, poll_interval=CONNECTION_POLL_INTERVAL):  
+    """Create an invitation, have the invitee accept it and wait until both sides are active.  
+  
+    inviter and invitee are agent URLs or clients. Returns the connection ids  
+    on both sides.  
+    """  
+    inviter, invitee = _client(inviter), _client(invitee)  
+    invite = (await inviter.create_invitation(  
+        {"alias": alias_inviter, "handshake_protocols": ["https://didcomm.org/didexchange/1.0"]})).json()  
+    oob = (await invitee.receive_invitation(invite["invitation"], alias=alias_invitee)).json()  
   
-    # 1. Create invitation  
-    invite = requests.post(f"{inviter_url}/out-of-band/create-invitation",  
-                           json={"alias": alias_inviter, "handshake_protocols": ["https://didcomm.org/didexchange/1.0"]}).json()  
+    invitee_record, inviter_record = await asyncio.gather(  
+        wait_until_active(invitee, conn_id=oob["connection_id"], bus=bus,  
+                          timeout=timeout, poll_interval=poll_interval),  
+        wait_until_active(inviter, invitation_msg_id=invite["invi_msg_id"], bus=bus,  
+                          timeout=timeout, poll_interval=poll_interval))  
+    return {  
+        "alias": alias_inviter,  
+        "inviter_conn_id": inviter_record["connection_id"],  
+        "invitee_conn_id": invitee_record["connection_id"]  
+    }  
   
-    # 2. Accept invitation  
-    requests.post(f"{invitee_url}/out-of-band/receive-invitation",  
-                  json=invite["invitation"],  
-                  params={"alias": alias_invitee})  
+async def connect_with_invitation(invite, inviter, invitee, alias_invitee, bus=None,  
+                                  timeout=CONNECTION_READY_TIMEOUT, poll_interval=CONNECTION_POLL_INTERVAL):  
+    """Have the invitee accept an existing (pooled, possibly multi-use) invitation.  
   
-    print("   Invitation accepted. Awaiting synchronization...")  
-    time.sleep(3)  # Time for handshake  
+    The inviter's side is found through the invitee's DID, since every  
+    connection answering a multi-use invitation shares its message id.  
+    """  
+    inviter, invitee = _client(inviter), _client(invitee)  
+    oob = (await invitee.receive_invitation(invite["invitation"], alias=alias_invitee)).json()  
+    invitee_record = await wait_until_active(invitee, conn_id=oob["connection_id"], bus=bus,  
+                                             timeout=timeout, poll_interval=poll_interval)  
+    inviter_record = await wait_until_active(inviter, their_did=invitee_record["my_did"], bus=bus,  
+                                             timeout=timeout, poll_interval=poll_interval)  
+    return {  
+        "inviter_conn_id": inviter_record["connection_id"],  
+        "invitee_conn_id": invitee_record["connection_id"]  
+    }  
+  
+async def bootstrap_connections(pairs, concurrency=BOOTSTRAP_CONCURRENCY, bus=None,  
+                                timeout=CONNECTION_READY_TIMEOUT, poll_interval=CONNECTION_POLL_INTERVAL,  
+                                pools=None):  
+    """Connect many (inviter, invitee, alias_inviter, alias_invitee) pairs at once.  
+  
+    At most `concurrency` handshakes are in flight. pools maps an inviter to  
+    an InvitationPool whose invitations are used instead of creating one per  
+    pair. Returns (results, summary) like bulk_issue.issue_bulk: one result  
+    per pair, in input order, with "ok" and either the connection ids or  
+    "error".  
+    """  
+    pools = pools or {}  
+    pending = enumerate(pairs)  
+    results = []  
+    resolver = get_connection_resolver()  
+  
+    async def worker():  
+        for index, (inviter, invitee, alias_inviter, alias_invitee) in pending:  
+            item = {"index": index, "alias": alias_inviter}  
+            try:  
+                pool = pools.get(inviter)  
+                if pool is not None:  
+                    item.update(await connect_with_invitation(await pool.get(), inviter, invitee, alias_invitee,  
+                                                              bus=bus, timeout=timeout, poll_interval=poll_interval))  
+                else:  
+                    item.update(await connect_pair(inviter, invitee, alias_inviter, alias_invitee, bus=bus,  
+                                                   timeout=timeout, poll_interval=poll_interval))  
+                item["ok"] = True  
+                # Drop "not found" entries cached while the handshake was pending  
+                for agent, alias in ((inviter, alias_inviter), (invitee, alias_invitee)):  
+                    if isinstance(agent, str):  
+                        resolver.invalidate(agent, alias)  
+            except Exception as e:  
+                item["error"] = str(e) or type(e).__name__  
+                item["ok"] = False  
+            results.append(item)  
+  
+    started = time.monotonic()  
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))  
+    elapsed = time.monotonic() - started  
+  
+    results.sort(key=lambda item: item["index"])  
+    succeeded = sum(1 for item in results if item["ok"])  
+    summary = {  
+        "total": len(results),  
+        "succeeded": succeeded,  
+        "failed": len(results) - succeeded,  
+        "elapsed": round(elapsed, 3),  
+        "throughput": round(succeeded / elapsed, 2) if elapsed > 0 else 0.0  
+    }  
+    return results, summary  
+  
+def connect_agents(inviter_url, invitee_url, alias_inviter, alias_invitee):  
+    """Connect one pair of agents and return the connection ids (see connect_pair)."""  
+    print(f"--- Connecting {alias_inviter} -> {alias_invitee} ---")  
+    return run_async(connect_pair(inviter_url, invitee_url, alias_inviter, alias_invitee))  
   
 def main():  
     print("### 1. ESTABLISHING CONNECTIONS ###")  
   
-    # Government <-> Bot  
-    connect_agents(ISSUER_URL, HOLDER_URL, "Connection_Gov_Bot", "Connection_Bot_Gov")  
+    pairs = [  
+        (ISSUER_URL, HOLDER_URL, "Connection_Gov_Bot", "Connection_Bot_Gov"),     # Government <-> Bot  
+        (VERIFIER_URL, HOLDER_URL, "Connection_Bank_Bot", "Connection_Bot_Bank"), # Bank <-> Bot  
+    ]  
+    for _, _, alias_inviter, alias_invitee in pairs:  
+        print(f"--- Connecting {alias_inviter} -> {alias_invitee} ---")  
+  
+    async def run():  
+        if not USE_WEBHOOKS:  
+            return await bootstrap_connections(pairs)  
+        async with webhook_events() as bus:  
+            return await bootstrap_connections(pairs, bus=bus)  
   
-    # Bank <-> Bot  
-    connect_agents(VERIFIER_URL, HOLDER_URL, "Connection_Bank_Bot", "Connection_Bot_Bank")  
+    results, summary = run_async(run())  
+    for item in results:  
+        if item["ok"]:  
+            print(f"   ✅ {item['alias']}: {item['inviter_conn_id']} (active)")  
+        else:  
+            print(f"   ❌ {item['alias']}: {item['error']}")  
   
-    print("Connections established.")  
+    if summary["failed"]:  
+        print(f"❌ {summary['failed']} connection(s) not established.")  
+        return  
+    print(f"Connections established in {summary['elapsed']}s.")  
   
 if __name__ == "__main__":  
     main()
\ No newline at end of file
@@ -0,0 +1,897 @@
+import argparse  
+import asyncio  
+import math  
+import random  
+import re  
+import time  
+import uuid  
+import httpx  
+from aiohttp import web  
+from .config import (AGENT_URLS, SIM_LATENCY_MEDIAN, SIM_LATENCY_SIGMA, SIM_MESSAGE_LATENCY, SIM_ERROR_RATE,  
+                     SIM_SLOW_ROUTES)  
+from .client import AsyncAgentClient, run_async  
+from . import codec  
+  
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"  
+  
+class LatencyModel:  
+    """Log-normal service times: `median` seconds, spread `sigma`, per-route overrides.  
+  
+    overrides maps a route name (see AdminSimulator.ROUTES) to its own  
+    (median, sigma). A median of 0 means no delay.  
+    """  
+  
+    def __init__(self, median=SIM_LATENCY_MEDIAN, sigma=SIM_LATENCY_SIGMA, overrides=None, rng=None):  
+        self.median = median  
+        self.sigma = sigma  
+        self.overrides = dict(overrides or {})  
+        self.rng = rng or random.Random()  
+  
+    def sample(self, route=None):  
+        median, sigma = self.overrides.get(route, (self.median, self.sigma))  
+        if median <= 0:  
+            return 0.0  
+        return median * math.exp(sigma * self.rng.gauss(0, 1))  
+  
+class ErrorInjector:  
+    """Fails a share `rate` of admin calls with one of `statuses` (only `routes` if given)."""  
+  
+    def __init__(self, rate=SIM_ERROR_RATE, statuses=(500, 503), routes=None, rng=None):  
+        self.rate = rate  
+        self.statuses = tuple(statuses)  
+        self.routes = set(routes) if routes else None  
+        self.rng = rng or random.Random()  
+  
+    def pick(self, route):  
+        if self.rate <= 0 or (self.routes is not None and route not in self.routes):  
+            return None  
+        return self.rng.choice(self.statuses) if self.rng.random() < self.rate else None  
+  
+class SimError(Exception):  
+    """A request the simulated agent rejects; becomes a JSON error response."""  
+  
+    def __init__(self, status, message):  
+        super().__init__(message)  
+        self.status = status  
+  
+class Ledger:  
+    """Ledger artifacts shared by the simulated agents."""  
+  
+    def __init__(self):  
+        self.seq_no = 0  
+        self.schemas = {}  
+        self.cred_defs = {}  
+        # rev_reg_id -> registry (the issuer's record, with its revocation list)  
+        self.rev_reg_defs = {}  
+        # rev_reg_id -> {cred_rev_id: publication timestamp}  
+        self.revoked = {}  
+  
+    def next_seq_no(self):  
+        self.seq_no += 1  
+        return self.seq_no  
+  
+class SimAgent:  
+    """Wallet and protocol records of one simulated ACA-Py agent.  
+  
+    The auto_* flags mirror the agents' startup flags in docker-compose.yml.  
+    """  
+  
+    def __init__(self, name, public_did=None, auto_accept=True, auto_respond_credential_offer=False,  
+                 auto_respond_presentation_request=False, auto_store_credential=False):  
+        self.name = name  
+        self.public_did = public_did  
+        self.auto_accept = auto_accept  
+        self.auto_respond_credential_offer = auto_respond_credential_offer  
+        self.auto_respond_presentation_request = auto_respond_presentation_request  
+        self.auto_store_credential = auto_store_credential  
+        self.invitations = {}  
+        self.connections = {}  
+        # connection_id -> (peer agent name, peer connection_id)  
+        self.peers = {}  
+        self.cred_ex = {}  
+        self.pres_ex = {}  
+        self.credentials = {}  
+        self.registries = {}  
+        self.active_registry = {}  
+  
+def _did(rng):  
+    return "".join(rng.choice(B58_ALPHABET) for _ in range(22))  
+  
+def _flag(value):  
+    return str(value).lower() == "true"  
+  
+class AdminSimulator:  
+    """In-process simulator of the ACA-Py admin API used by the scripts.  
+  
+    Simulates an issuer, a holder (the Bot, auto-responding like in  
+    docker-compose.yml) and a verifier sharing one ledger. Connections  
+    (out-of-band + DID exchange), AnonCreds schemas, credential definitions  
+    and revocation registries, issue-credential 2.0, present-proof 2.0,  
+    revocation and the holder's credentials go through the same state  
+    transitions as on the agents. Every admin call takes a `latency` sample  
+    and may be failed by `errors`; messages between agents take a  
+    `message_latency` sample. Webhook events go to `bus` and/or are posted  
+    to `webhook_url`.  
+  
+    Use transport(agent)/client(agent) for in-process httpx clients, or  
+    serve() for real admin ports.  
+    """  
+  
+    ROUTES = [  
+        ("GET", r"/connections", "get_connections"),  
+        ("GET", r"/connections/(?P<conn_id>[^/]+)", "get_connection"),  
+        ("POST", r"/out-of-band/create-invitation", "create_invitation"),  
+        ("POST", r"/out-of-band/receive-invitation", "receive_invitation"),  
+        ("GET", r"/wallet/did/public", "get_public_did"),  
+        ("POST", r"/anoncreds/schema", "create_schema"),  
+        ("GET", r"/anoncreds/schemas", "get_schemas"),  
+        ("POST", r"/anoncreds/credential-definition", "create_cred_def"),  
+        ("GET", r"/anoncreds/credential-definitions", "get_cred_defs"),  
+        ("POST", r"/issue-credential-2.0/send-offer", "send_offer"),  
+        ("GET", r"/issue-credential-2.0/records", "get_cred_ex_records"),  
+        ("GET", r"/issue-credential-2.0/records/(?P<cred_ex_id>[^/]+)", "get_cred_ex_record"),  
+        ("POST", r"/issue-credential-2.0/records/(?P<cred_ex_id>[^/]+)/send-request", "send_request"),  
+        ("POST", r"/issue-credential-2.0/records/(?P<cred_ex_id>[^/]+)/issue", "issue_credential"),  
+        ("POST", r"/issue-credential-2.0/records/(?P<cred_ex_id>[^/]+)/store", "store_credential"),  
+        ("GET", r"/credentials", "get_credentials"),  
+        ("POST", r"/present-proof-2.0/send-request", "send_proof_request"),  
+        ("GET", r"/present-proof-2.0/records/(?P<pres_ex_id>[^/]+)", "get_pres_ex_record"),  
+        ("POST", r"/present-proof-2.0/records/(?P<pres_ex_id>[^/]+)/verify-presentation", "verify_presentation"),  
+        ("POST", r"/anoncreds/revocation/revoke", "revoke"),  
+        ("POST", r"/anoncreds/revocation/publish-revocations", "publish_revocations"),  
+        ("GET", r"/anoncreds/revocation/active-registry/(?P<cred_def_id>[^/]+)", "get_active_registry"),  
+        ("GET", r"/anoncreds/revocation/registries", "get_registries"),  
+        ("GET", r"/anoncreds/revocation/registry/(?P<rev_reg_id>[^/]+)", "get_registry"),  
+        ("GET", r"/anoncreds/revocation/registry/(?P<rev_reg_id>[^/]+)/issued", "get_issued_count"),  
+        ("GET", r"/anoncreds/revocation/registry/(?P<rev_reg_id>[^/]+)/issued/details", "get_issued_details"),  
+        ("POST", r"/anoncreds/revocation-registry-definition", "create_rev_reg_def"),  
+        ("PUT", r"/anoncreds/registry/(?P<rev_reg_id>[^/]+)/tails-file", "upload_tails"),  
+        ("POST", r"/anoncreds/revocation-list", "create_rev_list"),  
+        ("PUT", r"/anoncreds/registry/(?P<rev_reg_id>[^/]+)/active", "set_active_registry"),  
+    ]  
+    _ROUTES = [(method, re.compile(pattern), name) for method, pattern, name in ROUTES]  
+  
+    def __init__(self, agents=None, latency=None, message_latency=None, errors=None, bus=None,  
+                 webhook_url=None, seed=None, clock=time.time):  
+        self.rng = random.Random(seed)  
+        if agents is None:  
+            agents = [  
+                SimAgent("issuer", public_did=_did(self.rng)),  
+                SimAgent("holder", auto_respond_credential_offer=True, auto_respond_presentation_request=True,  
+                         auto_store_credential=True),  
+                SimAgent("verifier"),  
+            ]  
+        self.agents = {agent.name: agent for agent in agents}  
+        self.ledger = Ledger()  
+        self.latency = latency or LatencyModel(overrides=SIM_SLOW_ROUTES, rng=self.rng)  
+        self.message_latency = message_latency or LatencyModel(SIM_MESSAGE_LATENCY, SIM_LATENCY_SIGMA, rng=self.rng)  
+        self.errors = errors or ErrorInjector(rng=self.rng)  
+        self.bus = bus  
+        self.webhook_url = webhook_url  
+        self.clock = clock  
+        self.calls = []  
+        self._tasks = set()  
+        self._http = None  
+  
+    # Entry points  
+  
+    async def handle(self, agent_name, method, path, params=None, body=None):  
+        """Serve one admin call; returns (status, JSON payload)."""  
+        started = time.monotonic()  
+        agent = self.agents.get(agent_name)  
+        route, match = self._match(method, path)  
+        status, payload = 404, {"error": f"{method} {path} not found"}  
+        if agent is not None and route is not None:  
+            await self._sleep(self.latency.sample(route))  
+            injected = self.errors.pick(route)  
+            if injected:  
+                status, payload = injected, {"error": f"injected {injected} on {route}"}  
+            else:  
+                try:  
+                    status, payload = 200, getattr(self, f"_{route}")(agent, params or {}, body or {},  
+                                                                        **match.groupdict())  
+                except SimError as e:  
+                    status, payload = e.status, {"error": str(e)}  
+        self.calls.append((route or path, status, time.monotonic() - started))  
+        return status, payload  
+  
+    def transport(self, agent_name):  
+        """httpx transport serving an agent's admin API in-process."""  
+        async def handler(request):  
+            body = codec.loads(request.content) if request.content else None  
+            status, payload = await self.handle(agent_name, request.method, request.url.path,  
+                                                dict(request.url.params), body)  
+            return httpx.Response(status, content=codec.dumps(payload), headers={"Content-Type": "application/json"})  
+        return httpx.MockTransport(handler)  
+  
+    def client(self, agent_name, **kwargs):  
+        """AsyncAgentClient talking to a simulated agent in-process."""  
+        url = AGENT_URLS.get(agent_name, f"http://{agent_name}.sim")  
+        return AsyncAgentClient(url, transport=self.transport(agent_name), **kwargs)  
+  
+    def create_app(self, agent_name) -> web.Application:  
+        """aiohttp app serving an agent's admin API."""  
+        async def handle(request):  
+            raw = await request.read()  
+            try:  
+                body = codec.loads(raw) if raw else None  
+            except ValueError:  
+                return web.json_response({"error": "invalid JSON"}, status=400)  
+            status, payload = await self.handle(agent_name, request.method, request.path, dict(request.query), body)  
+            return web.Response(body=codec.dumps(payload), status=status, content_type="application/json")  
+  
+        app = web.Application()  
+        app.router.add_route("*", "/{tail:.*}", handle)  
+        return app  
+  
+    async def serve(self, host="localhost", ports=None):  
+        """Serve every agent on its admin port (from AGENT_URLS); returns the runners."""  
+        ports = ports or {name: httpx.URL(url).port for name, url in AGENT_URLS.items() if name in self.agents}  
+        runners = []  
+        for name, port in ports.items():  
+            runner = web.AppRunner(self.create_app(name))  
+            await runner.setup()  
+            await web.TCPSite(runner, host, port).start()  
+            runners.append(runner)  
+        return runners  
+  
+    async def drain(self, timeout=None):  
+        """Wait until every in-flight message between agents is delivered."""  
+        deadline = None if timeout is None else time.monotonic() + timeout  
+        while self._tasks:  
+            remaining = None if deadline is None else deadline - time.monotonic()  
+            if remaining is not None and remaining <= 0:  
+                raise asyncio.TimeoutError("messages still in flight")  
+            await asyncio.wait(set(self._tasks), timeout=remaining)  
+  
+    async def aclose(self):  
+        for task in list(self._tasks):  
+            task.cancel()  
+        if self._http is not None:  
+            await self._http.aclose()  
+            self._http = None  
+  
+    def report(self):  
+        """Per-route call count, error count and p50/p95/p99 latency in ms."""  
+        by_route = {}  
+        for route, status, elapsed in self.calls:  
+            by_route.setdefault(route, []).append((status, elapsed))  
+        report = {}  
+        for route, calls in sorted(by_route.items()):  
+            latencies = sorted(elapsed for _, elapsed in calls)  
+  
+            def pct(p):  
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)  
+  
+            report[route] = {"calls": len(calls), "errors": sum(1 for status, _ in calls if status >= 400),  
+                             "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)}  
+        return report  
+  
+    # Plumbing  
+  
+    def _match(self, method, path):  
+        for route_method, pattern, name in self._ROUTES:  
+            if route_method == method:  
+                match = pattern.fullmatch(path.rstrip("/") or "/")  
+                if match:  
+                    return name, match  
+        return None, None  
+  
+    async def _sleep(self, seconds):  
+        if seconds > 0:  
+            await asyncio.sleep(seconds)  
+  
+    def _now(self):  
+        return int(self.clock())  
+  
+    def _deliver(self, func, *args):  
+        """Run func(*args) after a message latency, like a DIDComm message in transit."""  
+        async def run():  
+            await self._sleep(self.message_latency.sample())  
+            func(*args)  
+  
+        task = asyncio.ensure_future(run())  
+        self._tasks.add(task)  
+        task.add_done_callback(self._tasks.discard)  
+  
+    def _emit(self, agent, topic, record):  
+        payload = self._public(record)  
+        if self.bus is not None:  
+            self.bus.publish(topic, payload, agent=agent.name)  
+        if self.webhook_url:  
+            self._deliver_webhook(agent.name, topic, payload)  
+  
+    def _deliver_webhook(self, agent_name, topic, payload):  
+        async def post():  
+            if self._http is None:  
+                self._http = httpx.AsyncClient(timeout=5.0)  
+            try:  
+                await self._http.post(f"{self.webhook_url}/webhooks/{agent_name}/topic/{topic}/",  
+                                      content=codec.dumps(payload), headers={"Content-Type": "application/json"})  
+            except httpx.HTTPError:  
+                pass  # like ACA-Py, a lost webhook is not retried forever  
+  
+        task = asyncio.ensure_future(post())  
+        self._tasks.add(task)  
+        task.add_done_callback(self._tasks.discard)  
+  
+    def _update(self, agent, topic, record, **changes):  
+        record.update(changes, updated_at=self._now())  
+        self._emit(agent, topic, record)  
+        return record  
+  
+    def _peer(self, agent, conn_id):  
+        conn = agent.connections.get(conn_id)  
+        if conn is None:  
+            raise SimError(404, f"Connection {conn_id} not found")  
+        if conn["state"] != "active":  
+            raise SimError(400, f"Connection {conn_id} is not ready")  
+        name, peer_conn_id = agent.peers[conn_id]  
+        return self.agents[name], peer_conn_id  
+  
+    @staticmethod  
+    def _page(records, params):  
+        offset, limit = int(params.get("offset", 0)), params.get("limit")  
+        records = records[offset:]  
+        return records[:int(limit)] if limit is not None else records  
+  
+    # Connections / out-of-band  
+  
+    def _get_connections(self, agent, params, body):  
+        fields = ("alias", "state", "invitation_msg_id", "their_did", "my_did", "their_role")  
+        filters = {key: params[key] for key in fields if key in params}  
+        records = [c for c in agent.connections.values() if all(c.get(k) == v for k, v in filters.items())]  
+        return {"results": self._page(records, params)}  
+  
+    def _get_connection(self, agent, params, body, conn_id):  
+        if conn_id not in agent.connections:  
+            raise SimError(404, f"Connection {conn_id} not found")  
+        return agent.connections[conn_id]  
+  
+    def _create_invitation(self, agent, params, body):  
+        invi_msg_id = str(uuid.uuid4())  
+        invitation = {  
+            "@id": invi_msg_id,  
+            "@type": "https://didcomm.org/out-of-band/1.1/invitation",  
+            "label": agent.name,  
+            "handshake_protocols": body.get("handshake_protocols", ["https://didcomm.org/didexchange/1.0"]),  
+            "services": [{"id": "#inline", "type": "did-communication", "recipientKeys": [f"did:key:{_did(self.rng)}"],  
+                          "serviceEndpoint": f"sim://{agent.name}"}],  
+        }  
+        agent.invitations[invi_msg_id] = {"alias": body.get("alias"), "multi_use": _flag(params.get("multi_use")),  
+                                          "used": False}  
+        oob_id = str(uuid.uuid4())  
+        return {"oob_id": oob_id, "state": "await-response", "invi_msg_id": invi_msg_id, "invitation": invitation,  
+                "invitation_url": f"sim://{agent.name}?oob={invi_msg_id}"}  
+  
+    def _receive_invitation(self, agent, params, body):  
+        endpoint = (body.get("services") or [{}])[0].get("serviceEndpoint", "")  
+        inviter = self.agents.get(endpoint.replace("sim://", "")) if endpoint.startswith("sim://") else None  
+        if inviter is None or body.get("@id") not in inviter.invitations:  
+            raise SimError(400, "Invitation cannot be resolved")  
+        conn_id = str(uuid.uuid4())  
+        record = {"connection_id": conn_id, "state": "request", "rfc23_state": "request-sent",  
+                  "alias": params.get("alias"), "their_label": inviter.name, "their_role": "inviter",  
+                  "my_did": _did(self.rng), "their_did": None, "invitation_msg_id": body["@id"],  
+                  "created_at": self._now(), "updated_at": self._now()}  
+        agent.connections[conn_id] = record  
+        self._emit(agent, "connections", record)  
+        self._deliver(self._on_connection_request, inviter, body["@id"], agent, conn_id)  
+        return {"oob_id": str(uuid.uuid4()), "state": "prepare-response", "invi_msg_id": body["@id"],  
+                "connection_id": conn_id}  
+  
+    def _on_connection_request(self, inviter, invi_msg_id, invitee, invitee_conn_id):  
+        invitation = inviter.invitations[invi_msg_id]  
+        invitee_record = invitee.connections[invitee_conn_id]  
+        if invitation["used"] and not invitation["multi_use"]:  
+            self._update(invitee, "connections", invitee_record, state="abandoned", rfc23_state="abandoned",  
+                         error_msg="Invitation already used")  
+            return  
+        invitation["used"] = True  
+        conn_id = str(uuid.uuid4())  
+        record = {"connection_id": conn_id, "state": "request", "rfc23_state": "request-received",  
+                  "alias": invitation["alias"], "their_label": invitee.name, "their_role": "invitee",  
+                  "my_did": _did(self.rng), "their_did": invitee_record["my_did"], "invitation_msg_id": invi_msg_id,  
+                  "created_at": self._now(), "updated_at": self._now()}  
+        inviter.connections[conn_id] = record  
+        inviter.peers[conn_id] = (invitee.name, invitee_conn_id)  
+        invitee.peers[invitee_conn_id] = (inviter.name, conn_id)  
+        self._emit(inviter, "connections", record)  
+        if inviter.auto_accept:  
+            self._update(inviter, "connections", record, state="response", rfc23_state="response-sent")  
+            self._deliver(self._on_connection_response, invitee, invitee_conn_id, record["my_did"], inviter, conn_id)  
+  
+    def _on_connection_response(self, invitee, invitee_conn_id, their_did, inviter, conn_id):  
+        self._update(invitee, "connections", invitee.connections[invitee_conn_id], state="active",  
+                     rfc23_state="completed", their_did=their_did)  
+        self._deliver(self._on_connection_complete, inviter, conn_id)  
+  
+    def _on_connection_complete(self, inviter, conn_id):  
+        self._update(inviter, "connections", inviter.connections[conn_id], state="active", rfc23_state="completed")  
+  
+    # Wallet and AnonCreds ledger artifacts  
+  
+    def _get_public_did(self, agent, params, body):  
+        if not agent.public_did:  
+            return {"result": None}  
+        return {"result": {"did": agent.public_did, "verkey": f"{agent.public_did}vk", "posture": "posted"}}  
+  
+    def _require_public_did(self, agent, issuer_id):  
+        if not agent.public_did:  
+            raise SimError(400, "No public DID")  
+        if issuer_id and issuer_id != agent.public_did:  
+            raise SimError(400, f"Issuer {issuer_id} is not this agent's public DID")  
+  
+    def _create_schema(self, agent, params, body):  
+        schema = body.get("schema") or {}  
+        self._require_public_did(agent, schema.get("issuerId"))  
+        schema_id = f"{agent.public_did}:2:{schema.get('name')}:{schema.get('version')}"  
+        if schema_id in self.ledger.schemas:  
+            raise SimError(400, f"Schema {schema_id} already exists")  
+        seq_no = self.ledger.next_seq_no()  
+        self.ledger.schemas[schema_id] = dict(schema, issuerId=agent.public_did, seqNo=seq_no)  
+        return {"schema_state": {"state": "finished", "schema_id": schema_id, "schema": schema},  
+                "schema_metadata": {"seqNo": seq_no}, "registration_metadata": {}}  
+  
+    def _get_schemas(self, agent, params, body):  
+        ids = [schema_id for schema_id, schema in self.ledger.schemas.items()  
+               if params.get("schema_issuer_id", schema["issuerId"]) == schema["issuerId"]  
+               and params.get("schema_name", schema.get("name")) == schema.get("name")  
+               and params.get("schema_version", schema.get("version")) == schema.get("version")]  
+        return {"schema_ids": ids}  
+  
+    def _create_cred_def(self, agent, params, body):  
+        cred_def = body.get("credential_definition") or {}  
+        options = body.get("options") or {}  
+        self._require_public_did(agent, cred_def.get("issuerId"))  
+        schema = self.ledger.schemas.get(cred_def.get("schemaId"))  
+        if schema is None:  
+            raise SimError(400, f"Schema {cred_def.get('schemaId')} not found")  
+        cred_def_id = f"{agent.public_did}:3:CL:{schema['seqNo']}:{cred_def.get('tag', 'default')}"  
+        if cred_def_id in self.ledger.cred_defs:  
+            raise SimError(400, f"Credential definition {cred_def_id} already exists")  
+        revocable = bool(options.get("support_revocation"))  
+        self.ledger.cred_defs[cred_def_id] = {"schema_id": cred_def["schemaId"], "issuer_id": agent.public_did,  
+                                              "tag": cred_def.get("tag"), "support_revocation": revocable}  
+        if revocable:  
+            rev_reg_id = self._new_registry(agent, cred_def_id, "0", int(options.get("revocation_registry_size", 1000)))  
+            agent.registries[rev_reg_id]["state"] = "active"  
+            agent.active_registry[cred_def_id] = rev_reg_id  
+        return {"credential_definition_state": {"state": "finished", "credential_definition_id": cred_def_id}}  
+  
+    def _get_cred_defs(self, agent, params, body):  
+        ids = [cred_def_id for cred_def_id, cred_def in self.ledger.cred_defs.items()  
+               if params.get("issuer_id", cred_def["issuer_id"]) == cred_def["issuer_id"]  
+               and params.get("schema_id", cred_def["schema_id"]) == cred_def["schema_id"]]  
+        return {"credential_definition_ids": ids}  
+  
+    # Revocation registries  
+  
+    def _new_registry(self, agent, cred_def_id, tag, size):  
+        rev_reg_id = f"{agent.public_did}:4:{cred_def_id}:CL_ACCUM:{tag}"  
+        if rev_reg_id in self.ledger.rev_reg_defs:  
+            raise SimError(400, f"Revocation registry {rev_reg_id} already exists")  
+        self.ledger.revoked[rev_reg_id] = {}  
+        tails_hash = _did(self.rng)  
+        agent.registries[rev_reg_id] = self.ledger.rev_reg_defs[rev_reg_id] = {  
+            "revoc_reg_id": rev_reg_id, "cred_def_id": cred_def_id, "max_cred_num": size, "state": "finished",  
+            "tails_hash": tails_hash, "tails_public_uri": f"sim://tails/{rev_reg_id}",  
+            # One 0/1 per slot, index = cred_rev_id (slot 0 is never issued)  
+            "revocation_list": {"revRegDefId": rev_reg_id, "revocationList": [0] * (size + 1),  
+                                "timestamp": self._now()},  
+            "issued": {}, "next_index": 1,  
+        }  
+        return rev_reg_id  
+  
+    @staticmethod  
+    def _registry_view(registry):  
+        return {k: v for k, v in registry.items() if k not in ("issued", "next_index")}  
+  
+    def _registry(self, agent, rev_reg_id):  
+        registry = agent.registries.get(rev_reg_id)  
+        if registry is None:  
+            raise SimError(404, f"Revocation registry {rev_reg_id} not found")  
+        return registry  
+  
+    def _get_active_registry(self, agent, params, body, cred_def_id):  
+        rev_reg_id = agent.active_registry.get(cred_def_id)  
+        if rev_reg_id is None:  
+            raise SimError(404, f"No active registry for {cred_def_id}")  
+        return {"result": self._registry_view(agent.registries[rev_reg_id])}  
+  
+    def _get_registries(self, agent, params, body):  
+        ids = [rev_reg_id for rev_reg_id, registry in agent.registries.items()  
+               if params.get("cred_def_id", registry["cred_def_id"]) == registry["cred_def_id"]  
+               and params.get("state", registry["state"]) == registry["state"]]  
+        return {"rev_reg_ids": ids}  
+  
+    def _get_registry(self, agent, params, body, rev_reg_id):  
+        # Agents other than the issuer resolve the registry (and its revocation list) from the ledger  
+        registry = agent.registries.get(rev_reg_id) or self.ledger.rev_reg_defs.get(rev_reg_id)  
+        if registry is None:  
+            raise SimError(404, f"Revocation registry {rev_reg_id} not found")  
+        return {"result": self._registry_view(registry)}  
+  
+    def _get_issued_count(self, agent, params, body, rev_reg_id):  
+        return {"result": len(self._registry(agent, rev_reg_id)["issued"])}  
+  
+    def _get_issued_details(self, agent, params, body, rev_reg_id):  
+        return list(self._registry(agent, rev_reg_id)["issued"].values())  
+  
+    def _create_rev_reg_def(self, agent, params, body):  
+        definition = body.get("revocation_registry_definition") or {}  
+        cred_def = self.ledger.cred_defs.get(definition.get("credDefId"))  
+        if cred_def is None or cred_def["issuer_id"] != agent.public_did:  
+            raise SimError(400, f"Credential definition {definition.get('credDefId')} not found")  
+        rev_reg_id = self._new_registry(agent, definition["credDefId"], definition.get("tag") or uuid.uuid4().hex[:8],  
+                                        int(definition.get("maxCredNum", 1000)))  
+        return {"revocation_registry_definition_state": {"state": "finished",  
+                                                         "revocation_registry_definition_id": rev_reg_id}}  
+  
+    def _upload_tails(self, agent, params, body, rev_reg_id):  
+        self._registry(agent, rev_reg_id)  
+        return {}  
+  
+    def _create_rev_list(self, agent, params, body):  
+        registry = self._registry(agent, body.get("rev_reg_def_id"))  
+        registry["revocation_list"]["timestamp"] = self._now()  
+        return {"revocation_list_state": {"state": "finished", "revocation_list": registry["revocation_list"]}}  
+  
+    def _set_active_registry(self, agent, params, body, rev_reg_id):  
+        registry = self._registry(agent, rev_reg_id)  
+        previous = agent.active_registry.get(registry["cred_def_id"])  
+        if previous and previous != rev_reg_id:  
+            agent.registries[previous]["state"] = "full"  
+        registry["state"] = "active"  
+        agent.active_registry[registry["cred_def_id"]] = rev_reg_id  
+        return {}  
+  
+    # Issue credential 2.0  
+  
+    def _cred_ex(self, agent, cred_ex_id, state=None):  
+        record = agent.cred_ex.get(cred_ex_id)  
+        if record is None:  
+            raise SimError(404, f"Credential exchange {cred_ex_id} not found")  
+        if state and record["state"] != state:  
+            raise SimError(400, f"Credential exchange {cred_ex_id} is '{record['state']}', expected '{state}'")  
+        return record  
+  
+    def _new_cred_ex(self, agent, thread_id, conn_id, role, state, **fields):  
+        record = {"cred_ex_id": str(uuid.uuid4()), "thread_id": thread_id, "connection_id": conn_id, "role": role,  
+                  "state": state, "created_at": self._now(), "updated_at": self._now(), **fields}  
+        agent.cred_ex[record["cred_ex_id"]] = record  
+        self._emit(agent, "issue_credential_v2_0", record)  
+        return record  
+  
+    def _send_offer(self, agent, params, body):  
+        cred_def_id = ((body.get("filter") or {}).get("anoncreds") or {}).get("cred_def_id")  
+        cred_def = self.ledger.cred_defs.get(cred_def_id)  
+        if cred_def is None or cred_def["issuer_id"] != agent.public_did:  
+            raise SimError(400, f"Credential definition {cred_def_id} not found")  
+        holder, holder_conn_id = self._peer(agent, body.get("connection_id"))  
+        preview = body.get("credential_preview") or {}  
+        offer = {"anoncreds": {"cred_def_id": cred_def_id, "schema_id": cred_def["schema_id"],  
+                               "nonce": str(self.rng.getrandbits(80))}}  
+        record = self._new_cred_ex(agent, str(uuid.uuid4()), body["connection_id"], "issuer", "offer-sent",  
+                                   cred_preview=preview, by_format={"cred_offer": offer},  
+                                   auto_remove=body.get("auto_remove", True))  
+        self._deliver(self._on_offer, holder, holder_conn_id, record["thread_id"], preview, offer)  
+        return record  
+  
+    def _on_offer(self, holder, conn_id, thread_id, preview, offer):  
+        record = self._new_cred_ex(holder, thread_id, conn_id, "holder", "offer-received",  
+                                   cred_preview=preview, by_format={"cred_offer": offer})  
+        if holder.auto_respond_credential_offer:  
+            self._send_request(holder, {}, {}, record["cred_ex_id"])  
+  
+    def _send_request(self, agent, params, body, cred_ex_id):  
+        record = self._cred_ex(agent, cred_ex_id, "offer-received")  
+        issuer, _ = self._peer(agent, record["connection_id"])  
+        self._update(agent, "issue_credential_v2_0", record, state="request-sent")  
+        self._deliver(self._on_thread_message, issuer, record["thread_id"], "request-received", None)  
+        return record  
+  
+    def _on_thread_message(self, agent, thread_id, state, then):  
+        for record in agent.cred_ex.values():  
+            if record["thread_id"] == thread_id:  
+                self._update(agent, "issue_credential_v2_0", record, state=state)  
+                if then:  
+                    then(agent, record)  
+                return  
+  
+    def _issue_credential(self, agent, params, body, cred_ex_id):  
+        record = self._cred_ex(agent, cred_ex_id, "request-received")  
+        holder, _ = self._peer(agent, record["connection_id"])  
+        cred_def_id = record["by_format"]["cred_offer"]["anoncreds"]["cred_def_id"]  
+        cred_def = self.ledger.cred_defs[cred_def_id]  
+        credential = {"schema_id": cred_def["schema_id"], "cred_def_id": cred_def_id, "rev_reg_id": None,  
+                      "cred_rev_id": None,  
+                      "attrs": {a["name"]: a["value"] for a in record["cred_preview"].get("attributes", [])}}  
+        if cred_def["support_revocation"]:  
+            rev_reg_id = agent.active_registry.get(cred_def_id)  
+            registry = agent.registries[rev_reg_id]  
+            if len(registry["issued"]) >= registry["max_cred_num"]:  
+                raise SimError(400, f"Revocation registry {rev_reg_id} is full")  
+            cred_rev_id = str(registry["next_index"])  
+            registry["next_index"] += 1  
+            rev_record = {"record_id": str(uuid.uuid4()), "state": "issued", "cred_ex_id": cred_ex_id,  
+                          "rev_reg_id": rev_reg_id, "cred_def_id": cred_def_id, "cred_rev_id": cred_rev_id,  
+                          "created_at": self._now(), "updated_at": self._now()}  
+            registry["issued"][cred_rev_id] = rev_record  
+            self._emit(agent, "issuer_cred_rev", rev_record)  
+            credential.update(rev_reg_id=rev_reg_id, cred_rev_id=cred_rev_id)  
+        self._update(agent, "issue_credential_v2_0", record, state="credential-issued")  
+        self._deliver(self._on_thread_message, holder, record["thread_id"], "credential-received",  
+                      lambda holder, holder_record: self._on_credential(holder, holder_record, credential))  
+        return record  
+  
+    def _on_credential(self, holder, record, credential):  
+        record["_credential"] = credential  
+        if holder.auto_store_credential:  
+            self._store_credential(holder, {}, {}, record["cred_ex_id"])  
+  
+    def _store_credential(self, agent, params, body, cred_ex_id):  
+        record = self._cred_ex(agent, cred_ex_id, "credential-received")  
+        issuer, _ = self._peer(agent, record["connection_id"])  
+        referent = body.get("credential_id") or str(uuid.uuid4())  
+        agent.credentials[referent] = dict(record.pop("_credential"), referent=referent)  
+        self._update(agent, "issue_credential_v2_0", record, state="done")  
+        self._deliver(self._on_thread_message, issuer, record["thread_id"], "done", None)  
+        return record  
+  
+    def _get_cred_ex_records(self, agent, params, body):  
+        fields = ("thread_id", "connection_id", "role", "state")  
+        filters = {key: params[key] for key in fields if key in params}  
+        records = [r for r in agent.cred_ex.values() if all(r.get(k) == v for k, v in filters.items())]  
+        if _flag(params.get("descending")):  
+            records.reverse()  
+        return {"results": [{"cred_ex_record": self._public(r)} for r in self._page(records, params)]}  
+  
+    def _get_cred_ex_record(self, agent, params, body, cred_ex_id):  
+        return {"cred_ex_record": self._public(self._cred_ex(agent, cred_ex_id))}  
+  
+    @staticmethod  
+    def _public(record):  
+        return {k: v for k, v in record.items() if not k.startswith("_")}  
+  
+    def _get_credentials(self, agent, params, body):  
+        wql = codec.loads(params["wql"]) if params.get("wql") else {}  
+        wanted = {key.split("::")[1]: value for key, value in wql.items() if key.startswith("attr::")}  
+        credentials = [c for c in agent.credentials.values()  
+                       if all(c["attrs"].get(name) == value for name, value in wanted.items())]  
+        start, count = int(params.get("start", 0)), int(params.get("count", 10))  
+        return {"results": credentials[start:start + count]}  
+  
+    # Present proof 2.0  
+  
+    def _send_proof_request(self, agent, params, body):  
+        holder, holder_conn_id = self._peer(agent, body.get("connection_id"))  
+        request = (body.get("presentation_request") or {}).get("anoncreds") or {}  
+        record = {"pres_ex_id": str(uuid.uuid4()), "thread_id": str(uuid.uuid4()),  
+                  "connection_id": body["connection_id"], "role": "verifier", "state": "request-sent",  
+                  "by_format": {"pres_request": {"anoncreds": request}},  
+                  "created_at": self._now(), "updated_at": self._now()}  
+        agent.pres_ex[record["pres_ex_id"]] = record  
+        self._emit(agent, "present_proof_v2_0", record)  
+        self._deliver(self._on_proof_request, holder, holder_conn_id, record["thread_id"], request, agent,  
+                      record["pres_ex_id"])  
+        return record  
+  
+    def _on_proof_request(self, holder, conn_id, thread_id, request, verifier, verifier_pres_ex_id):  
+        record = {"pres_ex_id": str(uuid.uuid4()), "thread_id": thread_id, "connection_id": conn_id,  
+                  "role": "prover", "state": "request-received",  
+                  "by_format": {"pres_request": {"anoncreds": request}},  
+                  "created_at": self._now(), "updated_at": self._now()}  
+        holder.pres_ex[record["pres_ex_id"]] = record  
+        self._emit(holder, "present_proof_v2_0", record)  
+        if not holder.auto_respond_presentation_request:  
+            return  
+        identifiers, revealed = [], {}  
+        for referent, spec in (request.get("requested_attributes") or {}).items():  
+            credential = self._select_credential(holder, spec.get("restrictions") or [])  
+            if credential is None:  
+                self._update(holder, "present_proof_v2_0", record, state="abandoned",  
+                             error_msg="No matching credential")  
+                self._deliver(self._on_presentation_problem, verifier, verifier_pres_ex_id)  
+                return  
+            interval = spec.get("non_revoked") or request.get("non_revoked")  
+            timestamp = int(interval["to"]) if interval and credential["rev_reg_id"] else None  
+            identifiers.append({"schema_id": credential["schema_id"], "cred_def_id": credential["cred_def_id"],  
+                                "rev_reg_id": credential["rev_reg_id"], "timestamp": timestamp,  
+                                "_cred_rev_id": credential["cred_rev_id"]})  
+            names = spec.get("names") or [spec.get("name")]  
+            revealed[referent] = {"values": {n: {"raw": credential["attrs"].get(n)} for n in names}}  
+        self._update(holder, "present_proof_v2_0", record, state="presentation-sent")  
+        self._deliver(self._on_presentation, verifier, verifier_pres_ex_id, identifiers, revealed)  
+  
+    @staticmethod  
+    def _select_credential(holder, restrictions):  
+        # Newest matching credential, like a wallet search ordered by insertion  
+        for credential in reversed(list(holder.credentials.values())):  
+            if not restrictions or any(all(credential.get(k) == v for k, v in r.items()) for r in restrictions):  
+                return credential  
+        return None  
+  
+    def _on_presentation(self, verifier, pres_ex_id, identifiers, revealed):  
+        record = verifier.pres_ex[pres_ex_id]  
+        record["_identifiers"] = identifiers  
+        record["by_format"]["pres"] = {"anoncreds": {  
+            "requested_proof": {"revealed_attr_groups": revealed},  
+            "identifiers": [{k: v for k, v in i.items() if not k.startswith("_")} for i in identifiers]}}  
+        self._update(verifier, "present_proof_v2_0", record, state="presentation-received")  
+  
+    def _on_presentation_problem(self, verifier, pres_ex_id):  
+        self._update(verifier, "present_proof_v2_0", verifier.pres_ex[pres_ex_id], state="abandoned",  
+                     error_msg="Prover has no matching credential")  
+  
+    def _pres_ex(self, agent, pres_ex_id):  
+        record = agent.pres_ex.get(pres_ex_id)  
+        if record is None:  
+            raise SimError(404, f"Presentation exchange {pres_ex_id} not found")  
+        return record  
+  
+    def _get_pres_ex_record(self, agent, params, body, pres_ex_id):  
+        return self._public(self._pres_ex(agent, pres_ex_id))  
+  
+    def _verify_presentation(self, agent, params, body, pres_ex_id):  
+        record = self._pres_ex(agent, pres_ex_id)  
+        if record["state"] != "presentation-received":  
+            raise SimError(400, f"Presentation exchange {pres_ex_id} is '{record['state']}'")  
+        msgs = []  
+        for identifier in record["_identifiers"]:  
+            if identifier["cred_def_id"] not in self.ledger.cred_defs:  
+                msgs.append(f"unknown credential definition {identifier['cred_def_id']}")  
+            revoked_at = self.ledger.revoked.get(identifier["rev_reg_id"], {}).get(identifier["_cred_rev_id"])  
+            if revoked_at is not None and identifier["timestamp"] is not None and revoked_at <= identifier["timestamp"]:  
+                msgs.append(f"credential {identifier['_cred_rev_id']} of {identifier['rev_reg_id']} is revoked")  
+        self._update(agent, "present_proof_v2_0", record, state="done", verified=str(not msgs).lower(),  
+                     verified_msgs=msgs)  
+        return self._public(record)  
+  
+    # Revocation  
+  
+    def _revoke(self, agent, params, body):  
+        registry = self._registry(agent, body.get("rev_reg_id"))  
+        rev_record = registry["issued"].get(str(body.get("cred_rev_id")))  
+        if rev_record is None:  
+            raise SimError(400, f"Credential {body.get('cred_rev_id')} not issued in {body.get('rev_reg_id')}")  
+        if rev_record["state"] == "revoked":  
+            raise SimError(400, f"Credential {rev_record['cred_rev_id']} already revoked")  
+        rev_record["pending"] = True  
+        if body.get("publish"):  
+            self._publish(agent, registry, [rev_record["cred_rev_id"]])  
+        return {}  
+  
+    def _publish_revocations(self, agent, params, body):  
+        published = {}  
+        for rev_reg_id, cred_rev_ids in (body.get("rrid2crid") or {}).items():  
+            published[rev_reg_id] = self._publish(agent, self._registry(agent, rev_reg_id), cred_rev_ids)  
+        return {"rrid2crid": published}  
+  
+    def _publish(self, agent, registry, cred_rev_ids):  
+        now, published = self._now(), []  
+        for cred_rev_id in map(str, cred_rev_ids):  
+            rev_record = registry["issued"].get(cred_rev_id)  
+            if rev_record is None or not rev_record.pop("pending", False):  
+                continue  
+            self.ledger.revoked[registry["revoc_reg_id"]][cred_rev_id] = now  
+            registry["revocation_list"]["revocationList"][int(cred_rev_id)] = 1  
+            self._update(agent, "issuer_cred_rev", rev_record, state="revoked")  
+            published.append(cred_rev_id)  
+        if published:  
+            registry["revocation_list"]["timestamp"] = now  
+        return published  
+  
+async def loadtest(sim, credentials=100, concurrency=20, revoke_ratio=0.1):  
+    """Connect, issue, verify and revoke `credentials` Bots against a simulator; returns a report."""  
+    from .bulk_issue import issue_bulk  
+    from .bulk_revoke import revoke_bulk  
+    from .events import EventBus  
+    from .schemas import CredentialAttributes  
+    from .setup_connections import bootstrap_connections  
+    from .verify_pipeline import VerificationPipeline  
+  
+    sim.bus = sim.bus or EventBus()  
+    issuer, holder, verifier = sim.client("issuer"), sim.client("holder"), sim.client("verifier")  
+    report = {}  
+    # Ledger setup is not part of the measured load: no faults injected  
+    errors, sim.errors = sim.errors, ErrorInjector(0)  
+    try:  
+        did = codec.loads((await issuer.get_public_did()).content)["result"]["did"]  
+        schema_id = codec.loads((await issuer.create_schema({"schema": {  
+            "name": "personhood_sim", "version": "1.0", "issuerId": did,  
+            "attrNames": ["person_hash", "biometric_score", "timestamp", "controller_did"]}})).content  
+        )["schema_state"]["schema_id"]  
+        cred_def_id = codec.loads((await issuer.create_cred_def({  
+            "credential_definition": {"schemaId": schema_id, "tag": "sim", "issuerId": did},  
+            "options": {"support_revocation": True, "revocation_registry_size": max(4, credentials)}})).content  
+        )["credential_definition_state"]["credential_definition_id"]  
+        sim.errors = errors  
+  
+        pairs = [(issuer, holder, f"Issuer_Bot_{i}", f"Bot_Issuer_{i}") for i in range(credentials)]  
+        pairs += [(verifier, holder, f"Bank_Bot_{i}", f"Bot_Bank_{i}") for i in range(credentials)]  
+        results, report["connections"] = await bootstrap_connections(pairs, concurrency, bus=sim.bus)  
+        issuer_conns = [r["inviter_conn_id"] for r in results[:credentials] if r["ok"]]  
+        verifier_conns = [r["inviter_conn_id"] for r in results[credentials:] if r["ok"]]  
+  
+        items = [(conn_id, CredentialAttributes(person_hash=f"person-hash-{i:08d}", biometric_score="90.0",  
+                                                controller_did=f"did:sov:bot{i}"))  
+                 for i, conn_id in enumerate(issuer_conns)]  
+        issued, report["issuance"] = await issue_bulk(items, cred_def_id, concurrency, issuer=issuer,  
+                                                      holder=holder, bus=sim.bus)  
+  
+        pipeline = VerificationPipeline(cred_def_id, concurrency=concurrency, verifier=verifier, bus=sim.bus)  
+        started = time.monotonic()  
+        verified = [result async for result in pipeline.results(verifier_conns)]  
+        elapsed = time.monotonic() - started  
+        report["verification"] = dict(pipeline.gauges(), elapsed=round(elapsed, 3),  
+                                      throughput=round(len(verified) / elapsed, 2) if elapsed > 0 else 0.0)  
+  
+        slots = {rev_record["cred_ex_id"]: (rev_record["rev_reg_id"], rev_record["cred_rev_id"])  
+                 for registry in sim.agents["issuer"].registries.values() for rev_record in registry["issued"].values()}  
+        rev_pairs = [slots[item["result"]["issuer_cred_ex_id"]]  
+                     for item in issued[:int(len(issued) * revoke_ratio)] if item["ok"]]  
+        report["revocation"] = await revoke_bulk(rev_pairs, issuer=issuer, concurrency=concurrency)  
+        await sim.drain(timeout=30)  
+    finally:  
+        sim.errors = errors  
+        for client in (issuer, holder, verifier):  
+            await client.aclose()  
+    report["admin_api"] = sim.report()  
+    return report  
+  
+def main(argv=None):  
+    parser = argparse.ArgumentParser(description="Offline simulator of the agents' admin API.")  
+    commands = parser.add_subparsers(dest="command", required=True)  
+    for name, help_text in (("serve", "serve the issuer, holder and verifier on their admin ports"),  
+                            ("loadtest", "run connections, issuance, verification and revocation in-process")):  
+        command = commands.add_parser(name, help=help_text)  
+        command.add_argument("--latency-ms", type=float, default=SIM_LATENCY_MEDIAN * 1000,  
+                             help="median admin call latency")  
+        command.add_argument("--sigma", type=float, default=SIM_LATENCY_SIGMA, help="log-normal spread")  
+        command.add_argument("--error-rate", type=float, default=SIM_ERROR_RATE, help="share of failed calls")  
+        command.add_argument("--seed", type=int)  
+    commands.choices["serve"].add_argument("--host", default="localhost")  
+    commands.choices["serve"].add_argument("--webhook-url", help="post webhooks here, e.g. http://localhost:8090")  
+    commands.choices["loadtest"].add_argument("--credentials", type=int, default=100)  
+    commands.choices["loadtest"].add_argument("--concurrency", type=int, default=20)  
+    args = parser.parse_args(argv)  
+  
+    rng = random.Random(args.seed)  
+    sim = AdminSimulator(latency=LatencyModel(args.latency_ms / 1000, args.sigma, SIM_SLOW_ROUTES, rng),  
+                         errors=ErrorInjector(args.error_rate, rng=rng), seed=args.seed,  
+                         webhook_url=getattr(args, "webhook_url", None))  
+  
+    async def serve():  
+        runners = await sim.serve(args.host)  
+        print(f"✅ Simulated agents on {', '.join(AGENT_URLS[name] for name in sim.agents)}")  
+        print(f"   Issuer public DID: {sim.agents['issuer'].public_did}")  
+        try:  
+            await asyncio.Event().wait()  
+        finally:  
+            for runner in runners:  
+                await runner.cleanup()  
+            await sim.aclose()  
+  
+    if args.command == "serve":  
+        try:  
+            return run_async(serve())  
+        except KeyboardInterrupt:  
+            return 0  
+  
+    print(f"### SIMULATED LOAD TEST: {args.credentials} Bots, concurrency {args.concurrency} ###")  
+    report = run_async(loadtest(sim, args.credentials, args.concurrency))  
+    for phase in ("connections", "issuance", "verification"):  
+        summary = report[phase]  
+        print(f"   {phase:<13} {summary.get('succeeded', summary.get('completed'))} ok, {summary['failed']} failed "  
+              f"in {summary['elapsed']}s ({summary['throughput']}/s)")  
+    print(f"   revocation    {report['revocation']['revoked']} revoked, "  
+          f"{report['revocation']['ledger_writes']} ledger write(s)")  
+    print("\n   ADMIN API LATENCY (ms)")  
+    for route, stats in report["admin_api"].items():  
+        print(f"   {route:<24} {stats['calls']:>7} calls {stats['errors']:>5} errors  "  
+              f"p50 {stats['p50']:>8} p95 {stats['p95']:>8} p99 {stats['p99']:>8}")  
+    return 0  
+  
+if __name__ == "__main__":  
+    raise SystemExit(main())
\ No newline at end of file
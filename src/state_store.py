@@ -0,0 +1,321 @@
+import os  
+import sqlite3  
+import tempfile  
+import threading  
+from contextlib import contextmanager  
+from . import codec  
+  
+DEFAULT_NAMESPACE = ""  
+  
+# Per-credential record fields that can be looked up directly  
+CREDENTIAL_INDEX_FIELDS = ("thread_id", "connection_id", "cred_def_id", "rev_reg_id", "cred_rev_id", "state")  
+  
+# Top-level keys of the JSON file that hold namespaces and credential records  
+NAMESPACES_KEY = "_namespaces"  
+CREDENTIALS_KEY = "_credentials"  
+  
+def namespace_for(tenant=None, environment=None, cred_def_id=None):  
+    """Namespace name for a tenant / environment / credential definition ("" = default)."""  
+    return "/".join(str(part) for part in (tenant, environment, cred_def_id) if part)  
+  
+def check_filters(filters):  
+    unknown = set(filters) - set(CREDENTIAL_INDEX_FIELDS)  
+    if unknown:  
+        raise ValueError(f"Not an indexed credential field: {', '.join(sorted(unknown))}")  
+  
+class DictTransaction:  
+    """Key/value view handed out by JsonFileStore.transaction()."""  
+  
+    def __init__(self, data, namespace=DEFAULT_NAMESPACE):  
+        self.data = data  
+        self.namespace = namespace  
+  
+    def _values(self):  
+        if self.namespace == DEFAULT_NAMESPACE:  
+            return self.data  
+        return self.data.setdefault(NAMESPACES_KEY, {}).setdefault(self.namespace, {})  
+  
+    def get(self, key, default=None):  
+        return self._values().get(key, default)  
+  
+    def set(self, key, value):  
+        self._values()[key] = value  
+  
+    def delete(self, key):  
+        self._values().pop(key, None)  
+  
+    def put_credential(self, record):  
+        """Insert or update (merge) a credential record keyed by cred_ex_id."""  
+        records = self.data.setdefault(CREDENTIALS_KEY, {}).setdefault(self.namespace, {})  
+        merged = dict(records.get(record["cred_ex_id"], {}))  
+        merged.update(record)  
+        records[record["cred_ex_id"]] = merged  
+        return merged  
+  
+class JsonFileStore:  
+    """State kept in a JSON file, as the scripts always did.  
+  
+    Reads are served from an in-process cache while the file is unchanged on  
+    disk, writes go through a temporary file and an atomic rename so a crash  
+    never leaves a truncated file, and writers in this process are serialized.  
+    Default-namespace keys stay at the top level of the file; other namespaces  
+    and credential records live under reserved keys. Use SqliteStore when  
+    several processes write concurrently.  
+    """  
+  
+    def __init__(self, path):  
+        self.path = path  
+        self._lock = threading.RLock()  
+        self._cache = None  
+        self._signature = None  
+        self._index = None  
+  
+    def _stat(self):  
+        try:  
+            st = os.stat(self.path)  
+        except FileNotFoundError:  
+            return None  
+        return (st.st_mtime_ns, st.st_size)  
+  
+    def _read(self):  
+        signature = self._stat()  
+        if signature is None:  
+            return {}  
+        if signature != self._signature:  
+            with open(self.path, 'rb') as f:  
+                self._cache = codec.loads(f.read())  
+            self._signature = signature  
+            self._index = None  
+        return self._cache  
+  
+    def _write(self, data):  
+        directory = os.path.dirname(os.path.abspath(self.path))  
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".state-", suffix=".tmp")  
+        try:  
+            with os.fdopen(fd, 'wb') as f:  
+                f.write(codec.dumps(data, pretty=True))  
+                f.flush()  
+                os.fsync(f.fileno())  
+            os.replace(tmp_path, self.path)  
+        except BaseException:  
+            if os.path.exists(tmp_path):  
+                os.remove(tmp_path)  
+            raise  
+        self._cache = data  
+        self._signature = self._stat()  
+        self._index = None  
+  
+    def _credentials(self, namespace):  
+        return self._read().get(CREDENTIALS_KEY, {}).get(namespace, {})  
+  
+    def _lookup(self, namespace, field, value):  
+        # Indexes are rebuilt lazily after the file changes  
+        if self._index is None:  
+            index = {}  
+            for ns, records in self._read().get(CREDENTIALS_KEY, {}).items():  
+                for cred_ex_id, record in records.items():  
+                    for name in CREDENTIAL_INDEX_FIELDS:  
+                        if record.get(name) is not None:  
+                            index.setdefault((ns, name, str(record[name])), []).append(cred_ex_id)  
+            self._index = index  
+        return self._index.get((namespace, field, str(value)), [])  
+  
+    def load(self, namespace=DEFAULT_NAMESPACE):  
+        with self._lock:  
+            data = self._read()  
+            if namespace != DEFAULT_NAMESPACE:  
+                return dict(data.get(NAMESPACES_KEY, {}).get(namespace, {}))  
+            return {k: v for k, v in data.items() if k not in (NAMESPACES_KEY, CREDENTIALS_KEY)}  
+  
+    def get(self, key, default=None, namespace=DEFAULT_NAMESPACE):  
+        with self._lock:  
+            return DictTransaction(self._read(), namespace).get(key, default)  
+  
+    def namespaces(self):  
+        with self._lock:  
+            data = self._read()  
+            return sorted(set(data.get(NAMESPACES_KEY, {})) | set(data.get(CREDENTIALS_KEY, {})))  
+  
+    def update(self, values, namespace=DEFAULT_NAMESPACE):  
+        """Set several keys in one atomic write."""  
+        with self.transaction(namespace) as txn:  
+            for key, value in values.items():  
+                txn.set(key, value)  
+  
+    def put_credential(self, record, namespace=DEFAULT_NAMESPACE):  
+        with self.transaction(namespace) as txn:  
+            return txn.put_credential(record)  
+  
+    def get_credential(self, cred_ex_id, namespace=DEFAULT_NAMESPACE):  
+        with self._lock:  
+            record = self._credentials(namespace).get(cred_ex_id)  
+            return dict(record) if record else None  
+  
+    def find_credentials(self, namespace=DEFAULT_NAMESPACE, **filters):  
+        """Credential records whose indexed fields equal all filters."""  
+        check_filters(filters)  
+        with self._lock:  
+            records = self._credentials(namespace)  
+            if not filters:  
+                return [dict(r) for r in records.values()]  
+            field, value = next(iter(filters.items()))  
+            candidates = (records[i] for i in self._lookup(namespace, field, value))  
+            return [dict(r) for r in candidates  
+                    if all(str(r.get(k)) == str(v) for k, v in filters.items())]  
+  
+    @contextmanager  
+    def transaction(self, namespace=DEFAULT_NAMESPACE):  
+        """Read-modify-write the state atomically; nothing is written on error."""  
+        with self._lock:  
+            data = codec.copy(self._read())  
+            yield DictTransaction(data, namespace)  
+            self._write(data)  
+  
+class SqliteTransaction:  
+    """Key/value view over an open SQLite transaction."""  
+  
+    def __init__(self, conn, namespace=DEFAULT_NAMESPACE):  
+        self.conn = conn  
+        self.namespace = namespace  
+  
+    def get(self, key, default=None):  
+        row = self.conn.execute("SELECT value FROM state WHERE namespace = ? AND key = ?",  
+                                (self.namespace, key)).fetchone()  
+        return codec.loads(row[0]) if row else default  
+  
+    def set(self, key, value):  
+        self.conn.execute("INSERT INTO state (namespace, key, value) VALUES (?, ?, ?) "  
+                          "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value",  
+                          (self.namespace, key, codec.dumps_text(value)))  
+  
+    def delete(self, key):  
+        self.conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (self.namespace, key))  
+  
+    def put_credential(self, record):  
+        """Insert or update (merge) a credential record keyed by cred_ex_id."""  
+        row = self.conn.execute("SELECT data FROM credentials WHERE namespace = ? AND cred_ex_id = ?",  
+                                (self.namespace, record["cred_ex_id"])).fetchone()  
+        merged = codec.loads(row[0]) if row else {}  
+        merged.update(record)  
+        indexed = [None if merged.get(f) is None else str(merged[f]) for f in CREDENTIAL_INDEX_FIELDS]  
+        self.conn.execute(f"INSERT OR REPLACE INTO credentials (namespace, cred_ex_id, "  
+                          f"{', '.join(CREDENTIAL_INDEX_FIELDS)}, data) "  
+                          f"VALUES ({', '.join('?' * (len(CREDENTIAL_INDEX_FIELDS) + 3))})",  
+                          (self.namespace, merged["cred_ex_id"], *indexed, codec.dumps_text(merged)))  
+        return merged  
+  
+SCHEMA = [  
+    "CREATE TABLE IF NOT EXISTS state (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "  
+    "PRIMARY KEY (namespace, key))",  
+    f"CREATE TABLE IF NOT EXISTS credentials (namespace TEXT NOT NULL, cred_ex_id TEXT NOT NULL, "  
+    f"{', '.join(f + ' TEXT' for f in CREDENTIAL_INDEX_FIELDS)}, data TEXT NOT NULL, "  
+    f"PRIMARY KEY (namespace, cred_ex_id))",  
+    "CREATE INDEX IF NOT EXISTS credentials_thread ON credentials (namespace, thread_id)",  
+    "CREATE INDEX IF NOT EXISTS credentials_connection ON credentials (namespace, connection_id)",  
+    "CREATE INDEX IF NOT EXISTS credentials_cred_def ON credentials (namespace, cred_def_id)",  
+    "CREATE INDEX IF NOT EXISTS credentials_revocation ON credentials (namespace, rev_reg_id, cred_rev_id)",  
+]  
+  
+class SqliteStore:  
+    """State kept in SQLite (WAL), safe for many concurrent workers and processes.  
+  
+    Every transaction is BEGIN IMMEDIATE, so multi-key updates are atomic and  
+    writers queue on SQLite's lock instead of losing each other's updates.  
+    Namespace reads are cached in-process and revalidated with PRAGMA  
+    data_version, which changes whenever another connection commits.  
+    Credential records are indexed by thread, connection, cred def and  
+    (rev_reg_id, cred_rev_id).  
+    """  
+  
+    def __init__(self, path, timeout=30.0):  
+        self.path = path  
+        self.timeout = timeout  
+        self._local = threading.local()  
+        self._cache_lock = threading.Lock()  
+        self._cache = {}  
+        self._cache_version = None  
+        with self.transaction() as txn:  
+            for statement in SCHEMA:  
+                txn.conn.execute(statement)  
+  
+    def _conn(self):  
+        conn = getattr(self._local, "conn", None)  
+        if conn is None:  
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)  
+            conn.execute("PRAGMA journal_mode=WAL")  
+            conn.execute("PRAGMA synchronous=NORMAL")  
+            self._local.conn = conn  
+        return conn  
+  
+    def _version(self, conn):  
+        # data_version is per connection; pair it with the connection so  
+        # threads with their own connection do not mix counters  
+        return (id(conn), conn.execute("PRAGMA data_version").fetchone()[0])  
+  
+    def load(self, namespace=DEFAULT_NAMESPACE):  
+        conn = self._conn()  
+        version = self._version(conn)  
+        with self._cache_lock:  
+            if self._cache_version != version:  
+                self._cache, self._cache_version = {}, version  
+            if namespace in self._cache:  
+                return dict(self._cache[namespace])  
+        data = {key: codec.loads(value) for key, value in  
+                conn.execute("SELECT key, value FROM state WHERE namespace = ?", (namespace,))}  
+        with self._cache_lock:  
+            if self._cache_version == version:  
+                self._cache[namespace] = data  
+        return dict(data)  
+  
+    def get(self, key, default=None, namespace=DEFAULT_NAMESPACE):  
+        return SqliteTransaction(self._conn(), namespace).get(key, default)  
+  
+    def namespaces(self):  
+        rows = self._conn().execute("SELECT namespace FROM state WHERE namespace != '' "  
+                                    "UNION SELECT namespace FROM credentials ORDER BY 1")  
+        return [row[0] for row in rows]  
+  
+    def update(self, values, namespace=DEFAULT_NAMESPACE):  
+        """Set several keys in one transaction."""  
+        with self.transaction(namespace) as txn:  
+            for key, value in values.items():  
+                txn.set(key, value)  
+  
+    def put_credential(self, record, namespace=DEFAULT_NAMESPACE):  
+        with self.transaction(namespace) as txn:  
+            return txn.put_credential(record)  
+  
+    def get_credential(self, cred_ex_id, namespace=DEFAULT_NAMESPACE):  
+        row = self._conn().execute("SELECT data FROM credentials WHERE namespace = ? AND cred_ex_id = ?",  
+                                   (namespace, cred_ex_id)).fetchone()  
+        return codec.loads(row[0]) if row else None  
+  
+    def find_credentials(self, namespace=DEFAULT_NAMESPACE, **filters):  
+        """Credential records whose indexed fields equal all filters."""  
+        check_filters(filters)  
+        where = "".join(f" AND {field} = ?" for field in filters)  
+        rows = self._conn().execute(f"SELECT data FROM credentials WHERE namespace = ?{where}",  
+                                    (namespace, *(str(v) for v in filters.values())))  
+        return [codec.loads(row[0]) for row in rows]  
+  
+    @contextmanager  
+    def transaction(self, namespace=DEFAULT_NAMESPACE):  
+        """Atomic read-modify-write; rolled back if the block raises."""  
+        conn = self._conn()  
+        conn.execute("BEGIN IMMEDIATE")  
+        try:  
+            yield SqliteTransaction(conn, namespace)  
+        except BaseException:  
+            conn.execute("ROLLBACK")  
+            raise  
+        conn.execute("COMMIT")  
+        with self._cache_lock:  
+            self._cache, self._cache_version = {}, None  
+  
+    def close(self):  
+        conn = getattr(self._local, "conn", None)  
+        if conn is not None:  
+            conn.close()  
+            self._local.conn = None  
+  
+STORES = {"json": JsonFileStore, "sqlite": SqliteStore}
\ No newline at end of file
@@ -0,0 +1,341 @@
+import argparse  
+import asyncio  
+import hashlib  
+import json  
+import mmap  
+import os  
+import tempfile  
+import threading  
+from email import policy  
+from email.parser import BytesParser  
+from collections import OrderedDict  
+from contextlib import asynccontextmanager  
+import httpx  
+from aiohttp import web  
+from .config import (TAILS_SERVER_URL, TAILS_CACHE_DIR, TAILS_PROXY_HOST, TAILS_PROXY_PORT,  
+                     TAILS_CACHE_OPEN_FILES, ISSUER_URL)  
+from .client import get_async_client, run_async  
+from .retry import retry_with_backoff  
+from .state_store import namespace_for  
+from .utils import load_state  
+  
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"  
+INDEX_FILE = "index.json"  
+  
+class TailsHashMismatch(ValueError):  
+    """Downloaded or uploaded tails content does not match the registry's tails hash."""  
+  
+def b58encode(data: bytes) -> str:  
+    number = int.from_bytes(data, "big")  
+    encoded = ""  
+    while number:  
+        number, rest = divmod(number, 58)  
+        encoded = B58_ALPHABET[rest] + encoded  
+    pad = len(data) - len(data.lstrip(b"\0"))  
+    return "1" * pad + encoded  
+  
+def tails_hash_matches(digest: bytes, expected: str) -> bool:  
+    """Registries publish base58(sha256(tails)); the hex form is accepted too."""  
+    return expected in (b58encode(digest), digest.hex())  
+  
+def tails_upload_parts(body: bytes, content_type: str):  
+    """(tails file, expected hash) of an upload: a raw body, or the indy-tails-server multipart form."""  
+    if not content_type.startswith("multipart/"):  
+        return body, None  
+    message = BytesParser(policy=policy.HTTP).parsebytes(  
+        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)  
+    for part in message.iter_parts():  
+        if part.get_param("name", header="content-disposition") == "tails":  
+            return part.get_payload(decode=True), None  
+    raise ValueError("Upload has no tails part")  
+  
+class TailsCache:  
+    """Content-addressed tails files on disk, served from memory maps.  
+  
+    Files live under `directory` named by the hex sha256 of their content,  
+    with an index.json mapping rev_reg_id to hash, so identical tails are  
+    stored once and a restarted process (or tails server) starts warm. The  
+    hash is checked once, on ingest; reads return a memoryview over an mmap  
+    of the file, and up to `max_open` maps stay open. Misses are downloaded  
+    from `upstream` once, however many callers wait for them. When no hash is  
+    given for a miss, `resolve_hash` (an async rev_reg_id -> tails hash, e.g.  
+    registry_tails_hash) looks it up, and the download is refused if it finds  
+    none.  
+    """  
+  
+    def __init__(self, directory=TAILS_CACHE_DIR, upstream=TAILS_SERVER_URL, max_open=TAILS_CACHE_OPEN_FILES,  
+                 resolve_hash=None):  
+        self.directory = directory  
+        self.upstream = upstream.rstrip("/")  
+        self.max_open = max_open  
+        self.resolve_hash = resolve_hash  
+        self.hits = 0  
+        self.misses = 0  
+        self.downloads = 0  
+        self._maps = OrderedDict()  
+        self._lock = threading.Lock()  
+        self._inflight = {}  
+        self._http = None  
+        os.makedirs(directory, exist_ok=True)  
+        self._index = self._read_index()  
+  
+    def _read_index(self):  
+        try:  
+            with open(os.path.join(self.directory, INDEX_FILE), 'r') as f:  
+                return json.load(f)  
+        except (FileNotFoundError, ValueError):  
+            return {}  
+  
+    def _write_index(self):  
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")  
+        with os.fdopen(fd, 'w') as f:  
+            json.dump(self._index, f, indent=2)  
+        os.replace(tmp, os.path.join(self.directory, INDEX_FILE))  
+  
+    def path_for(self, digest: str) -> str:  
+        return os.path.join(self.directory, digest)  
+  
+    def digest_of(self, rev_reg_id):  
+        """Hex sha256 of a cached registry's tails file, or None."""  
+        digest = self._index.get(rev_reg_id)  
+        if digest and os.path.exists(self.path_for(digest)):  
+            return digest  
+        return None  
+  
+    def __contains__(self, rev_reg_id):  
+        return self.digest_of(rev_reg_id) is not None  
+  
+    def ingest(self, rev_reg_id, data, expected_hash=None) -> str:  
+        """Verify and store a tails file for rev_reg_id; returns its hex sha256."""  
+        raw = hashlib.sha256(data).digest()  
+        if expected_hash and not tails_hash_matches(raw, expected_hash):  
+            raise TailsHashMismatch(f"Tails file of {rev_reg_id} does not match hash {expected_hash}")  
+        digest = raw.hex()  
+        with self._lock:  
+            path = self.path_for(digest)  
+            if not os.path.exists(path):  
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")  
+                with os.fdopen(fd, 'wb') as f:  
+                    f.write(data)  
+                os.replace(tmp, path)  
+            if self._index.get(rev_reg_id) != digest:  
+                self._index[rev_reg_id] = digest  
+                self._write_index()  
+        return digest  
+  
+    def get(self, rev_reg_id):  
+        """Memoryview of a cached tails file, or None on a miss."""  
+        digest = self.digest_of(rev_reg_id)  
+        if digest is None:  
+            return None  
+        with self._lock:  
+            view = self._maps.get(digest)  
+            if view is None:  
+                with open(self.path_for(digest), 'rb') as f:  
+                    if os.fstat(f.fileno()).st_size == 0:  
+                        return memoryview(b"")  
+                    view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))  
+                self._maps[digest] = view  
+                while len(self._maps) > self.max_open:  
+                    # Views still held by readers keep their map alive until released  
+                    self._maps.popitem(last=False)  
+            self._maps.move_to_end(digest)  
+            return view  
+  
+    async def fetch(self, rev_reg_id, expected_hash=None):  
+        """Cached tails file of rev_reg_id, downloaded from upstream on a miss."""  
+        view = self.get(rev_reg_id)  
+        if view is not None:  
+            self.hits += 1  
+            return view  
+        self.misses += 1  
+        task = self._inflight.get(rev_reg_id)  
+        if task is None:  
+            task = asyncio.ensure_future(self._download(rev_reg_id, expected_hash))  
+            self._inflight[rev_reg_id] = task  
+            task.add_done_callback(lambda _: self._inflight.pop(rev_reg_id, None))  
+        await asyncio.shield(task)  
+        return self.get(rev_reg_id)  
+  
+    async def _download(self, rev_reg_id, expected_hash):  
+        if not expected_hash and self.resolve_hash is not None:  
+            expected_hash = await self.resolve_hash(rev_reg_id)  
+            if not expected_hash:  
+                raise TailsHashMismatch(f"No tails hash published for {rev_reg_id}")  
+  
+        @retry_with_backoff(max_attempts=3, initial_delay=0.5, circuit="tails:download")  
+        async def download():  
+            resp = await self.http.get(f"{self.upstream}/{rev_reg_id}")  
+            resp.raise_for_status()  
+            return resp.content  
+  
+        data = await download()  
+        self.downloads += 1  
+        # Hashing a large file is CPU work: keep it off the loop  
+        await asyncio.to_thread(self.ingest, rev_reg_id, data, expected_hash)  
+  
+    async def upload(self, rev_reg_id, body, content_type="application/octet-stream"):  
+        """Forward an upload to the upstream server as is, then cache the tails file it accepted.  
+  
+        Only a 2xx upload is ingested, checked against the registry's tails  
+        hash (from resolve_hash when the upload carries none); without a  
+        published hash the file is left to be fetched, and checked, on demand.  
+        Returns the upstream response.  
+        """  
+        data, expected_hash = tails_upload_parts(body, content_type)  
+        resp = await self.http.put(f"{self.upstream}/{rev_reg_id}", content=body,  
+                                   headers={"Content-Type": content_type})  
+        if not resp.is_success:  
+            return resp  
+        if not expected_hash and self.resolve_hash is not None:  
+            expected_hash = await self.resolve_hash(rev_reg_id)  
+            if not expected_hash:  
+                return resp  
+        await asyncio.to_thread(self.ingest, rev_reg_id, data, expected_hash)  
+        return resp  
+  
+    async def prefetch(self, registries):  
+        """Warm the cache for {rev_reg_id: tails_hash or None}; returns {rev_reg_id: error or None}."""  
+        async def one(rev_reg_id, tails_hash):  
+            try:  
+                await self.fetch(rev_reg_id, tails_hash)  
+                return rev_reg_id, None  
+            except Exception as e:  
+                return rev_reg_id, e  
+        return dict(await asyncio.gather(*(one(r, h) for r, h in registries.items())))  
+  
+    @property  
+    def http(self) -> httpx.AsyncClient:  
+        if self._http is None:  
+            self._http = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=5.0))  
+        return self._http  
+  
+    def stats(self):  
+        return {"files": len(set(self._index.values())), "registries": len(self._index), "open_maps": len(self._maps),  
+                "hits": self.hits, "misses": self.misses, "downloads": self.downloads}  
+  
+    async def aclose(self):  
+        if self._http is not None:  
+            await self._http.aclose()  
+            self._http = None  
+        with self._lock:  
+            self._maps.clear()  
+  
+def create_tails_app(cache: TailsCache) -> web.Application:  
+    """aiohttp app speaking the tails server protocol in front of the cache."""  
+    async def get_tails(request):  
+        rev_reg_id = request.match_info["rev_reg_id"]  
+        try:  
+            view = await cache.fetch(rev_reg_id)  
+        except Exception as e:  
+            return web.json_response({"error": f"tails unavailable: {e}"}, status=502)  
+        return web.Response(body=view, content_type="application/octet-stream")  
+  
+    async def put_tails(request):  
+        rev_reg_id = request.match_info["rev_reg_id"]  
+        body = await request.read()  
+        content_type = request.headers.get("Content-Type", "application/octet-stream")  
+        try:  
+            resp = await cache.upload(rev_reg_id, body, content_type)  
+        except ValueError as e:  
+            return web.json_response({"error": str(e)}, status=400)  
+        except httpx.HTTPError as e:  
+            return web.json_response({"error": f"upstream upload failed: {e}"}, status=502)  
+        return web.Response(body=resp.content, status=resp.status_code)  
+  
+    app = web.Application(client_max_size=1024 ** 3)  
+    app.router.add_get("/{rev_reg_id}", get_tails)  
+    app.router.add_put("/{rev_reg_id}", put_tails)  
+    return app  
+  
+async def start_tails_proxy(cache, host=TAILS_PROXY_HOST, port=TAILS_PROXY_PORT) -> web.AppRunner:  
+    """Start the caching proxy on the running loop; call runner.cleanup() to stop it."""  
+    runner = web.AppRunner(create_tails_app(cache))  
+    await runner.setup()  
+    await web.TCPSite(runner, host, port).start()  
+    return runner  
+  
+@asynccontextmanager  
+async def tails_proxy(cache=None, host=TAILS_PROXY_HOST, port=TAILS_PROXY_PORT):  
+    """Run the caching proxy for the duration of the block and yield its cache."""  
+    cache = cache or TailsCache(resolve_hash=registry_tails_hash)  
+    runner = await start_tails_proxy(cache, host, port)  
+    try:  
+        yield cache  
+    finally:  
+        await runner.cleanup()  
+        await cache.aclose()  
+  
+def catalog_cred_def_ids(catalog):  
+    """Cred def ids of a catalog, as saved by `catalog apply`; missing ones are skipped."""  
+    ids = []  
+    for spec in catalog.schemas:  
+        state = load_state(namespace_for(spec.issuer))  
+        for cred in spec.cred_defs:  
+            cred_def_id = state.get(f"cred_def:{spec.name}:{spec.version}:{cred.tag}")  
+            if cred_def_id and cred.support_revocation:  
+                ids.append(cred_def_id)  
+    return ids  
+  
+async def registry_tails_hash(rev_reg_id, issuer=None):  
+    """Tails hash of a revocation registry definition, or None if it cannot be read."""  
+    issuer = issuer or get_async_client(ISSUER_URL)  
+    details = await issuer.get_registry(rev_reg_id)  
+    result = details.json().get("result", {}) if details.status_code == 200 else {}  
+    return result.get("tails_hash")  
+  
+async def registries_of(cred_def_ids, issuer=None):  
+    """{rev_reg_id: tails_hash} of every revocation registry of the given cred defs."""  
+    issuer = issuer or get_async_client(ISSUER_URL)  
+    registries = {}  
+    for cred_def_id in cred_def_ids:  
+        resp = await issuer.get_registries(cred_def_id=cred_def_id)  
+        if resp.status_code != 200:  
+            continue  
+        for rev_reg_id in resp.json().get("rev_reg_ids", []):  
+            registries[rev_reg_id] = await registry_tails_hash(rev_reg_id, issuer)  
+    return registries  
+  
+async def prefetch_catalog(cache, catalog, issuer=None):  
+    return await cache.prefetch(await registries_of(catalog_cred_def_ids(catalog), issuer))  
+  
+def main(argv=None):  
+    from .catalog import load_catalog  
+  
+    parser = argparse.ArgumentParser(description="Local content-addressed tails file cache.")  
+    commands = parser.add_subparsers(dest="command", required=True)  
+    serve = commands.add_parser("serve", help="run the caching tails proxy")  
+    serve.add_argument("--host", default=TAILS_PROXY_HOST)  
+    serve.add_argument("--port", type=int, default=TAILS_PROXY_PORT)  
+    serve.add_argument("--prefetch", metavar="CATALOG", help="warm the cache for a catalog's registries first")  
+    prefetch = commands.add_parser("prefetch", help="download the tails files of a catalog's registries")  
+    prefetch.add_argument("catalog", help="catalog JSON file (see catalog.json)")  
+    args = parser.parse_args(argv)  
+  
+    async def warm(cache, path):  
+        print(f"### PREFETCHING TAILS FOR {path} ###")  
+        results = await prefetch_catalog(cache, load_catalog(path))  
+        for rev_reg_id, error in sorted(results.items()):  
+            print(f"   {'❌' if error else '✅'} {rev_reg_id} {error or ''}")  
+        return 1 if any(results.values()) else 0  
+  
+    async def run():  
+        cache = TailsCache(resolve_hash=registry_tails_hash)  
+        if args.command == "prefetch":  
+            try:  
+                return await warm(cache, args.catalog)  
+            finally:  
+                await cache.aclose()  
+        async with tails_proxy(cache, args.host, args.port):  
+            if args.prefetch:  
+                await warm(cache, args.prefetch)  
+            print(f"✅ Tails proxy on {args.host}:{args.port} -> {cache.upstream} ({cache.directory})")  
+            await asyncio.Event().wait()  
+  
+    try:  
+        return run_async(run())  
+    except KeyboardInterrupt:  
+        return 0  
+  
+if __name__ == "__main__":  
+    raise SystemExit(main())
\ No newline at end of file
@@ -1,25 +1,46 @@
-import json  
-import os  
-from .config import STATE_FILE  
-  
-def load_state():  
-    if not os.path.exists(STATE_FILE):  
-        return {}  
-    with open(STATE_FILE, 'r') as f:  
-        return json.load(f)  
-  
-def save_state(key, value):  
-    data = load_state()  
-    data[key] = value  
-    with open(STATE_FILE, 'w') as f:  
-        json.dump(data, f, indent=4)  
+import threading  
+from .config import STATE_FILE, STATE_BACKEND, STATE_DB  
+from .connections import get_connection_resolver, fetch_connection_id  
+from .state_store import STORES, DEFAULT_NAMESPACE, namespace_for  
+  
+_stores = {}  
+_stores_lock = threading.Lock()  
+  
+def get_state_store():  
+    """Shared store for the configured STATE_BACKEND (one instance per file)."""  
+    path = STATE_DB if STATE_BACKEND == "sqlite" else STATE_FILE  
+    key = (STATE_BACKEND, path)  
+    with _stores_lock:  
+        if key not in _stores:  
+            _stores[key] = STORES[STATE_BACKEND](path)  
+        return _stores[key]  
+  
+def load_state(namespace=DEFAULT_NAMESPACE):  
+    return get_state_store().load(namespace)  
+  
+def save_state(key, value, namespace=DEFAULT_NAMESPACE):  
+    get_state_store().update({key: value}, namespace)  
     print(f"   [State] '{key}' saved.")  
   
-def get_connection_id(agent_url, alias_filter):  
-    """Fetch active connection ID by alias."""  
-    import requests  
-    resp = requests.get(f"{agent_url}/connections", params={"alias": alias_filter, "state": "active"})  
-    results = resp.json()['results']  
-    if results:  
-        return results[0]['connection_id']  
-    return None
\ No newline at end of file
+def save_states(values, namespace=DEFAULT_NAMESPACE):  
+    """Save several keys atomically (all or none)."""  
+    get_state_store().update(values, namespace)  
+    print(f"   [State] {', '.join(repr(k) for k in values)} saved.")  
+  
+def state_transaction(namespace=DEFAULT_NAMESPACE):  
+    """Atomic read-modify-write over the state: `with state_transaction() as txn: txn.set(...)`."""  
+    return get_state_store().transaction(namespace)  
+  
+def save_credential_record(record, namespace=DEFAULT_NAMESPACE):  
+    """Insert or update the record of one issued credential (keyed by cred_ex_id)."""  
+    return get_state_store().put_credential(record, namespace)  
+  
+def find_credential_records(namespace=DEFAULT_NAMESPACE, **filters):  
+    """Credential records matching indexed fields, e.g. rev_reg_id=..., cred_rev_id=..."""  
+    return get_state_store().find_credentials(namespace, **filters)  
+  
+def get_connection_id(agent_url, alias_filter, cached=True):  
+    """Fetch active connection ID by alias (through the shared resolver cache unless cached=False)."""  
+    if not cached:  
+        return fetch_connection_id(agent_url, alias_filter)  
+    return get_connection_resolver().resolve(agent_url, alias_filter)
\ No newline at end of file
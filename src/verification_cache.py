@@ -0,0 +1,127 @@
+import time  
+from collections import OrderedDict, defaultdict  
+from .config import VERIFICATION_CACHE_TTL, VERIFICATION_CACHE_SIZE, VERIFICATION_CACHE_UNWATCHED_TTL  
+  
+# Webhook topics announcing a revocation, and the state that means "revoked"  
+REVOCATION_TOPICS = {  
+    "issuer_cred_rev": "revoked",  
+    "revocation-notification": None,  
+    "revocation-notification-v2": None,  
+}  
+  
+def revoked_registry(topic, payload):  
+    """rev_reg_id a revocation event refers to, or None if it is not one."""  
+    if topic not in REVOCATION_TOPICS:  
+        return None  
+    state = REVOCATION_TOPICS[topic]  
+    if state and payload.get("state") != state:  
+        return None  
+    if payload.get("rev_reg_id"):  
+        return payload["rev_reg_id"]  
+    # Revocation notifications carry "<format>::<rev_reg_id>::<cred_rev_id>"  
+    parts = str(payload.get("thread_id", "")).split("::")  
+    return parts[1] if len(parts) == 3 else None  
+  
+class VerificationCache:  
+    """TTL + LRU cache of successful verifications per (connection id, cred_def_id).  
+  
+    Entries expire after ttl seconds, the least recently used entry is evicted  
+    beyond max_size, and every entry backed by a revocation registry is dropped  
+    as soon as a revocation in that registry is observed.  
+  
+    A cached result can be stale by as much as its lifetime, so ttl only  
+    applies once a revocation source is attached: an event bus (attach), a  
+    RevocationIndex (attach_index), or watched=True for callers that run  
+    invalidate_registry() from the revocation lists themselves. Until then  
+    entries live at most unwatched_ttl seconds, which bounds how long a  
+    revoked credential can keep verifying.  
+    """  
+  
+    def __init__(self, ttl=VERIFICATION_CACHE_TTL, max_size=VERIFICATION_CACHE_SIZE, clock=time.monotonic,  
+                 watched=False, unwatched_ttl=VERIFICATION_CACHE_UNWATCHED_TTL):  
+        self.ttl = ttl  
+        self.max_size = max_size  
+        self.clock = clock  
+        self.watched = watched  
+        self.unwatched_ttl = unwatched_ttl  
+        self.index = None  
+        self.hits = 0  
+        self.misses = 0  
+        self._entries = OrderedDict()  
+        self._by_registry = defaultdict(set)  
+  
+    def __len__(self):  
+        return len(self._entries)  
+  
+    def get(self, conn_id, cred_def_id):  
+        """Cached result for the connection, or None if absent or expired."""  
+        key = (conn_id, cred_def_id)  
+        entry = self._entries.get(key)  
+        if entry is not None and self.index is not None and self.index.prescreen(conn_id) is not None:  
+            self._remove(key)  
+            entry = None  
+        if entry is None or entry[0] <= self.clock():  
+            if entry is not None:  
+                self._remove(key)  
+            self.misses += 1  
+            return None  
+        self._entries.move_to_end(key)  
+        self.hits += 1  
+        return entry[1]  
+  
+    def put(self, conn_id, cred_def_id, result):  
+        """Cache a verification result; only verified proofs are kept."""  
+        if not result or not result.get("verified"):  
+            return  
+        key = (conn_id, cred_def_id)  
+        if key in self._entries:  
+            self._remove(key)  
+        self._entries[key] = (self.clock() + self.effective_ttl(), result)  
+        for rev_reg_id in result.get("rev_reg_ids", []):  
+            self._by_registry[rev_reg_id].add(key)  
+        while len(self._entries) > self.max_size:  
+            self._remove(next(iter(self._entries)))  
+  
+    def effective_ttl(self):  
+        """Lifetime of new entries: ttl once a revocation source is attached, else at most unwatched_ttl."""  
+        return self.ttl if self.watched else min(self.ttl, self.unwatched_ttl)  
+  
+    def invalidate(self, conn_id, cred_def_id):  
+        self._remove((conn_id, cred_def_id))  
+  
+    def invalidate_registry(self, rev_reg_id):  
+        """Drop every entry backed by a registry; returns how many were dropped."""  
+        keys = self._by_registry.pop(rev_reg_id, set())  
+        for key in keys:  
+            self._remove(key)  
+        return len(keys)  
+  
+    def clear(self):  
+        self._entries.clear()  
+        self._by_registry.clear()  
+  
+    def attach(self, bus):  
+        """Invalidate registries on revocation events published on an event bus."""  
+        def on_event(agent, topic, payload):  
+            rev_reg_id = revoked_registry(topic, payload)  
+            if rev_reg_id:  
+                self.invalidate_registry(rev_reg_id)  
+        bus.subscribe("*", on_event)  
+        self.watched = True  
+        return on_event  
+  
+    def attach_index(self, index):  
+        """Drop the entry of a connection the RevocationIndex knows to be revoked when it is read."""  
+        self.index = index  
+        self.watched = True  
+  
+    def _remove(self, key):  
+        entry = self._entries.pop(key, None)  
+        if entry is None:  
+            return  
+        for rev_reg_id in entry[1].get("rev_reg_ids", []):  
+            keys = self._by_registry.get(rev_reg_id)  
+            if keys is not None:  
+                keys.discard(key)  
+                if not keys:  
+                    del self._by_registry[rev_reg_id]
\ No newline at end of file
@@ -1,16 +1,24 @@
-import requests  
+import asyncio  
 import json  
 import time  
 import sys  
-from .config import VERIFIER_URL  
+import requests  
+from .config import VERIFIER_URL, USE_WEBHOOKS  
+from .client import get_client, get_async_client, run_async  
 from .utils import load_state, get_connection_id  
+from .non_revoked import make_policy  
+from .codec import response_json  
+from .webhooks import webhook_events  
   
-def send_proof_request(conn_id, cred_def_id):  
-    """Send proof request to Holder"""  
-    # Non-revocation interval (from the beginning of time to now)  
-    to_timestamp = int(time.time())  
+def build_proof_request(conn_id, cred_def_id, policy=None):  
+    """Build the revocable personhood proof request for a connection  
+  
+    The non-revocation interval comes from `policy` (see non_revoked.py),  
+    NON_REVOKED_POLICY by default.  
+    """  
+    non_revoked = (policy or make_policy()).interval(cred_def_id)  
   
-    proof_request = {  
+    return {  
         "connection_id": conn_id,  
         "presentation_request": {  
             "anoncreds": {  
@@ -21,17 +29,21 @@ def send_proof_request(conn_id, cred_def_id):
                     "0_personhood_uuid": {  
                         "names": ["person_hash", "biometric_score"],  
                         "restrictions": [{"cred_def_id": cred_def_id}],  
-                        "non_revoked": {"from": 0, "to": to_timestamp}  
+                        "non_revoked": dict(non_revoked)  
                     }  
                 },  
                 "requested_predicates": {},  
-                "non_revoked": {"from": 0, "to": to_timestamp}  
+                "non_revoked": dict(non_revoked)  
             }  
         }  
     }  
   
+def send_proof_request(conn_id, cred_def_id, policy=None):  
+    """Send proof request to Holder"""  
+    proof_request = build_proof_request(conn_id, cred_def_id, policy)  
+  
     try:  
-        resp = requests.post(f"{VERIFIER_URL}/present-proof-2.0/send-request", json=proof_request)  
+        resp = get_client(VERIFIER_URL).send_proof_request(proof_request)  
         if resp.status_code != 200:  
             print(f"Request Error: {resp.text}")  
             return None  
@@ -44,6 +56,108 @@ def send_proof_request(conn_id, cred_def_id):
         print(f"Send error: {e}")  
         return None  
   
+async def send_proof_request_async(conn_id, cred_def_id, verifier=None, policy=None):  
+    """Async variant of send_proof_request; returns pres_ex_id.  
+  
+    An agent error raises requests.HTTPError with its status and answer, so  
+    callers can tell it from a Bot that never presents.  
+    """  
+    verifier = verifier or get_async_client(VERIFIER_URL)  
+    resp = await verifier.send_proof_request(build_proof_request(conn_id, cred_def_id, policy))  
+    if resp.status_code != 200:  
+        raise requests.HTTPError(f"Status: {resp.status_code}, Response: {resp.text}", response=resp)  
+    return resp.json().get("pres_ex_id")  
+  
+async def verify_received(verifier, pres_ex_id):  
+    """Run verify-presentation on a received proof and summarize the result"""  
+    verify_data = response_json(await verifier.verify_presentation(pres_ex_id))  
+    identifiers = verify_data.get("by_format", {}).get("pres", {}).get("anoncreds", {}).get("identifiers", [])  
+    return {  
+        "pres_ex_id": pres_ex_id,  
+        "verified": str(verify_data.get("verified")).lower() == "true",  
+        "verified_msgs": verify_data.get("verified_msgs", []),  
+        "rev_reg_ids": sorted({i["rev_reg_id"] for i in identifiers if i.get("rev_reg_id")})  
+    }  
+  
+async def wait_for_presentation(verifier, pres_ex_id, bus, timeout):  
+    """Wait for the presentation-received webhook of pres_ex_id.  
+  
+    Returns the final record state, or None on timeout. A single GET after the  
+    timeout covers a webhook lost in transit.  
+    """  
+    try:  
+        event = await bus.wait_for_state("present_proof_v2_0", pres_ex_id,  
+                                         ("presentation-received", "abandoned"), timeout)  
+        return event.get("state")  
+    except asyncio.TimeoutError:  
+        status_resp = await verifier.get_pres_ex_record(pres_ex_id)  
+        if status_resp.status_code != 200:  
+            return None  
+        return status_resp.json().get("state")  
+  
+async def request_and_verify_proof(conn_id, cred_def_id, verifier=None, attempts=20, interval=2.0, bus=None,  
+                                   policy=None):  
+    """Request a proof and verify it once the Bot presents it.  
+  
+    With an event bus the presentation is awaited via webhooks, otherwise the  
+    record is polled every interval seconds. Returns {"pres_ex_id", "verified",  
+    "verified_msgs"}, or None if no presentation arrived in time; a request  
+    the agent refuses raises requests.HTTPError.  
+    """  
+    verifier = verifier or get_async_client(VERIFIER_URL)  
+  
+    pres_ex_id = await send_proof_request_async(conn_id, cred_def_id, verifier, policy)  
+    if not pres_ex_id:  
+        return None  
+  
+    if bus is not None:  
+        state_proof = await wait_for_presentation(verifier, pres_ex_id, bus, timeout=attempts * interval)  
+        if state_proof == "presentation-received":  
+            return await verify_received(verifier, pres_ex_id)  
+        return None  
+  
+    for i in range(attempts):  
+        await asyncio.sleep(interval)  
+        status_resp = await verifier.get_pres_ex_record(pres_ex_id)  
+        if status_resp.status_code == 404:  
+            break  
+  
+        if status_resp.json().get("state") == "presentation-received":  
+            return await verify_received(verifier, pres_ex_id)  
+  
+    return None  
+  
+async def check_personhood(conn_id, cred_def_id, cache=None, verifier=None, bus=None, policy=None, index=None):  
+    """Verify a connection, reusing a cached successful verification if any.  
+  
+    Same result as request_and_verify_proof, with "cached" set when it came  
+    from the VerificationCache. With a RevocationIndex, a connection whose  
+    credential is known to be revoked is denied without an exchange  
+    ("prescreened" set), and the connection is bound to the credential it  
+    presents so a later revocation is caught the same way.  
+    """  
+    if index is not None:  
+        rev_reg_id = index.prescreen(conn_id)  
+        if rev_reg_id is not None:  
+            if cache is not None:  
+                cache.invalidate(conn_id, cred_def_id)  
+            return {"pres_ex_id": None, "verified": False, "verified_msgs": ["credential revoked"],  
+                    "rev_reg_ids": [rev_reg_id], "prescreened": True}  
+  
+    if cache is not None:  
+        cached = cache.get(conn_id, cred_def_id)  
+        if cached is not None:  
+            return dict(cached, cached=True)  
+  
+    verifier = verifier or get_async_client(VERIFIER_URL)  
+    result = await request_and_verify_proof(conn_id, cred_def_id, verifier=verifier, bus=bus, policy=policy)  
+    if index is not None and result and result.get("pres_ex_id"):  
+        # Later checks of this (verifier-side) connection can then be pre-screened  
+        await index.bind_exchange(verifier, conn_id, result["pres_ex_id"])  
+    if cache is not None:  
+        cache.put(conn_id, cred_def_id, result)  
+    return result  
+  
 def main():  
     print("### 4. BANK REQUESTS PROOF (FINAL CORRECTED) ###")  
   
@@ -60,51 +174,36 @@ def main():
         return  
   
     print("   Sending challenge with revocation verification...")  
+    print("   Awaiting proof from Bot...")  
   
-    pres_ex_id = send_proof_request(conn_id, cred_def_id)  
-    if not pres_ex_id:  
-        return  
+    async def run():  
+        if not USE_WEBHOOKS:  
+            return await request_and_verify_proof(conn_id, cred_def_id)  
+        async with webhook_events() as bus:  
+            return await request_and_verify_proof(conn_id, cred_def_id, bus=bus)  
   
-    print("   Awaiting proof from Bot...")  
+    try:  
+        result = run_async(run())  
+    except Exception as e:  
+        print(f"\nPolling error: {e}")  
+        result = None  
   
-    for i in range(20):  
-        time.sleep(2)  
-        try:  
-            status_resp = requests.get(f"{VERIFIER_URL}/present-proof-2.0/records/{pres_ex_id}")  
-            if status_resp.status_code == 404: break  
-  
-            status_data = status_resp.json()  
-            state_proof = status_data.get("state", "unknown")  
-  
-            sys.stdout.write(f"\r   Status: '{state_proof}'   ")  
-            sys.stdout.flush()  
-  
-            if state_proof == "presentation-received":  
-                sys.stdout.write(" [Verifying...] ")  
-                verify_resp = requests.post(f"{VERIFIER_URL}/present-proof-2.0/records/{pres_ex_id}/verify-presentation")  
-  
-                verify_data = verify_resp.json()  
-                verified = verify_data.get("verified")  
-                error_msg = verify_data.get("verified_msgs", [])  
-  
-                print("\n\n   ✅ CYCLE COMPLETE!")  
-                print(f"   TECHNICAL RESULT: {verified}")  
-  
-                if str(verified).lower() == "true":  
-                    print("   🟢 STATUS: VALID")  
-                    print("   [OPEN FINANCE] Access to banking data: GRANTED.")  
-                else:  
-                    print("   🔴 STATUS: INVALID / REVOKED")  
-                    print("   [OPEN FINANCE] Access DENIED.")  
-                    if error_msg:  
-                        print(f"   Reason: {error_msg}")  
-                return  
-  
-        except Exception as e:  
-            print(f"\nPolling error: {e}")  
-            break  
+    if result is None:  
+        print("\n   ⚠️ Timeout exceeded.")  
+        return  
   
-    print("\n   ⚠️ Timeout exceeded.")  
+    print(f"   [OK] Transaction ID: {result['pres_ex_id']}")  
+    print("\n\n   ✅ CYCLE COMPLETE!")  
+    print(f"   TECHNICAL RESULT: {result['verified']}")  
+  
+    if result["verified"]:  
+        print("   🟢 STATUS: VALID")  
+        print("   [OPEN FINANCE] Access to banking data: GRANTED.")  
+    else:  
+        print("   🔴 STATUS: INVALID / REVOKED")  
+        print("   [OPEN FINANCE] Access DENIED.")  
+        if result["verified_msgs"]:  
+            print(f"   Reason: {result['verified_msgs']}")  
   
 if __name__ == "__main__":  
     main()
\ No newline at end of file
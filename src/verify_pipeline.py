@@ -0,0 +1,118 @@
+import asyncio  
+import time  
+from .config import VERIFIER_URL, VERIFY_CONCURRENCY, VERIFY_QUEUE_SIZE  
+from .client import get_async_client  
+from .verifier_proof import check_personhood  
+from .non_revoked import make_policy  
+  
+_DONE = object()  
+  
+class VerificationPipeline:  
+    """Verifies personhood for a stream of connections, many exchanges at once.  
+  
+    Connection ids are queued (up to queue_size waiting) and `concurrency`  
+    workers each run one presentation exchange at a time, verifying it as soon  
+    as the proof is received. Results are yielded in completion order. With a  
+    VerificationCache, connections verified recently skip the exchange. All  
+    proof requests share one non-revocation `policy`. With a RevocationIndex,  
+    connections whose credential is known to be revoked are denied at once.  
+    """  
+  
+    def __init__(self, cred_def_id, concurrency=VERIFY_CONCURRENCY, queue_size=VERIFY_QUEUE_SIZE,  
+                 verifier=None, bus=None, cache=None, policy=None, index=None):  
+        self.cred_def_id = cred_def_id  
+        self.concurrency = concurrency  
+        self.queue_size = queue_size  
+        self.verifier = verifier  
+        self.bus = bus  
+        self.cache = cache  
+        self.policy = policy or make_policy()  
+        self.index = index  
+        self.in_flight = 0  
+        self.completed = 0  
+        self.failed = 0  
+        self._queue = None  
+  
+    @property  
+    def queue_depth(self):  
+        """Connections waiting for a free worker."""  
+        return self._queue.qsize() if self._queue is not None else 0  
+  
+    def gauges(self):  
+        return {  
+            "queue_depth": self.queue_depth,  
+            "in_flight": self.in_flight,  
+            "completed": self.completed,  
+            "failed": self.failed  
+        }  
+  
+    async def results(self, conn_ids):  
+        """Async generator of one result per connection id (sync or async iterable).  
+  
+        Each result has conn_id, pres_ex_id, verified, verified_msgs, elapsed  
+        and error (None on success). If iterating conn_ids raises, the  
+        connections already queued are still verified and yielded, then the  
+        error is raised.  
+        """  
+        self.verifier = self.verifier or get_async_client(VERIFIER_URL)  
+        self._queue = asyncio.Queue(maxsize=self.queue_size)  
+        out = asyncio.Queue()  
+  
+        async def feed():  
+            try:  
+                if hasattr(conn_ids, "__aiter__"):  
+                    async for conn_id in conn_ids:  
+                        await self._queue.put(conn_id)  
+                else:  
+                    for conn_id in conn_ids:  
+                        await self._queue.put(conn_id)  
+            finally:  
+                # Stop the workers even if the source raised (results() re-raises  
+                # its error); once cancelled, no worker is left to stop  
+                if not asyncio.current_task().cancelling():  
+                    for _ in range(self.concurrency):  
+                        await self._queue.put(_DONE)  
+  
+        async def work():  
+            while (conn_id := await self._queue.get()) is not _DONE:  
+                await out.put(await self._verify(conn_id))  
+            await out.put(_DONE)  
+  
+        tasks = [asyncio.create_task(feed())]  
+        tasks += [asyncio.create_task(work()) for _ in range(self.concurrency)]  
+        try:  
+            finished = 0  
+            while finished < self.concurrency:  
+                result = await out.get()  
+                if result is _DONE:  
+                    finished += 1  
+                else:  
+                    yield result  
+            await tasks[0]  
+        finally:  
+            for task in tasks:  
+                task.cancel()  
+  
+    async def _verify(self, conn_id):  
+        self.in_flight += 1  
+        started = time.monotonic()  
+        result = {"conn_id": conn_id, "pres_ex_id": None, "verified": False, "verified_msgs": [], "error": None}  
+        try:  
+            outcome = await check_personhood(conn_id, self.cred_def_id, cache=self.cache,  
+                                            verifier=self.verifier, bus=self.bus, policy=self.policy,  
+                                            index=self.index)  
+            if outcome is None:  
+                result["error"] = "no presentation received"  
+            else:  
+                result.update(outcome)  
+        except Exception as e:  
+            result["error"] = str(e) or type(e).__name__  
+        finally:  
+            self.in_flight -= 1  
+  
+        result["elapsed"] = round(time.monotonic() - started, 3)  
+        if result["error"]:  
+            self.failed += 1  
+        else:  
+            self.completed += 1  
+        return result
\ No newline at end of file
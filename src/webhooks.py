@@ -0,0 +1,43 @@
+from contextlib import asynccontextmanager  
+from aiohttp import web  
+from .config import WEBHOOK_HOST, WEBHOOK_PORT  
+from .events import get_event_bus  
+  
+# Agents post to {ACAPY_WEBHOOK_URL}/topic/{topic}/, with ACAPY_WEBHOOK_URL  
+# set to http://<host>:<WEBHOOK_PORT>/webhooks/<agent> for each agent.  
+WEBHOOK_ROUTE = "/webhooks/{agent}/topic/{topic}/"  
+  
+def create_webhook_app(bus=None) -> web.Application:  
+    """aiohttp app that publishes every agent webhook on the event bus."""  
+    bus = bus or get_event_bus()  
+  
+    async def handle(request):  
+        try:  
+            payload = await request.json()  
+        except ValueError:  
+            return web.json_response({"error": "invalid JSON"}, status=400)  
+        bus.publish(request.match_info["topic"], payload, agent=request.match_info["agent"])  
+        return web.json_response({})  
+  
+    app = web.Application()  
+    app.router.add_post(WEBHOOK_ROUTE, handle)  
+    # ACA-Py may drop the trailing slash depending on the configured URL  
+    app.router.add_post(WEBHOOK_ROUTE.rstrip("/"), handle)  
+    return app  
+  
+async def start_webhook_server(bus=None, host=WEBHOOK_HOST, port=WEBHOOK_PORT) -> web.AppRunner:  
+    """Start the webhook receiver on the running loop; call runner.cleanup() to stop it."""  
+    runner = web.AppRunner(create_webhook_app(bus))  
+    await runner.setup()  
+    await web.TCPSite(runner, host, port).start()  
+    return runner  
+  
+@asynccontextmanager  
+async def webhook_events(bus=None, host=WEBHOOK_HOST, port=WEBHOOK_PORT):  
+    """Run the webhook receiver for the duration of the block and yield its bus."""  
+    bus = bus or get_event_bus()  
+    runner = await start_webhook_server(bus, host, port)  
+    try:  
+        yield bus  
+    finally:  
+        await runner.cleanup()
\ No newline at end of file
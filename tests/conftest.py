@@ -2,7 +2,12 @@ import pytest
 import docker  
 import time  
 import os  
+import httpx  
 from src.config import ISSUER_URL, HOLDER_URL, VERIFIER_URL  
+from src.client import AsyncAgentClient  
+from src.connections import get_connection_resolver  
+from src.retry import reset_retry_state  
+from src.flow_control import reset_agent_limiters  
   
 @pytest.fixture(scope="session")  
 def docker_compose():  
@@ -37,6 +42,27 @@ def docker_compose():
         print(f"Warning: {e}")  
         yield  
   
+@pytest.fixture(autouse=True)  
+def clear_connection_cache():  
+    """Start every test with an empty connection id cache."""  
+    get_connection_resolver().clear()  
+    yield  
+    get_connection_resolver().clear()  
+  
+@pytest.fixture(autouse=True)  
+def clear_retry_state():  
+    """Start every test with closed circuit breakers and a full retry budget."""  
+    reset_retry_state()  
+    yield  
+    reset_retry_state()  
+  
+@pytest.fixture(autouse=True)  
+def clear_agent_limiters():  
+    """Start every test without learned agent concurrency limits."""  
+    reset_agent_limiters()  
+    yield  
+    reset_agent_limiters()  
+  
 @pytest.fixture  
 def mock_state_file(tmp_path):  
     """Create a temporary state file."""  
@@ -45,4 +71,30 @@ def mock_state_file(tmp_path):
     original_state_file = src.utils.STATE_FILE  
     src.utils.STATE_FILE = str(state_file)  
     yield str(state_file)  
-    src.utils.STATE_FILE = original_state_file
\ No newline at end of file
+    src.utils.STATE_FILE = original_state_file  
+  
+@pytest.fixture  
+def mock_agent():  
+    """Build an AsyncAgentClient whose admin API is served by a dict of routes.  
+  
+    Routes map "METHOD /path" to a JSON body, a (status, body) tuple or a  
+    callable taking the httpx.Request. Every request is recorded in .calls.  
+    """  
+    def factory(routes, url=ISSUER_URL):  
+        calls = []  
+  
+        def handler(request):  
+            key = f"{request.method} {request.url.path}"  
+            calls.append((key, request))  
+            if key not in routes:  
+                return httpx.Response(404, json={})  
+            route = routes[key]  
+            if callable(route):  
+                route = route(request)  
+            status, body = route if isinstance(route, tuple) else (200, route)  
+            return httpx.Response(status, json=body)  
+  
+        client = AsyncAgentClient(url, transport=httpx.MockTransport(handler))  
+        client.calls = calls  
+        return client  
+    return factory
\ No newline at end of file
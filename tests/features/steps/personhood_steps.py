@@ -136,7 +136,7 @@ def step_impl(context):
     sys.stdout = buf = StringIO()  
     context.setup_error = None  
     try:  
-        with patch('requests.get') as mock_get:  
+        with patch('requests.Session.get') as mock_get:  
             mock_get.return_value.status_code = 404  
             mock_get.return_value.json.return_value = {}  
             from src.issuer_setup import main as setup_main  
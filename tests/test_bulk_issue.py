@@ -0,0 +1,72 @@
+import asyncio  
+import pytest  
+from unittest.mock import patch  
+from src.bulk_issue import issue_bulk, read_batch, check_batch  
+from src.schemas import CredentialAttributes  
+  
+def make_items(count):  
+    return [(f"conn-{i}", CredentialAttributes(person_hash=f"person-hash-{i}", biometric_score="90.0",  
+                                               controller_did=f"did:sov:bot{i}"))  
+            for i in range(count)]  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_issue_bulk_bounded_concurrency():  
+    """Test that no more than the cap is in flight and results keep input order"""  
+    in_flight, peak = 0, 0  
+  
+    async def fake_issue(conn_id, cred_def_id, attributes, **kwargs):  
+        nonlocal in_flight, peak  
+        in_flight += 1  
+        peak = max(peak, in_flight)  
+        await asyncio.sleep(0.001)  
+        in_flight -= 1  
+        if conn_id == "conn-3":  
+            raise RuntimeError("offer rejected")  
+        return {"cred_ex_id": f"ex-{conn_id}"}  
+  
+    with patch('src.bulk_issue.issue_credential', side_effect=fake_issue):  
+        results, summary = await issue_bulk(iter(make_items(20)), "test-cred-def", concurrency=4,  
+                                            issuer=object(), holder=object())  
+  
+    assert peak == 4  
+    assert [item["index"] for item in results] == list(range(20))  
+    assert results[0] == {"index": 0, "conn_id": "conn-0", "result": {"cred_ex_id": "ex-conn-0"}, "ok": True}  
+    assert results[3]["ok"] is False and results[3]["error"] == "offer rejected"  
+    assert summary["total"] == 20  
+    assert summary["succeeded"] == 19  
+    assert summary["failed"] == 1  
+    assert summary["throughput"] > 0  
+  
+@pytest.mark.error  
+def test_read_batch_reports_invalid_rows(tmp_path):  
+    """Test that invalid rows are reported with their line number"""  
+    batch = tmp_path / "batch.csv"  
+    batch.write_text(  
+        "connection_id,person_hash,biometric_score,controller_did\n"  
+        "conn-1,valid-hash-123,85.5,did:sov:abc123\n"  
+        "conn-2,valid-hash-456,150.0,did:sov:abc456\n"  
+        ",valid-hash-789,50.0,did:sov:abc789\n"  
+    )  
+  
+    items, invalid = read_batch(str(batch))  
+  
+    assert [conn_id for conn_id, _ in items] == ["conn-1"]  
+    assert items[0][1].biometric_score == "85.5"  
+    assert items[0][1].timestamp.isdigit()  
+    assert [line for line, _ in invalid] == [3, 4]  
+  
+@pytest.mark.error  
+def test_check_batch_matches_read_batch(tmp_path):  
+    """Test that the batch validation path reports the same rows"""  
+    batch = tmp_path / "batch.csv"  
+    batch.write_text(  
+        "connection_id,person_hash,biometric_score,controller_did\n"  
+        "conn-1,valid-hash-123,85.5,did:sov:abc123\n"  
+        "conn-2,valid-hash-456,150.0,did:sov:abc456\n"  
+        ",valid-hash-789,50.0,did:sov:abc789\n"  
+        "conn-4,valid-hash-000,,did:sov:abc000\n"  
+    )  
+  
+    items, invalid = read_batch(str(batch))  
+    assert check_batch(str(batch)) == (len(items), invalid)
\ No newline at end of file
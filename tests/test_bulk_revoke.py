@@ -0,0 +1,122 @@
+import asyncio  
+import json  
+import pytest  
+import requests  
+from src.bulk_revoke import revoke_bulk, RevocationBatcher, mark_revoked, publish_registry  
+from src.retry import is_retryable  
+  
+def published(issuer):  
+    """rrid2crid bodies sent to publish-revocations"""  
+    return [json.loads(request.content)["rrid2crid"] for key, request in issuer.calls  
+            if key == "POST /anoncreds/revocation/publish-revocations"]  
+  
+@pytest.mark.revocation  
+@pytest.mark.asyncio  
+async def test_revoke_bulk_publishes_once_per_registry(mock_agent):  
+    """Test N revocations become one ledger write per registry"""  
+    def revoke(request):  
+        payload = json.loads(request.content)  
+        assert payload["publish"] is False  
+        return (400, {"error": "unknown"}) if payload["cred_rev_id"] == "99" else {}  
+  
+    issuer = mock_agent({  
+        "POST /anoncreds/revocation/revoke": revoke,  
+        "POST /anoncreds/revocation/publish-revocations": {},  
+    })  
+    pairs = [("reg-a", str(i)) for i in range(5)] + [("reg-b", "7"), ("reg-b", "99")]  
+  
+    summary = await revoke_bulk(pairs, issuer=issuer, concurrency=3)  
+  
+    assert summary["revoked"] == 6  
+    assert summary["failed"][0][0] == ("reg-b", "99")  
+    assert summary["ledger_writes"] == 2  
+    bodies = published(issuer)  
+    assert len(bodies) == 2  
+    assert sorted(bodies, key=list) == [{"reg-a": ["0", "1", "2", "3", "4"]}, {"reg-b": ["7"]}]  
+  
+@pytest.mark.revocation  
+@pytest.mark.asyncio  
+async def test_batcher_flushes_on_count(mock_agent):  
+    """Test a full batch is published immediately"""  
+    issuer = mock_agent({  
+        "POST /anoncreds/revocation/revoke": {},  
+        "POST /anoncreds/revocation/publish-revocations": {},  
+    })  
+  
+    async with RevocationBatcher(issuer, max_batch=3, window=60) as batcher:  
+        for i in range(4):  
+            await batcher.add("reg-a", str(i))  
+        assert published(issuer) == [{"reg-a": ["0", "1", "2"]}]  
+  
+    assert published(issuer) == [{"reg-a": ["0", "1", "2"]}, {"reg-a": ["3"]}]  
+    assert batcher.ledger_writes == 2  
+  
+@pytest.mark.revocation  
+@pytest.mark.asyncio  
+async def test_batcher_flushes_on_window(mock_agent):  
+    """Test revocations are published once the window elapses"""  
+    issuer = mock_agent({  
+        "POST /anoncreds/revocation/revoke": {},  
+        "POST /anoncreds/revocation/publish-revocations": {},  
+    })  
+    batcher = RevocationBatcher(issuer, max_batch=100, window=0.01)  
+  
+    await batcher.add("reg-a", "1")  
+    await batcher.add("reg-b", "2")  
+    assert published(issuer) == []  
+    await asyncio.sleep(0.05)  
+  
+    assert sorted(published(issuer), key=list) == [{"reg-a": ["1"]}, {"reg-b": ["2"]}]  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_batcher_keeps_failed_publication_pending(mock_agent):  
+    """Test a failed publication is retried on the next flush"""  
+    outcomes = iter([(500, {"error": "ledger down"}), {}])  
+    issuer = mock_agent({  
+        "POST /anoncreds/revocation/revoke": {},  
+        "POST /anoncreds/revocation/publish-revocations": lambda request: next(outcomes),  
+    })  
+    batcher = RevocationBatcher(issuer, max_batch=100, window=60)  
+    await batcher.add("reg-a", "1")  
+  
+    assert "reg-a" in await batcher.flush()  
+    assert await batcher.flush() == {}  
+    assert published(issuer) == [{"reg-a": ["1"]}, {"reg-a": ["1"]}]  
+    assert batcher.ledger_writes == 1  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_batcher_retries_failed_publication_with_backoff(mock_agent):  
+    """Test a failed timed flush re-arms the timer and exposes the error until it succeeds"""  
+    outcomes = iter([(500, {"error": "ledger down"}), (500, {"error": "ledger down"}), {}])  
+    issuer = mock_agent({  
+        "POST /anoncreds/revocation/revoke": {},  
+        "POST /anoncreds/revocation/publish-revocations": lambda request: next(outcomes),  
+    })  
+    batcher = RevocationBatcher(issuer, max_batch=100, window=0.01, max_retry_delay=0.03)  
+    await batcher.add("reg-a", "1")  
+  
+    await asyncio.sleep(0.02)  
+    assert len(published(issuer)) == 1  
+    assert "ledger down" in batcher.errors["reg-a"]  
+    await asyncio.sleep(0.1)  # retried after 0.02s, then 0.03s (capped)  
+  
+    assert published(issuer) == [{"reg-a": ["1"]}] * 3  
+    assert batcher.errors == {}  
+    assert batcher.ledger_writes == 1  
+    assert batcher._timer is None  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_client_errors_carry_their_response(mock_agent):  
+    """Test 4xx answers keep the response, so they are not retried as network errors"""  
+    issuer = mock_agent({  
+        "POST /anoncreds/revocation/revoke": (400, {"error": "already revoked"}),  
+        "POST /anoncreds/revocation/publish-revocations": (404, {"error": "unknown registry"}),  
+    })  
+    for call in (mark_revoked(issuer, "reg-a", "1"), publish_registry(issuer, "reg-a", ["1"])):  
+        with pytest.raises(requests.HTTPError) as excinfo:  
+            await call  
+        assert excinfo.value.response.status_code in (400, 404)  
+        assert not is_retryable(excinfo.value)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import json  
+import threading  
+import time  
+import pytest  
+import requests_mock  
+from unittest.mock import patch  
+from src.catalog import apply_catalog, load_catalog, main  
+from src.config import ISSUER_URL  
+from src.schemas import CredentialCatalog  
+from src.utils import load_state  
+  
+CATALOG = CredentialCatalog(schemas=[  
+    {"name": "personhood", "version": "2.0", "attributes": ["person_hash"],  
+     "cred_defs": [{"tag": "gov_v1"}, {"tag": "gov_plain", "support_revocation": False}]},  
+    {"name": "kyc", "version": "1.0", "attributes": ["level"], "cred_defs": [{"tag": "bank_v1"}]},  
+])  
+  
+def mock_ledger(m, schemas=(), cred_defs=()):  
+    """Issuer whose wallet holds the given schema names and cred def tags."""  
+    m.get(f"{ISSUER_URL}/wallet/did/public", json={"result": {"did": "did:gov"}})  
+    m.get(f"{ISSUER_URL}/anoncreds/schemas", json=lambda r, c: {  
+        "schema_ids": [f"did:gov:2:{n}:1" for n in schemas if n == r.qs["schema_name"][0]]})  
+    m.get(f"{ISSUER_URL}/anoncreds/credential-definitions", json=lambda r, c: {  
+        "credential_definition_ids": [f"did:gov:3:CL:1:{t}" for t in cred_defs]})  
+    m.post(f"{ISSUER_URL}/anoncreds/schema", json=lambda r, c: {  
+        "schema_state": {"schema_id": f"did:gov:2:{r.json()['schema']['name']}:new"}})  
+  
+    def create_cred_def(request, context):  
+        tag = request.json()["credential_definition"]["tag"]  
+        return {"credential_definition_state": {"credential_definition_id": f"did:gov:3:CL:new:{tag}"}}  
+  
+    m.post(f"{ISSUER_URL}/anoncreds/credential-definition", json=create_cred_def)  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_apply_creates_only_missing_artifacts():  
+    """Existing artifacts are kept; missing ones are created"""  
+    with requests_mock.Mocker() as m:  
+        mock_ledger(m, schemas=["personhood"], cred_defs=["gov_v1"])  
+        results = await apply_catalog(CATALOG)  
+  
+    status = {(item["kind"], item["key"]): item["status"] for item in results}  
+    assert status == {  
+        ("schema", "personhood:2.0"): "exists",  
+        ("cred_def", "personhood:2.0:gov_v1"): "exists",  
+        ("cred_def", "personhood:2.0:gov_plain"): "created",  
+        ("schema", "kyc:1.0"): "created",  
+        ("cred_def", "kyc:1.0:bank_v1"): "created",  
+    }  
+    plain = [r for r in m.request_history if r.method == "POST" and "gov_plain" in r.text][0]  
+    assert plain.json()["options"] == {"support_revocation": False}  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_apply_dry_run_creates_nothing():  
+    """A dry run only reports the diff"""  
+    with requests_mock.Mocker() as m:  
+        mock_ledger(m, schemas=["personhood"])  
+        results = await apply_catalog(CATALOG, dry_run=True)  
+        assert not any(r.method == "POST" for r in m.request_history)  
+  
+    assert [item["status"] for item in results] == ["missing", "missing", "exists", "missing", "missing"]  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_apply_creates_cred_defs_concurrently():  
+    """Slow cred def creations (tails generation) overlap"""  
+    in_flight, peak = 0, 0  
+    lock = threading.Lock()  
+  
+    def slow_cred_def(client, did, schema_id, tag, *args):  
+        nonlocal in_flight, peak  
+        with lock:  
+            in_flight += 1  
+            peak = max(peak, in_flight)  
+        time.sleep(0.05)  
+        with lock:  
+            in_flight -= 1  
+        return f"{schema_id}:{tag}", True  
+  
+    with requests_mock.Mocker() as m, patch('src.catalog.ensure_cred_def', side_effect=slow_cred_def):  
+        mock_ledger(m, schemas=["personhood", "kyc"])  
+        results = await apply_catalog(CATALOG, concurrency=8)  
+  
+    assert peak == 3  
+    assert [item["status"] for item in results if item["kind"] == "cred_def"] == ["created"] * 3  
+  
+@pytest.mark.error  
+def test_main_rejects_invalid_catalog(tmp_path):  
+    """Catalog validation errors are reported before touching the agents"""  
+    path = tmp_path / "catalog.json"  
+    path.write_text(json.dumps({"schemas": [{"name": "x", "version": "v1", "attributes": []}]}))  
+    with pytest.raises(ValueError):  
+        load_catalog(str(path))  
+    assert main(["apply", str(path)]) == 1  
+  
+@pytest.mark.unit  
+def test_main_saves_ids_per_issuer_namespace(tmp_path, mock_state_file):  
+    """Applied ids are kept in the issuer's state namespace"""  
+    path = tmp_path / "catalog.json"  
+    path.write_text(CATALOG.model_dump_json())  
+    with requests_mock.Mocker() as m:  
+        mock_ledger(m, schemas=["personhood", "kyc"], cred_defs=["gov_v1", "gov_plain", "bank_v1"])  
+        assert main(["apply", str(path)]) == 0  
+  
+    state = load_state("issuer")  
+    assert state["cred_def:kyc:1.0:bank_v1"] == "did:gov:3:CL:1:bank_v1"  
+    assert state["schema:personhood:2.0"] == "did:gov:2:personhood:1"
\ No newline at end of file
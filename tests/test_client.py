@@ -0,0 +1,48 @@
+import pytest  
+import requests_mock  
+from src.client import AgentClient, get_client, close_clients, get_async_client, run_async  
+from src.config import ISSUER_URL, HOLDER_URL, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT  
+  
+@pytest.mark.unit  
+class TestAgentClient:  
+    def test_shared_client_per_url(self):  
+        assert get_client(ISSUER_URL) is get_client(ISSUER_URL)  
+        assert get_client(ISSUER_URL) is not get_client(HOLDER_URL)  
+  
+    def test_close_clients_resets_registry(self):  
+        client = get_client(ISSUER_URL)  
+        close_clients()  
+        assert get_client(ISSUER_URL) is not client  
+  
+    def test_pool_size_applied(self):  
+        client = AgentClient(ISSUER_URL, pool_size=7)  
+        adapter = client.session.get_adapter(f"{ISSUER_URL}/status")  
+        assert adapter._pool_maxsize == 7  
+  
+    def test_default_timeout_sent(self):  
+        client = AgentClient(ISSUER_URL)  
+        with requests_mock.Mocker() as m:  
+            m.get(f"{ISSUER_URL}/connections", json={"results": []})  
+            client.get_connections(alias="test_alias", state="active")  
+  
+            assert m.last_request.timeout == (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)  
+            assert m.last_request.qs == {"alias": ["test_alias"], "state": ["active"]}  
+  
+    def test_per_call_timeout_override(self):  
+        client = AgentClient(ISSUER_URL)  
+        with requests_mock.Mocker() as m:  
+            m.post(f"{ISSUER_URL}/issue-credential-2.0/send-offer", json={})  
+            client.post("/issue-credential-2.0/send-offer", json={}, timeout=1.5)  
+  
+            assert m.last_request.timeout == (HTTP_CONNECT_TIMEOUT, 1.5)  
+  
+@pytest.mark.unit  
+def test_async_client_shared_per_event_loop():  
+    async def fetch():  
+        return get_async_client(ISSUER_URL), get_async_client(ISSUER_URL)  
+  
+    first, same = run_async(fetch())  
+    second, _ = run_async(fetch())  
+    assert first is same  
+    assert first is not second  
+    assert first.session.is_closed
\ No newline at end of file
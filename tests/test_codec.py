@@ -0,0 +1,52 @@
+import json  
+import pytest  
+from src import codec  
+from src.records import CredExRecord, Credential, find_credential  
+from src.state_store import JsonFileStore  
+  
+PAYLOAD = {"connection_id": "conn-1", "attributes": [{"name": "person_hash", "value": "ação"}], "count": 3}  
+  
+@pytest.mark.unit  
+@pytest.mark.parametrize("backend", ["default", "stdlib"])  
+def test_round_trip(monkeypatch, backend):  
+    if backend == "stdlib":  
+        monkeypatch.setattr(codec, "orjson", None)  
+    data = codec.dumps(PAYLOAD)  
+    assert isinstance(data, bytes)  
+    assert json.loads(data) == PAYLOAD  
+    assert codec.loads(data) == codec.loads(data.decode()) == PAYLOAD  
+    assert codec.loads(codec.dumps({1: "a"})) == {"1": "a"}  
+    assert b"\n  " in codec.dumps(PAYLOAD, pretty=True)  
+    copied = codec.copy(PAYLOAD)  
+    assert copied == PAYLOAD and copied["attributes"] is not PAYLOAD["attributes"]  
+  
+@pytest.mark.unit  
+def test_records_are_slotted_and_dict_compatible():  
+    raw = {"cred_ex_id": "ex-1", "state": "done", "thread_id": "t-1",  
+           "by_format": {"cred_offer": {"anoncreds": {"nonce": "1"}}}}  
+    record = CredExRecord(raw)  
+    assert record.cred_ex_id == record["cred_ex_id"] == "ex-1"  
+    assert record.connection_id is None and record.get("connection_id", "-") == "-"  
+    assert record.by_format["cred_offer"]["anoncreds"]["nonce"] == "1"  
+    assert "state" in record and record == raw  
+    assert not hasattr(record, "__dict__")  
+    raw["state"] = "abandoned"  # fields are read from the record, not copied  
+    assert record.state == "abandoned"  
+    with pytest.raises(AttributeError):  
+        record.missing  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_find_credential_returns_typed_record(mock_agent):  
+    holder = mock_agent({"GET /credentials": {"results": [  
+        {"referent": "cred-1", "rev_reg_id": "rr-1", "cred_rev_id": "4", "attrs": {"controller_did": "did:sov:a"}}]}})  
+    credential = await find_credential(holder, controller_did="did:sov:a")  
+    assert isinstance(credential, Credential)  
+    assert (credential.referent, credential.cred_rev_id) == ("cred-1", "4")  
+    assert credential.attrs["controller_did"] == "did:sov:a"  
+  
+@pytest.mark.unit  
+def test_state_file_round_trip(tmp_path):  
+    store = JsonFileStore(str(tmp_path / "state.json"))  
+    store.update({"person": "ação", "ids": [1, 2]})  
+    assert JsonFileStore(store.path).load() == {"person": "ação", "ids": [1, 2]}
\ No newline at end of file
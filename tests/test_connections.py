@@ -0,0 +1,79 @@
+import pytest  
+import requests_mock  
+from src.config import ISSUER_URL, VERIFIER_URL  
+from src.connections import ConnectionResolver  
+from src.events import EventBus  
+from src.utils import get_connection_id  
+  
+def active(conn_id, alias):  
+    return {"connection_id": conn_id, "alias": alias, "state": "active"}  
+  
+@pytest.mark.unit  
+class TestConnectionResolver:  
+    def test_resolve_is_cached(self):  
+        resolver = ConnectionResolver()  
+        with requests_mock.Mocker() as m:  
+            m.get(f"{ISSUER_URL}/connections", json={"results": [active("conn-123", "test_alias")]})  
+  
+            assert resolver.resolve(ISSUER_URL, "test_alias") == "conn-123"  
+            assert resolver.resolve(ISSUER_URL, "test_alias") == "conn-123"  
+            assert m.call_count == 1  
+  
+    def test_negative_entries_expire(self):  
+        now = [0.0]  
+        resolver = ConnectionResolver(negative_ttl=5, clock=lambda: now[0])  
+        with requests_mock.Mocker() as m:  
+            m.get(f"{ISSUER_URL}/connections", json={"results": []})  
+  
+            assert resolver.resolve(ISSUER_URL, "missing") is None  
+            assert resolver.resolve(ISSUER_URL, "missing") is None  
+            assert m.call_count == 1  
+            now[0] = 5.0  
+            resolver.resolve(ISSUER_URL, "missing")  
+            assert m.call_count == 2  
+  
+    def test_lru_bound(self):  
+        resolver = ConnectionResolver(max_size=2)  
+        with requests_mock.Mocker() as m:  
+            m.get(f"{ISSUER_URL}/connections", json={"results": [active("conn-1", "alias")]})  
+            for alias in ["a", "b", "c"]:  
+                resolver.resolve(ISSUER_URL, alias)  
+  
+        assert len(resolver) == 2  
+  
+    def test_preload_paginates(self):  
+        resolver = ConnectionResolver()  
+        pages = [[active(f"conn-{i}", f"bot-{i}") for i in range(offset, min(offset + 2, 5))] for offset in (0, 2, 4)]  
+        with requests_mock.Mocker() as m:  
+            m.get(f"{VERIFIER_URL}/connections", [{"json": {"results": page}} for page in pages])  
+  
+            assert resolver.preload(VERIFIER_URL, page_size=2) == 5  
+            assert [request.qs["offset"] for request in m.request_history] == [["0"], ["2"], ["4"]]  
+            assert resolver.resolve(VERIFIER_URL, "bot-4") == "conn-4"  
+            assert m.call_count == 3  
+  
+    def test_connection_events_update_cache(self):  
+        bus = EventBus()  
+        resolver = ConnectionResolver()  
+        resolver.attach(bus)  
+        with requests_mock.Mocker() as m:  
+            m.get(f"{ISSUER_URL}/connections", json={"results": []})  
+            assert resolver.resolve(ISSUER_URL, "Connection_Gov_Bot") is None  
+  
+            bus.publish("connections", active("conn-1", "Connection_Gov_Bot"), agent="issuer")  
+            assert resolver.resolve(ISSUER_URL, "Connection_Gov_Bot") == "conn-1"  
+  
+            bus.publish("connections", {"connection_id": "conn-1", "state": "abandoned"}, agent="issuer")  
+            assert resolver.resolve(ISSUER_URL, "Connection_Gov_Bot") is None  
+            assert m.call_count == 2  
+  
+@pytest.mark.unit  
+def test_get_connection_id_uncached():  
+    """Test cached=False always asks the agent"""  
+    with requests_mock.Mocker() as m:  
+        m.get(f"{ISSUER_URL}/connections", json={"results": [active("conn-123", "test_alias")]})  
+  
+        get_connection_id(ISSUER_URL, "test_alias")  
+        get_connection_id(ISSUER_URL, "test_alias", cached=False)  
+        assert get_connection_id(ISSUER_URL, "test_alias") == "conn-123"  
+        assert m.call_count == 2
\ No newline at end of file
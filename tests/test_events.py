@@ -0,0 +1,64 @@
+import asyncio  
+import pytest  
+from aiohttp.test_utils import TestClient, TestServer  
+from src.events import EventBus  
+from src.webhooks import create_webhook_app  
+  
+@pytest.mark.unit  
+class TestEventBus:  
+    @pytest.mark.asyncio  
+    async def test_wait_then_publish(self):  
+        bus = EventBus()  
+        waiter = asyncio.ensure_future(  
+            bus.wait_for_state("present_proof_v2_0", "pres-1", "presentation-received", timeout=1))  
+        await asyncio.sleep(0)  
+  
+        bus.publish("present_proof_v2_0", {"pres_ex_id": "pres-1", "state": "request-sent"})  
+        assert not waiter.done()  
+        bus.publish("present_proof_v2_0", {"pres_ex_id": "pres-1", "state": "presentation-received"})  
+  
+        event = await waiter  
+        assert event["state"] == "presentation-received"  
+  
+    @pytest.mark.asyncio  
+    async def test_event_before_wait(self):  
+        bus = EventBus()  
+        bus.publish("present_proof_v2_0", {"pres_ex_id": "pres-1", "state": "presentation-received"})  
+  
+        event = await bus.wait_for_state("present_proof_v2_0", "pres-1", "presentation-received", timeout=0.1)  
+        assert event["pres_ex_id"] == "pres-1"  
+  
+    @pytest.mark.asyncio  
+    async def test_wait_timeout(self):  
+        bus = EventBus()  
+        with pytest.raises(asyncio.TimeoutError):  
+            await bus.wait_for_state("present_proof_v2_0", "pres-1", "presentation-received", timeout=0.01)  
+        assert not bus._waiters  
+  
+    def test_subscribers_and_history_bound(self):  
+        bus = EventBus(history_size=2)  
+        seen = []  
+        bus.subscribe("*", lambda agent, topic, payload: seen.append((agent, topic)))  
+  
+        for i in range(3):  
+            bus.publish("connections", {"connection_id": f"conn-{i}", "state": "active"}, agent="issuer")  
+  
+        assert seen == [("issuer", "connections")] * 3  
+        assert bus.latest("connections", "conn-0") is None  
+        assert bus.latest("connections", "conn-2")["state"] == "active"  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_webhook_server_publishes_events():  
+    bus = EventBus()  
+    seen = []  
+    bus.subscribe("present_proof_v2_0", lambda agent, topic, payload: seen.append((agent, payload["state"])))  
+  
+    async with TestClient(TestServer(create_webhook_app(bus))) as client:  
+        resp = await client.post("/webhooks/verifier/topic/present_proof_v2_0/",  
+                                 json={"pres_ex_id": "pres-1", "state": "presentation-received"})  
+        assert resp.status == 200  
+        resp = await client.post("/webhooks/verifier/topic/present_proof_v2_0", data="not json")  
+        assert resp.status == 400  
+  
+    assert seen == [("verifier", "presentation-received")]
\ No newline at end of file
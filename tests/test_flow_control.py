@@ -0,0 +1,139 @@
+import asyncio  
+import threading  
+import httpx  
+import pytest  
+from src.client import AsyncAgentClient  
+from src.flow_control import TokenBucket, AdaptiveLimit, AgentLimiter, get_agent_limiter  
+from src.config import ISSUER_URL  
+  
+@pytest.mark.unit  
+def test_token_bucket_reserves_in_order():  
+    """Tokens beyond the burst are reserved at the configured rate"""  
+    now = [0.0]  
+    bucket = TokenBucket(rate=10.0, burst=2, clock=lambda: now[0])  
+    waits = [bucket.reserve() for _ in range(4)]  
+    assert waits == [0.0, 0.0, pytest.approx(0.1), pytest.approx(0.2)]  
+    now[0] = 1.0  
+    assert bucket.reserve() == 0.0  
+    assert TokenBucket(rate=None, burst=1).reserve() == 0.0  
+  
+@pytest.mark.unit  
+def test_adaptive_limit_aimd():  
+    """The limit grows while latency is at baseline and backs off on congestion"""  
+    now = [0.0]  
+    limit = AdaptiveLimit(initial=5, min_limit=1, max_limit=20, tolerance=2.0, clock=lambda: now[0])  
+    for _ in range(50):  
+        limit.on_sample(0.05)  
+    assert limit.current() > 5  
+    grown = limit.limit  
+  
+    limit.on_sample(0.5)  
+    assert limit.limit == pytest.approx(grown * 0.9)  
+    limit.on_sample(0.5)  # same round trip: no second cut  
+    assert limit.limit == pytest.approx(grown * 0.9)  
+    now[0] = 1.0  
+    limit.on_sample(0.05, overloaded=True)  
+    assert limit.limit == pytest.approx(grown * 0.81)  
+  
+    for _ in range(100):  
+        now[0] += 1.0  
+        limit.on_sample(5.0)  
+    assert limit.current() == 1  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_async_client_respects_concurrency_limit():  
+    """No more calls than the current limit are in flight on an agent"""  
+    in_flight, peak = 0, 0  
+  
+    async def handler(request):  
+        nonlocal in_flight, peak  
+        in_flight += 1  
+        peak = max(peak, in_flight)  
+        await asyncio.sleep(0.01)  
+        in_flight -= 1  
+        return httpx.Response(200, json={})  
+  
+    limiter = AgentLimiter(ISSUER_URL, rate=None, adaptive=AdaptiveLimit(initial=3, min_limit=3, max_limit=3))  
+    client = AsyncAgentClient(ISSUER_URL, transport=httpx.MockTransport(handler), limiter=limiter)  
+    await asyncio.gather(*(client.get("/status") for _ in range(20)))  
+    await client.aclose()  
+  
+    assert peak == 3  
+    assert limiter.stats()["in_flight"] == 0  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_overload_responses_reduce_limit(mock_agent):  
+    """429/503 from the agent cut its shared limit"""  
+    client = mock_agent({"GET /status": (503, {})})  
+    before = get_agent_limiter(ISSUER_URL).adaptive.limit  
+    resp = await client.get("/status")  
+    assert resp.status_code == 503  
+    assert client.limiter is get_agent_limiter(ISSUER_URL)  
+    assert client.limiter.adaptive.limit < before  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_sync_and_async_calls_share_one_budget():  
+    """Sync calls of another thread and async calls count against the same limit"""  
+    limiter = AgentLimiter(ISSUER_URL, rate=None, adaptive=AdaptiveLimit(initial=2, min_limit=2, max_limit=2))  
+    held, release = threading.Event(), threading.Event()  
+  
+    def sync_call():  
+        with limiter.slot():  
+            held.set()  
+            release.wait(5)  
+  
+    thread = threading.Thread(target=sync_call)  
+    thread.start()  
+    await asyncio.to_thread(held.wait, 5)  
+    async with limiter.aslot():  
+        pending = limiter.aslot()  
+        second = asyncio.ensure_future(pending.__aenter__())  
+        await asyncio.sleep(0.01)  
+        assert not second.done() and limiter.stats()["in_flight"] == 2  
+        release.set()  
+        await asyncio.wait_for(second, 5)  
+        assert limiter.stats()["in_flight"] == 2  
+        await pending.__aexit__(None, None, None)  
+    await asyncio.to_thread(thread.join, 5)  
+    assert limiter.in_flight == 0  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_long_calls_are_not_sampled():  
+    """create_cred_def and the like hold a slot, but only an overload affects the limit"""  
+    status = [200]  
+  
+    async def handler(request):  
+        return httpx.Response(status[0], json={})  
+  
+    limiter = AgentLimiter(ISSUER_URL, rate=None, adaptive=AdaptiveLimit(initial=5))  
+    client = AsyncAgentClient(ISSUER_URL, transport=httpx.MockTransport(handler), limiter=limiter)  
+    await client.create_cred_def({})  
+    await client.upload_tails("rr-1")  
+    assert limiter.adaptive.baseline is None and limiter.adaptive.limit == 5  
+    status[0] = 503  
+    await client.create_rev_reg_def({})  
+    assert limiter.adaptive.baseline is None and limiter.adaptive.limit < 5  
+    await client.get("/status")  
+    assert limiter.adaptive.baseline is not None  
+    await client.aclose()  
+  
+@pytest.mark.error  
+def test_only_transport_errors_count_as_overload():  
+    """A caller's own error inside a slot does not cut the limit; a timeout does"""  
+    now = [0.0]  
+    limiter = AgentLimiter(ISSUER_URL, rate=None, adaptive=AdaptiveLimit(initial=5), clock=lambda: now[0])  
+    for error in (KeyError("result"), ValueError("bad JSON")):  
+        with pytest.raises(type(error)):  
+            with limiter.slot():  
+                raise error  
+    assert limiter.adaptive.limit > 5  
+    grown = limiter.adaptive.limit  
+    now[0] = 1.0  
+    with pytest.raises(httpx.ConnectTimeout):  
+        with limiter.slot():  
+            raise httpx.ConnectTimeout("agent down")  
+    assert limiter.adaptive.limit < grown
\ No newline at end of file
@@ -288,13 +288,13 @@ class TestErrorScenarios:
   
     def test_existing_schema_handling(self):  
         """Test handling of existing schema"""  
-        with patch('requests.post') as mock_post:  
+        with patch('requests.Session.post') as mock_post:  
             # Simulate schema already exists  
             mock_post.return_value.status_code = 409  
             mock_post.return_value.text = "Schema already exists"  
   
             # Should fetch existing schema instead of failing  
-            with patch('requests.get') as mock_get:  
+            with patch('requests.Session.get') as mock_get:  
                 mock_get.return_value.status_code = 200  
                 mock_get.return_value.json.return_value = {  
                     "schema_ids": ["test-schema-id"]  
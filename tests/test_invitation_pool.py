@@ -0,0 +1,113 @@
+import asyncio  
+import pytest  
+from src.invitation_pool import InvitationPool  
+from src.setup_connections import bootstrap_connections  
+from src.config import ISSUER_URL, HOLDER_URL  
+  
+def make_inviter(mock_agent, fail=False):  
+    counter = iter(range(10 ** 6))  
+  
+    def create(request):  
+        if fail:  
+            return 500, {}  
+        n = next(counter)  
+        return {"invi_msg_id": f"msg-{n}", "invitation": {"@id": f"inv-{n}"},  
+                "multi_use": request.url.params.get("multi_use") == "true"}  
+  
+    return mock_agent({"POST /out-of-band/create-invitation": create}, url=ISSUER_URL)  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_pool_fills_to_high_and_refills_below_low(mock_agent):  
+    """Handouts are served from the pool; the refill restores the high watermark"""  
+    inviter = make_inviter(mock_agent)  
+    async with InvitationPool(inviter, "gov", low=3, high=5, refill_concurrency=2) as pool:  
+        assert len(pool) == 5  
+        handed = [pool.take()["invi_msg_id"] for _ in range(3)]  
+        assert handed == ["msg-0", "msg-1", "msg-2"]  
+        assert len(pool) == 2  
+        await asyncio.sleep(0.05)  
+        assert len(pool) == 5  
+        assert pool.created == 8  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_multi_use_invitation_serves_max_uses(mock_agent):  
+    """A multi-use invitation is handed out max_uses times before the next one"""  
+    inviter = make_inviter(mock_agent)  
+    pool = InvitationPool(inviter, "bank", multi_use=True, low=0, high=2, max_uses=3)  
+    await pool.start()  
+    handed = [(await pool.get())["invi_msg_id"] for _ in range(4)]  
+    await pool.close()  
+    assert handed == ["msg-0", "msg-0", "msg-0", "msg-1"]  
+    assert inviter.calls[0][1].url.params["multi_use"] == "true"  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_unstarted_pool_creates_one_invitation_per_get(mock_agent):  
+    """Without start(), get() creates only the invitation it hands out"""  
+    inviter = make_inviter(mock_agent)  
+    pool = InvitationPool(inviter, "gov", low=3, high=5)  
+    assert (await pool.get())["invi_msg_id"] == "msg-0"  
+    assert pool.created == 1  
+    assert len(pool) == 0  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_pool_creation_errors(mock_agent):  
+    """An inviter that cannot create invitations fails the start"""  
+    pool = InvitationPool(make_inviter(mock_agent, fail=True), "gov", low=1, high=2)  
+    with pytest.raises(RuntimeError, match="500"):  
+        await pool.start()  
+    with pytest.raises(RuntimeError, match="500"):  
+        await pool.get()  
+    with pytest.raises(ValueError):  
+        InvitationPool(make_inviter(mock_agent), "gov", low=5, high=5)  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_get_gives_up_when_refill_keeps_failing(mock_agent):  
+    """An empty pool whose refill fails raises after the timeout instead of waiting forever"""  
+    down = []  
+  
+    def create(request):  
+        if down:  
+            return 503, {}  
+        return {"invi_msg_id": "msg-0", "invitation": {"@id": "inv-0"}}  
+  
+    inviter = mock_agent({"POST /out-of-band/create-invitation": create}, url=ISSUER_URL)  
+    async with InvitationPool(inviter, "gov", low=0, high=1) as pool:  
+        down.append(True)  
+        assert (await pool.get())["invi_msg_id"] == "msg-0"  
+        with pytest.raises(RuntimeError, match="refill failed"):  
+            await pool.get(timeout=0.1)  
+        assert pool.refill_failures >= 1  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_bootstrap_uses_pool_without_creating_invitations(mock_agent):  
+    """With a pool, the per-bot path only accepts the invitation and waits for readiness"""  
+    inviter = mock_agent({  
+        "POST /out-of-band/create-invitation": {"invi_msg_id": "msg-multi", "invitation": {"@id": "inv"}},  
+        "GET /connections": lambda r: {"results": [{"connection_id": "gov-" + r.url.params["their_did"],  
+                                                    "state": "active"}]},  
+    }, url=ISSUER_URL)  
+  
+    def receive(request):  
+        return {"connection_id": "bot-" + request.url.params["alias"]}  
+  
+    def connection(request):  
+        conn_id = request.url.path.rsplit("/", 1)[1]  
+        return {"connection_id": conn_id, "my_did": "did-" + conn_id, "state": "active"}  
+  
+    invitee_routes = {f"GET /connections/bot-{i}": connection for i in range(10)}  
+    invitee = mock_agent({"POST /out-of-band/receive-invitation": receive, **invitee_routes}, url=HOLDER_URL)  
+  
+    async with InvitationPool(inviter, "gov", multi_use=True, low=0, high=1) as pool:  
+        pairs = [(inviter, invitee, "gov", str(i)) for i in range(10)]  
+        results, summary = await bootstrap_connections(pairs, concurrency=5, pools={inviter: pool})  
+  
+    assert summary["succeeded"] == 10  
+    assert results[3]["inviter_conn_id"] == "gov-did-bot-3"  
+    assert results[3]["invitee_conn_id"] == "bot-3"  
+    assert sum(1 for key, _ in inviter.calls if key == "POST /out-of-band/create-invitation") == 1
\ No newline at end of file
@@ -1,19 +1,29 @@
+import json  
 import pytest  
 import requests  
-from unittest.mock import patch  
-from src.issue_cred import send_credential_offer, main  
+from unittest.mock import patch, AsyncMock  
+from src.config import ISSUER_URL, HOLDER_URL  
+from src.issue_cred import send_credential_offer, issue_credential, main, ExchangeError  
+from src.events import EventBus  
+from src.schemas import CredentialAttributes  
+  
+ATTRIBUTES = CredentialAttributes(  
+    person_hash="valid-hash-123",  
+    biometric_score="85.5",  
+    controller_did="did:sov:abc123def456"  
+)  
   
 @pytest.mark.error  
 def test_network_error_on_offer():  
     """Test network failure when sending offer"""  
-    with patch('requests.post', side_effect=requests.ConnectionError("Network error")):  
+    with patch('requests.Session.post', side_effect=requests.ConnectionError("Network error")):  
         with pytest.raises(requests.ConnectionError):  
             send_credential_offer({"test": "payload"})  
   
 @pytest.mark.error  
 def test_api_error_response():  
     """Test API error response"""  
-    with patch('requests.post') as mock_post:  
+    with patch('requests.Session.post') as mock_post:  
         mock_post.return_value.status_code = 500  
         mock_post.return_value.text = "Internal Server Error"  
   
@@ -28,14 +38,163 @@ def test_connection_not_found():
         main()  # Should return early  
   
 @pytest.mark.error  
-def test_holder_no_credentials():  
+def test_holder_no_credentials(mock_agent):  
     """Test when Holder receives no credentials"""  
+    issuer = mock_agent({"POST /issue-credential-2.0/send-offer": {"cred_ex_id": "iss-1", "thread_id": "thread-1"}})  
+    holder = mock_agent({"GET /issue-credential-2.0/records": {"results": []}}, url=HOLDER_URL)  
+  
     with patch('src.issue_cred.get_connection_id', return_value="test-conn"), \
          patch('src.issue_cred.load_state', return_value={"cred_def_id": "test"}), \
-         patch('requests.post'), \
-         patch('requests.get') as mock_get:  
+         patch('src.issue_cred.get_async_client', side_effect=lambda url: issuer if url == ISSUER_URL else holder), \
+         patch('src.issue_cred.ISSUANCE_STATE_TIMEOUT', 0.05), \
+         patch('src.issue_cred.ISSUANCE_POLL_INTERVAL', 0.01), \
+         patch('src.issue_cred.HOLDER_AUTO_RESPOND', False):  
+  
+        main()  # Should handle error gracefully  
+  
+    # Only the exchange's own thread is ever looked up  
+    assert holder.calls  
+    for key, request in holder.calls:  
+        assert key == "GET /issue-credential-2.0/records"  
+        assert request.url.params["thread_id"] == "thread-1"  
+  
+def exchange_routes(issuer_states, holder_states, issue=None, send_request=None):  
+    """Mock routes replaying successive record states of one exchange thread"""  
+    issuer_states, holder_states = iter(issuer_states), iter(holder_states)  
+    issuer = {  
+        "POST /issue-credential-2.0/send-offer": {"cred_ex_id": "iss-1", "thread_id": "thread-1"},  
+        "GET /issue-credential-2.0/records": lambda request: {"results": [  
+            {"cred_ex_id": "iss-1", "thread_id": "thread-1", "state": next(issuer_states)}]},  
+        "POST /issue-credential-2.0/records/iss-1/issue": issue or {},  
+    }  
+    holder = {  
+        "GET /issue-credential-2.0/records": lambda request: {"results": [  
+            {"cred_ex_record": {"cred_ex_id": "hold-1", "thread_id": "thread-1", "state": next(holder_states)}}]},  
+        "POST /issue-credential-2.0/records/hold-1/send-request": send_request or {},  
+        "POST /issue-credential-2.0/records/hold-1/store": {},  
+    }  
+    return issuer, holder  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_issue_credential_async(mock_agent):  
+    """Test the offer -> request -> issue -> store state machine"""  
+    issuer_routes, holder_routes = exchange_routes(  
+        ["offer-sent", "request-received", "credential-issued"],  
+        ["offer-received", "request-sent", "credential-received", "done"])  
+    issuer = mock_agent(issuer_routes)  
+    holder = mock_agent(holder_routes, url=HOLDER_URL)  
+  
+    with patch('src.issue_cred.ISSUANCE_POLL_INTERVAL', 0.001):  
+        result = await issue_credential("test-conn", "test-cred-def", ATTRIBUTES, issuer=issuer, holder=holder,  
+                                        holder_auto=False)  
+  
+    assert result["cred_ex_id"] == "hold-1"  
+    assert result["thread_id"] == "thread-1"  
+    assert [state for state, _ in result["transitions"]] == [  
+        "offer-sent", "request-received", "credential-issued", "done"]  
+    posts = [key for key, _ in issuer.calls + holder.calls if key.startswith("POST")]  
+    assert posts == [  
+        "POST /issue-credential-2.0/send-offer",  
+        "POST /issue-credential-2.0/records/iss-1/issue",  
+        "POST /issue-credential-2.0/records/hold-1/send-request",  
+        "POST /issue-credential-2.0/records/hold-1/store",  
+    ]  
+    offer = json.loads(issuer.calls[0][1].content)  
+    assert offer["connection_id"] == "test-conn"  
+    assert offer["filter"]["anoncreds"]["cred_def_id"] == "test-cred-def"  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_auto_responding_holder_is_only_watched(mock_agent):  
+    """With an auto-responding Bot, the issuer issues and nothing is posted to the Bot"""  
+    issuer_routes, holder_routes = exchange_routes(["request-received", "credential-issued"], ["done"])  
+    issuer = mock_agent(issuer_routes)  
+    holder = mock_agent(holder_routes, url=HOLDER_URL)  
+  
+    with patch('src.issue_cred.ISSUANCE_POLL_INTERVAL', 0.001):  
+        result = await issue_credential("test-conn", "test-cred-def", ATTRIBUTES, issuer=issuer, holder=holder,  
+                                        holder_auto=True)  
+  
+    assert result["cred_ex_id"] == "hold-1" and result["state"] == "done"  
+    assert [key for key, _ in holder.calls] == ["GET /issue-credential-2.0/records"]  
+    assert [key for key, _ in issuer.calls if key.startswith("POST")] == [  
+        "POST /issue-credential-2.0/send-offer", "POST /issue-credential-2.0/records/iss-1/issue"]  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_refused_issue_raises_with_the_agent_answer(mock_agent):  
+    """A failed issue call fails the exchange at once, with the agent's status and message"""  
+    issuer_routes, holder_routes = exchange_routes(  
+        ["request-received", "request-received"], [], issue=(400, {"error": "Revocation registry is full"}))  
+    issuer = mock_agent(issuer_routes)  
+    holder = mock_agent(holder_routes, url=HOLDER_URL)  
+  
+    with patch('src.issue_cred.ISSUANCE_POLL_INTERVAL', 0.001):  
+        with pytest.raises(ExchangeError, match="issue failed with 400.*registry is full"):  
+            await issue_credential("test-conn", "test-cred-def", ATTRIBUTES, issuer=issuer, holder=holder,  
+                                   holder_auto=True)  
   
-        # Simulate no credentials  
-        mock_get.return_value.json.return_value = {"results": []}  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_step_already_taken_by_the_agent_is_benign(mock_agent):  
+    """A 4xx because the Bot already sent its request is not an error"""  
+    issuer_routes, holder_routes = exchange_routes(  
+        ["request-received", "credential-issued"], ["offer-received", "request-sent", "done"],  
+        send_request=(400, {"error": "Credential exchange record is in state request-sent"}))  
+    issuer = mock_agent(issuer_routes)  
+    holder = mock_agent(holder_routes, url=HOLDER_URL)  
+  
+    with patch('src.issue_cred.ISSUANCE_POLL_INTERVAL', 0.001):  
+        result = await issue_credential("test-conn", "test-cred-def", ATTRIBUTES, issuer=issuer, holder=holder,  
+                                        holder_auto=False)  
+  
+    assert result["state"] == "done"  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_issue_credential_event_driven(mock_agent):  
+    """Test that with an event bus transitions come from webhooks, not polling"""  
+    bus = EventBus()  
+  
+    def send_offer(request):  
+        # Agents auto-respond: the whole exchange is reported at once  
+        for agent, state in [("holder", "request-sent"), ("issuer", "request-received"),  
+                             ("issuer", "credential-issued"), ("holder", "done")]:  
+            bus.publish("issue_credential_v2_0", {"cred_ex_id": f"{agent}-1", "thread_id": "thread-1",  
+                                                  "state": state}, agent=agent)  
+        return {"cred_ex_id": "issuer-1", "thread_id": "thread-1"}  
+  
+    issuer = mock_agent({"POST /issue-credential-2.0/send-offer": send_offer,  
+                         "POST /issue-credential-2.0/records/issuer-1/issue": {}})  
+    holder = mock_agent({}, url=HOLDER_URL)  
+  
+    result = await issue_credential("test-conn", "test-cred-def", ATTRIBUTES, issuer=issuer, holder=holder, bus=bus)  
+  
+    assert result["state"] == "done"  
+    assert holder.calls == []  
+    assert not any(key.startswith("GET") for key, _ in issuer.calls)  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_issue_credential_abandoned(mock_agent):  
+    """Test that an abandoned exchange fails at once"""  
+    issuer_routes, holder_routes = exchange_routes([], ["abandoned"])  
+    issuer = mock_agent(issuer_routes)  
+    holder = mock_agent(holder_routes, url=HOLDER_URL)  
+  
+    with pytest.raises(ExchangeError, match="abandoned"):  
+        await issue_credential("test-conn", "test-cred-def", ATTRIBUTES, issuer=issuer, holder=holder,  
+                               holder_auto=False)  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_issue_credential_async_offer_error(mock_agent):  
+    """Test the async offer is retried and then raises"""  
+    issuer = mock_agent({"POST /issue-credential-2.0/send-offer": (500, {"error": "boom"})})  
+  
+    with patch('asyncio.sleep', new=AsyncMock()):  
+        with pytest.raises(requests.HTTPError, match="Status: 500"):  
+            await issue_credential("test-conn", "test-cred-def", ATTRIBUTES, issuer=issuer, holder=issuer)  
   
-        main()  # Should handle error gracefully
\ No newline at end of file
+    assert len(issuer.calls) == 3
\ No newline at end of file
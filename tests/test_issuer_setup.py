@@ -1,13 +1,16 @@
 import pytest  
 import requests  
 from unittest.mock import patch  
-from src.issuer_setup import main  
+import requests_mock  
+from src.config import ISSUER_URL  
+from src.issuer_setup import main, setup_issuer  
+from src.utils import load_state  
   
 @pytest.mark.error  
 def test_schema_already_exists():  
     """Test handling when schema already exists on ledger"""  
-    with patch('requests.post') as mock_post, \
-         patch('requests.get') as mock_get:  
+    with patch('requests.Session.post') as mock_post, \
+         patch('requests.Session.get') as mock_get:  
   
         # Simulate schema already exists (409)  
         mock_post.return_value.status_code = 409  
@@ -25,8 +28,8 @@ def test_schema_already_exists():
 @pytest.mark.error  
 def test_cred_def_already_exists():  
     """Test handling when cred_def already exists"""  
-    with patch('requests.post') as mock_post, \
-         patch('requests.get') as mock_get:  
+    with patch('requests.Session.post') as mock_post, \
+         patch('requests.Session.get') as mock_get:  
   
         # Schema created successfully  
         mock_post.side_effect = [  
@@ -47,9 +50,52 @@ def test_cred_def_already_exists():
 @pytest.mark.error  
 def test_did_not_registered():  
     """Test error when DID is not registered"""  
-    with patch('requests.get') as mock_get:  
+    with patch('requests.Session.get') as mock_get:  
         mock_get.return_value.status_code = 404  
   
-        main()  # Should return without error
-
-
+        main()  # Should return without error  
+  
+def mock_issuer(m, schema_ids=(), cred_def_ids=()):  
+    m.get(f"{ISSUER_URL}/wallet/did/public", json={"result": {"did": "did:gov"}})  
+    m.get(f"{ISSUER_URL}/anoncreds/schemas", json={"schema_ids": list(schema_ids)})  
+    m.get(f"{ISSUER_URL}/anoncreds/credential-definitions", json={"credential_definition_ids": list(cred_def_ids)})  
+    m.post(f"{ISSUER_URL}/anoncreds/schema", json={"schema_state": {"schema_id": "did:gov:2:person:2.0"}})  
+    m.post(f"{ISSUER_URL}/anoncreds/credential-definition",  
+           json={"credential_definition_state": {"credential_definition_id": "did:gov:3:CL:1:gov_revocable_v1"}})  
+  
+@pytest.mark.unit  
+def test_setup_creates_missing_then_uses_cache(mock_state_file):  
+    """First run creates what is missing; the next run makes no agent calls"""  
+    with requests_mock.Mocker() as m:  
+        mock_issuer(m)  
+        result = setup_issuer()  
+        assert result["created"] == ["schema", "cred_def"]  
+        assert load_state()["cred_def_id"] == "did:gov:3:CL:1:gov_revocable_v1"  
+  
+        calls = m.call_count  
+        again = setup_issuer()  
+        assert again["cached"] is True  
+        assert again["cred_def_id"] == result["cred_def_id"]  
+        assert m.call_count == calls  
+  
+@pytest.mark.unit  
+def test_setup_uses_list_endpoints_before_create(mock_state_file):  
+    """Existing artifacts are found by listing, never by create-then-fail"""  
+    with requests_mock.Mocker() as m:  
+        mock_issuer(m, schema_ids=["did:gov:2:person:2.0"],  
+                    cred_def_ids=["did:gov:3:CL:1:other_tag", "did:gov:3:CL:1:gov_revocable_v1"])  
+        result = setup_issuer()  
+        assert result["created"] == []  
+        assert result["cred_def_id"] == "did:gov:3:CL:1:gov_revocable_v1"  
+        assert not any(r.method == "POST" for r in m.request_history)  
+  
+@pytest.mark.unit  
+def test_setup_revalidates_stale_cache(mock_state_file):  
+    """An expired cache or --refresh goes back to the agent"""  
+    with requests_mock.Mocker() as m:  
+        mock_issuer(m, schema_ids=["s1"], cred_def_ids=["s1:gov_revocable_v1"])  
+        setup_issuer()  
+        calls = m.call_count  
+        assert setup_issuer(ttl=-1)["cached"] is False  
+        assert setup_issuer(refresh=True)["cached"] is False  
+        assert m.call_count == calls * 3
@@ -0,0 +1,105 @@
+import pytest  
+from src.events import EventBus  
+from src.non_revoked import (FromGenesis, SlidingWindow, Bucketed, LatestDelta, make_policy, cred_def_of)  
+from src.verifier_proof import build_proof_request, check_personhood  
+from src.bulk_revoke import revoke_bulk  
+from src.issue_cred import issue_credential  
+from src.records import find_credential  
+from src.schemas import CredentialAttributes  
+from src.setup_connections import connect_pair  
+from src.simulator import AdminSimulator, LatencyModel  
+  
+CRED_DEF_ID = "GovDid:3:CL:1:gov_revocable_v1"  
+REV_REG_ID = f"GovDid:4:{CRED_DEF_ID}:CL_ACCUM:1"  
+  
+class Clock:  
+    def __init__(self, now):  
+        self.now = now  
+  
+    def __call__(self):  
+        return self.now  
+  
+@pytest.mark.unit  
+def test_genesis_and_window():  
+    clock = Clock(1000.7)  
+    assert FromGenesis(clock).interval() == {"from": 0, "to": 1000}  
+    assert SlidingWindow(300, clock).interval() == {"from": 700, "to": 1000}  
+    assert SlidingWindow(5000, clock).interval() == {"from": 0, "to": 1000}  
+  
+@pytest.mark.unit  
+def test_bucketed_interval_is_stable_within_a_bucket():  
+    clock = Clock(1200)  
+    policy = Bucketed(60, clock)  
+    first = policy.interval(CRED_DEF_ID)  
+    clock.now = 1259.9  
+    assert policy.interval(CRED_DEF_ID) == first == {"from": 1200, "to": 1200}  
+    clock.now = 1260  
+    assert policy.interval(CRED_DEF_ID)["to"] == 1260  
+  
+@pytest.mark.unit  
+def test_latest_delta_follows_published_revocations():  
+    clock = Clock(1230)  
+    policy = LatestDelta(clock)  
+    assert policy.interval(CRED_DEF_ID) == {"from": 1230, "to": 1230}  
+    bus = EventBus()  
+    policy.attach(bus)  
+    bus.publish("issuer_cred_rev", {"state": "issued", "rev_reg_id": REV_REG_ID})  
+    assert CRED_DEF_ID not in policy.published  
+    bus.publish("issuer_cred_rev", {"state": "revoked", "rev_reg_id": REV_REG_ID, "timestamp": 1225})  
+    clock.now = 5000  
+    assert policy.interval(CRED_DEF_ID) == {"from": 1225, "to": 1225}  
+    assert policy.interval("other-cred-def")["to"] == 5000  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_latest_delta_refresh_reads_revocation_lists(mock_agent):  
+    issuer = mock_agent({  
+        "GET /anoncreds/revocation/registries": {"rev_reg_ids": [REV_REG_ID, REV_REG_ID + "b"]},  
+        f"GET /anoncreds/revocation/registry/{REV_REG_ID}": {"result": {"revocation_list": {"timestamp": 1100}}},  
+        f"GET /anoncreds/revocation/registry/{REV_REG_ID}b": {"result": {"revocation_list": {"timestamp": 1150}}},  
+    })  
+    policy = LatestDelta(Clock(2000))  
+    assert await policy.refresh(issuer, CRED_DEF_ID) == 1150  
+    assert policy.interval(CRED_DEF_ID) == {"from": 1150, "to": 1150}  
+  
+@pytest.mark.revocation  
+@pytest.mark.asyncio  
+async def test_default_policy_denies_fresh_revocation():  
+    bus = EventBus()  
+    sim = AdminSimulator(latency=LatencyModel(0), message_latency=LatencyModel(0), bus=bus)  
+    issuer, holder, verifier = sim.client("issuer"), sim.client("holder"), sim.client("verifier")  
+    did = (await issuer.get_public_did()).json()["result"]["did"]  
+    schema = (await issuer.create_schema({"schema": {"name": "p", "version": "1.0", "issuerId": did,  
+                                                     "attrNames": ["person_hash", "biometric_score"]}})).json()  
+    cred_def_id = (await issuer.create_cred_def({  
+        "credential_definition": {"schemaId": schema["schema_state"]["schema_id"], "tag": "t", "issuerId": did},  
+        "options": {"support_revocation": True, "revocation_registry_size": 4}})).json()[  
+        "credential_definition_state"]["credential_definition_id"]  
+    issued = await connect_pair(issuer, holder, "Gov_Bot", "Bot_Gov", bus=bus)  
+    checked = await connect_pair(verifier, holder, "Bank_Bot", "Bot_Bank", bus=bus)  
+    attributes = CredentialAttributes(person_hash="person-hash-1", biometric_score="90.0", controller_did="did:sov:b")  
+    await issue_credential(issued["inviter_conn_id"], cred_def_id, attributes, issuer=issuer, holder=holder, bus=bus)  
+    credential = await find_credential(holder, controller_did="did:sov:b")  
+    await revoke_bulk([(credential.rev_reg_id, credential.cred_rev_id)], issuer=issuer)  
+  
+    result = await check_personhood(checked["inviter_conn_id"], cred_def_id, verifier=verifier, bus=bus)  
+    assert result["verified"] is False  
+    await sim.aclose()  
+  
+@pytest.mark.unit  
+def test_cred_def_of():  
+    assert cred_def_of(REV_REG_ID) == CRED_DEF_ID  
+    assert cred_def_of("did:indy:sovrin:5Yx/anoncreds/v0/REV_REG_DEF/1/tag/1") is None  
+  
+@pytest.mark.unit  
+def test_build_proof_request_uses_policy():  
+    request = build_proof_request("conn-1", CRED_DEF_ID, Bucketed(60, Clock(1234)))  
+    anoncreds = request["presentation_request"]["anoncreds"]  
+    assert anoncreds["non_revoked"] == {"from": 1200, "to": 1200}  
+    assert anoncreds["requested_attributes"]["0_personhood_uuid"]["non_revoked"] == {"from": 1200, "to": 1200}  
+  
+@pytest.mark.error  
+def test_unknown_policy():  
+    assert isinstance(make_policy("window", window=10), SlidingWindow)  
+    with pytest.raises(ValueError):  
+        make_policy("forever")
\ No newline at end of file
@@ -0,0 +1,52 @@
+import json  
+import pytest  
+from src.records import find_cred_ex_record, iter_cred_ex_records, find_credential  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_find_cred_ex_record_uses_server_side_filters(mock_agent):  
+    """Test a single filtered record is requested instead of the full listing"""  
+    holder = mock_agent({"GET /issue-credential-2.0/records": {"results": [  
+        {"cred_ex_record": {"cred_ex_id": "hold-1", "thread_id": "thread-1", "state": "done"}}]}})  
+  
+    record = await find_cred_ex_record(holder, thread_id="thread-1")  
+  
+    assert record["cred_ex_id"] == "hold-1"  
+    params = holder.calls[0][1].url.params  
+    assert params["thread_id"] == "thread-1"  
+    assert params["limit"] == "1"  
+    assert "connection_id" not in params  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_find_cred_ex_record_not_found(mock_agent):  
+    issuer = mock_agent({"GET /issue-credential-2.0/records": {"results": []}})  
+    assert await find_cred_ex_record(issuer, connection_id="conn-1", state="request-received") is None  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_iter_cred_ex_records_paginates(mock_agent):  
+    """Test records are pulled page by page until a short page"""  
+    def page(request):  
+        offset = int(request.url.params["offset"])  
+        return {"results": [{"cred_ex_id": f"ex-{i}"} for i in range(offset, min(offset + 2, 5))]}  
+  
+    issuer = mock_agent({"GET /issue-credential-2.0/records": page})  
+  
+    records = [record["cred_ex_id"] async for record in iter_cred_ex_records(issuer, page_size=2, state="done")]  
+  
+    assert records == ["ex-0", "ex-1", "ex-2", "ex-3", "ex-4"]  
+    assert len(issuer.calls) == 3  
+    assert all(request.url.params["state"] == "done" for _, request in issuer.calls)  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_find_credential_by_attribute(mock_agent):  
+    holder = mock_agent({"GET /credentials": {"results": [{"referent": "cred-1"}]}})  
+  
+    credential = await find_credential(holder, controller_did="did:sov:abc123")  
+  
+    assert credential["referent"] == "cred-1"  
+    params = holder.calls[0][1].url.params  
+    assert json.loads(params["wql"]) == {"attr::controller_did::value": "did:sov:abc123"}  
+    assert params["count"] == "1"
\ No newline at end of file
@@ -0,0 +1,124 @@
+import asyncio  
+import pytest  
+from src.events import EventBus  
+from src.registry_rotation import RegistryRotator, RegistryError, issuer_id_of  
+from src.utils import load_state  
+  
+CRED_DEF_ID = "GovDid:3:CL:1:gov_revocable_v1"  
+  
+def make_issuer(mock_agent, issued=0, created=None, fail_creation=False):  
+    counter = iter(range(1, 100))  
+  
+    def create(request):  
+        if fail_creation:  
+            return 500, {"error": "ledger down"}  
+        rev_reg_id = f"GovDid:4:{CRED_DEF_ID}:CL_ACCUM:next{next(counter)}"  
+        if created is not None:  
+            created.append(request)  
+        return {"revocation_registry_definition_state": {"state": "finished",  
+                                                          "revocation_registry_definition_id": rev_reg_id}}  
+  
+    return mock_agent({  
+        f"GET /anoncreds/revocation/active-registry/{CRED_DEF_ID}": {  
+            "result": {"revoc_reg_id": "rr-0", "max_cred_num": 10}},  
+        "GET /anoncreds/revocation/registry/rr-0/issued": {"result": issued},  
+        "POST /anoncreds/revocation-registry-definition": create,  
+        "PUT /anoncreds/registry/GovDid:4:" + CRED_DEF_ID + ":CL_ACCUM:next1/tails-file": {},  
+        "POST /anoncreds/revocation-list": {},  
+        "PUT /anoncreds/registry/GovDid:4:" + CRED_DEF_ID + ":CL_ACCUM:next1/active": {},  
+    })  
+  
+@pytest.mark.unit  
+def test_issuer_id_of():  
+    assert issuer_id_of(CRED_DEF_ID) == "GovDid"  
+    assert issuer_id_of("5Yx:3:CL:12:tag") == "5Yx"  
+    assert issuer_id_of("did:indy:sovrin:5Yx/anoncreds/v0/CLAIM_DEF/12/tag") == "did:indy:sovrin:5Yx"  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_provisions_at_threshold_and_switches_when_full(mock_agent, mock_state_file):  
+    """The next registry is ready before the active one fills up; the switch is one call"""  
+    created = []  
+    issuer = make_issuer(mock_agent, issued=6, created=created)  
+    rotator = await RegistryRotator(CRED_DEF_ID, issuer=issuer, registry_size=10, threshold=0.8).start()  
+    assert rotator.stats()["used"] == 6  
+  
+    rotator.record_issued(count=2)  # 8/10: provision in the background  
+    await asyncio.sleep(0.01)  
+    assert rotator.standby.endswith("next1")  
+    assert len(created) == 1  
+    assert created[0].read().startswith(b'{"revocation_registry_definition":{"credDefId"')  
+  
+    rotator.record_issued(count=2)  # 10/10: switch  
+    await asyncio.sleep(0.01)  
+    assert rotator.active.endswith("next1")  
+    assert rotator.standby is None  
+    assert rotator.switches == 1  
+    assert load_state(CRED_DEF_ID)["active_rev_reg_id"] == rotator.active  
+    keys = [key for key, _ in issuer.calls]  
+    assert keys.count("POST /anoncreds/revocation-registry-definition") == 1  
+    assert keys[-1].endswith("/active")  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_in_flight_offers_switch_before_overflow(mock_agent, mock_state_file):  
+    """Reserved slots count as used, and an offer that does not fit waits for the switch"""  
+    created = []  
+    issuer = make_issuer(mock_agent, issued=6, created=created)  
+    rotator = await RegistryRotator(CRED_DEF_ID, issuer=issuer, registry_size=100, threshold=0.8).start()  
+    for _ in range(4):  
+        await rotator.reserve()  # 6 issued + 4 in flight: full  
+    assert rotator.stats()["in_flight"] == 4  
+    assert rotator.usage["rr-0"] == 6  
+  
+    async def offer():  
+        await rotator.reserve()  
+        return rotator.active  
+  
+    assert (await asyncio.wait_for(offer(), 1)).endswith("next1")  
+    assert rotator.switches == 1  
+    # The standby is as large as the active registry, not registry_size  
+    assert created[0].read().endswith(b'"maxCredNum":10},"options":{}}')  
+    rotator.release()  
+    assert rotator.in_flight == 4  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_counts_issuer_cred_rev_events(mock_agent, mock_state_file):  
+    """Slot usage follows issuer_cred_rev events for this cred def only"""  
+    rotator = await RegistryRotator(CRED_DEF_ID, issuer=make_issuer(mock_agent), registry_size=10).start()  
+    bus = EventBus()  
+    rotator.attach(bus)  
+    bus.publish("issuer_cred_rev", {"state": "issued", "cred_def_id": CRED_DEF_ID, "rev_reg_id": "rr-0",  
+                                    "cred_ex_id": "ex-1"}, agent="issuer")  
+    bus.publish("issuer_cred_rev", {"state": "issued", "cred_def_id": "other", "rev_reg_id": "rr-9",  
+                                    "cred_ex_id": "ex-2"}, agent="issuer")  
+    assert rotator.usage == {"rr-0": 1}  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_provisioning_failure_is_kept(mock_agent, mock_state_file):  
+    """A failed background provisioning is reported, and an explicit rotate raises"""  
+    rotator = await RegistryRotator(CRED_DEF_ID, issuer=make_issuer(mock_agent, issued=9, fail_creation=True),  
+                                    registry_size=10).start()  
+    await asyncio.sleep(0.01)  
+    assert isinstance(rotator.last_error, RegistryError)  
+    assert rotator.standby is None  
+    with pytest.raises(RegistryError, match="ledger down"):  
+        await rotator.rotate()  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_full_registry_without_standby_refuses_offers(mock_agent, mock_state_file):  
+    """After a failed switch, reserve() retries it and raises instead of overflowing the registry"""  
+    issuer = make_issuer(mock_agent, issued=9, fail_creation=True)  
+    rotator = await RegistryRotator(CRED_DEF_ID, issuer=issuer, registry_size=10).start()  
+    await rotator.reserve()  # the last slot: the switch starts and fails  
+    await asyncio.sleep(0.01)  
+    assert rotator._switching is None  
+    attempts = [key for key, _ in issuer.calls].count("POST /anoncreds/revocation-registry-definition")  
+  
+    with pytest.raises(RegistryError, match="ledger down"):  
+        await asyncio.wait_for(rotator.reserve(), 1)  
+    assert rotator.in_flight == 1  
+    assert [key for key, _ in issuer.calls].count("POST /anoncreds/revocation-registry-definition") > attempts
\ No newline at end of file
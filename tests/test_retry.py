@@ -1,7 +1,10 @@
+import asyncio  
 import pytest  
 import requests  
-from unittest.mock import Mock, patch  
-from src.retry import retry_with_backoff  
+from unittest.mock import Mock, AsyncMock, patch  
+from src.config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT  
+from src.retry import (retry_with_backoff, deadline, is_retryable, CircuitBreaker, CircuitOpenError,  
+                       DeadlineExceeded, RetryBudget, get_circuit_breaker)  
 
 @pytest.mark.unit  
 class TestRetryDecorator:  
@@ -9,25 +12,218 @@ class TestRetryDecorator:
         @retry_with_backoff(max_attempts=3)  
         def success_func():  
             return "success"  
-          
+
         assert success_func() == "success"  
-      
+
     def test_retry_then_success(self):  
         mock_func = Mock(side_effect=[Exception("fail"), "success"])  
-          
+
         @retry_with_backoff(max_attempts=3, initial_delay=0.01)  
         def test_func():  
             return mock_func()  
-          
+
         with patch('time.sleep'):  # Skip sleep in tests  
             assert test_func() == "success"  
             assert mock_func.call_count == 2  
-      
+
     def test_max_attempts_reached(self):  
         @retry_with_backoff(max_attempts=2, initial_delay=0.01)  
         def always_fail():  
             raise Exception("always fails")  
-          
+
         with patch('time.sleep'):  
             with pytest.raises(Exception, match="always fails"):  
-                always_fail()
\ No newline at end of file
+                always_fail()  
+
+    @pytest.mark.asyncio  
+    async def test_async_retry_then_success(self):  
+        mock_func = Mock(side_effect=[Exception("fail"), "success"])  
+
+        @retry_with_backoff(max_attempts=3, initial_delay=0.01)  
+        async def test_func():  
+            return mock_func()  
+
+        with patch('asyncio.sleep', new=AsyncMock()) as mock_sleep:  
+            assert await test_func() == "success"  
+            assert mock_func.call_count == 2  
+            assert mock_sleep.await_count == 1  
+
+def http_error(status):  
+    return requests.HTTPError(f"Status: {status}", response=Mock(status_code=status))  
+
+@pytest.mark.unit  
+class TestRetryPolicy:  
+    def test_retryable_status_classification(self):  
+        assert is_retryable(requests.ConnectionError("refused"))  
+        assert is_retryable(http_error(503))  
+        assert is_retryable(http_error(429))  
+        assert not is_retryable(http_error(400))  
+        assert not is_retryable(CircuitOpenError("open"))  
+
+    def test_client_errors_are_not_retried(self):  
+        mock_func = Mock(side_effect=http_error(422))  
+
+        @retry_with_backoff(max_attempts=3, initial_delay=0.01)  
+        def test_func():  
+            return mock_func()  
+
+        with patch('time.sleep') as mock_sleep:  
+            with pytest.raises(requests.HTTPError, match="422"):  
+                test_func()  
+        assert mock_func.call_count == 1  
+        mock_sleep.assert_not_called()  
+
+    def test_circuit_breaker_states(self):  
+        now = [0.0]  
+        breaker = CircuitBreaker("agent", failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])  
+        breaker.record_failure()  
+        breaker.before_call()  
+        breaker.record_failure()  
+        assert breaker.state == CircuitBreaker.OPEN  
+        with pytest.raises(CircuitOpenError):  
+            breaker.before_call()  
+
+        now[0] = 10.0  
+        breaker.before_call()  # the single half-open trial  
+        assert breaker.state == CircuitBreaker.HALF_OPEN  
+        with pytest.raises(CircuitOpenError):  
+            breaker.before_call()  
+        breaker.record_failure()  
+        assert breaker.state == CircuitBreaker.OPEN  
+
+        now[0] = 20.0  
+        breaker.before_call()  
+        breaker.record_success()  
+        assert breaker.state == CircuitBreaker.CLOSED  
+
+    def test_half_open_trial_released_when_aborted(self):  
+        now = [0.0]  
+        breaker = CircuitBreaker("agent", failure_threshold=1, reset_timeout=10.0, clock=lambda: now[0])  
+        breaker.record_failure()  
+        now[0] = 10.0  
+        breaker.before_call()  
+        breaker.release_trial()  
+        breaker.before_call()  # a new trial is allowed  
+        assert breaker.state == CircuitBreaker.HALF_OPEN  
+
+    @pytest.mark.asyncio  
+    async def test_trial_survives_cancellation(self):  
+        breaker = get_circuit_breaker("test:trial")  
+        breaker.record_failure()  
+        breaker.state, breaker._opened_at = CircuitBreaker.OPEN, -CIRCUIT_RESET_TIMEOUT  
+
+        @retry_with_backoff(max_attempts=1, circuit="test:trial", exceptions=(requests.RequestException,))  
+        async def test_func(fail):  
+            if fail:  
+                raise asyncio.CancelledError()  
+            return "ok"  
+
+        with pytest.raises(asyncio.CancelledError):  
+            await test_func(True)  
+        assert await test_func(False) == "ok"  
+        assert breaker.state == CircuitBreaker.CLOSED  
+
+    def test_unlisted_errors_count_as_failures(self):  
+        mock_func = Mock(side_effect=KeyError("not handled"))  
+
+        @retry_with_backoff(max_attempts=3, circuit="test:unlisted", exceptions=(requests.RequestException,))  
+        def test_func():  
+            return mock_func()  
+
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD):  
+            with pytest.raises(KeyError):  
+                test_func()  
+        assert mock_func.call_count == CIRCUIT_FAILURE_THRESHOLD  # never retried  
+        assert get_circuit_breaker("test:unlisted").state == CircuitBreaker.OPEN  
+        with pytest.raises(CircuitOpenError):  
+            test_func()  
+
+    def test_client_error_keeps_circuit_open(self):  
+        breaker = get_circuit_breaker("test:4xx")  
+        breaker.record_failure()  
+        breaker.state, breaker._opened_at = CircuitBreaker.OPEN, -CIRCUIT_RESET_TIMEOUT  
+
+        @retry_with_backoff(max_attempts=3, circuit="test:4xx")  
+        def test_func():  
+            raise http_error(404)  
+
+        with pytest.raises(requests.HTTPError):  
+            test_func()  
+        assert breaker.state == CircuitBreaker.HALF_OPEN  
+        with pytest.raises(requests.HTTPError):  
+            test_func()  # the trial was released, not consumed  
+
+    def test_open_circuit_fails_fast(self):  
+        mock_func = Mock(side_effect=requests.ConnectionError("down"))  
+
+        @retry_with_backoff(max_attempts=3, initial_delay=0.01, circuit="test:endpoint")  
+        def test_func():  
+            return mock_func()  
+
+        with patch('time.sleep'):  
+            with pytest.raises(requests.ConnectionError):  
+                test_func()  
+            with pytest.raises(requests.ConnectionError):  
+                test_func()  
+            with pytest.raises(CircuitOpenError):  
+                test_func()  
+        assert mock_func.call_count == 5  
+        assert get_circuit_breaker("test:endpoint").state == CircuitBreaker.OPEN  
+
+    def test_retry_budget_limits_retries(self):  
+        budget = RetryBudget(ratio=0.5, min_per_second=0.0, clock=lambda: 0.0)  
+        budget.record_request()  
+        budget.record_request()  
+        mock_func = Mock(side_effect=Exception("fail"))  
+
+        @retry_with_backoff(max_attempts=5, initial_delay=0.01, budget=budget)  
+        def test_func():  
+            return mock_func()  
+
+        with patch('time.sleep'):  
+            with pytest.raises(Exception, match="fail"):  
+                test_func()  
+        # Three requests deposit 1.5 tokens, 1 per retry: one retry, then the budget is exhausted  
+        assert mock_func.call_count == 2  
+
+    def test_retry_budget_counts_calls_not_attempts(self):  
+        budget = RetryBudget(ratio=0.5, min_per_second=0.0, clock=lambda: 0.0)  
+        mock_func = Mock(side_effect=[requests.ConnectionError("down"), "ok"])  
+
+        @retry_with_backoff(max_attempts=3, initial_delay=0.01, budget=budget)  
+        def test_func():  
+            return mock_func()  
+
+        budget.tokens = 1.0  
+        with patch('time.sleep'):  
+            assert test_func() == "ok"  
+        # One call deposited 0.5 tokens; the retry spent 1  
+        assert budget.tokens == 0.5  
+
+    def test_deadline_stops_retries(self):  
+        mock_func = Mock(side_effect=Exception("fail"))  
+
+        @retry_with_backoff(max_attempts=10, initial_delay=1.0)  
+        def test_func():  
+            return mock_func()  
+
+        with patch('time.sleep') as mock_sleep:  
+            with deadline(0.5):  
+                with pytest.raises(Exception, match="fail"):  
+                    test_func()  
+        assert mock_func.call_count == 1  
+        mock_sleep.assert_not_called()  
+
+        with deadline(-1):  
+            with pytest.raises(DeadlineExceeded):  
+                test_func()  
+
+    @pytest.mark.asyncio  
+    async def test_deadline_caps_async_http_timeout(self, mock_agent):  
+        captured = []  
+        agent = mock_agent({"GET /status": lambda r: captured.append(r.extensions["timeout"]) or {}})  
+        with deadline(2.0):  
+            await agent.get("/status")  
+        assert captured[0]["read"] <= 2.0  
+        await agent.get("/status")  
+        assert captured[1]["read"] == 30.0
\ No newline at end of file
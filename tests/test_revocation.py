@@ -1,9 +1,11 @@
 import pytest  
 import requests  
 import time  
+import json  
 from unittest.mock import patch  
 from src.config import ISSUER_URL, HOLDER_URL, VERIFIER_URL  
 from src.utils import load_state, save_state  
+from src.revoke_cred import revoke  
   
 class TestRevocationFlow:  
     """Test the revocation flow."""  
@@ -80,7 +82,7 @@ class TestRevocationFlow:
     @pytest.mark.revocation  
     def test_dynamic_cred_rev_id(self):  
         """Test dynamic extraction of cred_rev_id"""  
-        with patch('requests.get') as mock_get:  
+        with patch('requests.Session.get') as mock_get:  
             mock_get.return_value.status_code = 200  
             mock_get.return_value.json.return_value = {  
                 "results": [{  
@@ -97,7 +99,7 @@ class TestRevocationFlow:
     @pytest.mark.error  
     def test_no_credentials_to_revoke(self):  
         """Test when there are no credentials to revoke"""  
-        with patch('requests.get') as mock_get:  
+        with patch('requests.Session.get') as mock_get:  
             mock_get.return_value.json.return_value = {"results": []}  
   
             from src.revoke_cred import main  # ← Add import  
@@ -106,7 +108,7 @@ class TestRevocationFlow:
     @pytest.mark.error  
     def test_missing_rev_reg_id(self):  
         """Test when rev_reg_id is not found"""  
-        with patch('requests.get') as mock_get:  
+        with patch('requests.Session.get') as mock_get:  
             # Mock credentials without rev_reg_id  
             mock_get.return_value.json.return_value = {  
                 "results": [{  
@@ -122,8 +124,8 @@ class TestRevocationFlow:
     @pytest.mark.error  
     def test_revocation_api_error(self):  
         """Test API error during revocation"""  
-        with patch('requests.get') as mock_get, \
-            patch('requests.post') as mock_post:  
+        with patch('requests.Session.get') as mock_get, \
+            patch('requests.Session.post') as mock_post:  
   
             # Mock valid credential  
             mock_get.return_value.json.return_value = {  
@@ -150,8 +152,8 @@ class TestRevocationFlow:
     @pytest.mark.error  
     def test_network_error_during_revocation(self):  
         """Test network error during revocation"""  
-        with patch('requests.get') as mock_get, \
-            patch('requests.post', side_effect=requests.Timeout("Request timeout")):  
+        with patch('requests.Session.get') as mock_get, \
+            patch('requests.Session.post', side_effect=requests.Timeout("Request timeout")):  
   
             mock_get.return_value.json.return_value = {  
                 "results": [{  
@@ -186,4 +188,16 @@ def test_tails_server_integration():
         # List revocation registries for cred_def_id  
         resp = requests.get(f"{ISSUER_URL}/anoncreds/revocation/registries",  
                           params={"cred_def_id": cred_def_id})  
-        assert resp.status_code == 200
\ No newline at end of file
+        assert resp.status_code == 200  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_revoke_async(mock_agent):  
+    """Test the async revocation call and its payload"""  
+    issuer = mock_agent({"POST /anoncreds/revocation/revoke": {}})  
+  
+    status_code, _ = await revoke("test-reg-id", "42", issuer=issuer)  
+  
+    assert status_code == 200  
+    payload = json.loads(issuer.calls[0][1].content)  
+    assert payload == {"rev_reg_id": "test-reg-id", "cred_rev_id": "42", "publish": True, "notify": False}
\ No newline at end of file
@@ -0,0 +1,133 @@
+import pytest  
+from src.bulk_revoke import revoke_bulk  
+from src.events import EventBus  
+from src.issue_cred import issue_credential, credential_record  
+from src.records import find_credential  
+from src.revocation_index import RevocationIndex, revoked_slot  
+from src.schemas import CredentialAttributes  
+from src.setup_connections import connect_pair  
+from src.simulator import AdminSimulator, LatencyModel  
+from src.utils import save_credential_record, find_credential_records  
+from src.verifier_proof import check_personhood  
+  
+REV_REG_ID = "GovDid:4:GovDid:3:CL:1:gov_revocable_v1:CL_ACCUM:1"  
+  
+@pytest.mark.unit  
+def test_bitset_marks_and_grows():  
+    index = RevocationIndex(registry_size=1000)  
+    assert not index.is_revoked(REV_REG_ID, 7)  
+    index.mark_revoked(REV_REG_ID, 7)  
+    index.mark_revoked(REV_REG_ID, "1000")  
+    assert index.is_revoked(REV_REG_ID, "7") and index.is_revoked(REV_REG_ID, 1000)  
+    assert not index.is_revoked(REV_REG_ID, 6) and not index.is_revoked(REV_REG_ID, 5000)  
+    index.mark_revoked(REV_REG_ID, 4000)  
+    assert index.is_revoked(REV_REG_ID, 4000)  
+    assert index.revoked_count(REV_REG_ID) == 3 and len(index) == 3  
+  
+@pytest.mark.unit  
+def test_revocation_list_and_delta():  
+    index = RevocationIndex()  
+    index.mark_revoked(REV_REG_ID, 9)  
+    index.apply_revocation_list(REV_REG_ID, [0, 1, 0, 1])  
+    assert [index.is_revoked(REV_REG_ID, i) for i in range(4)] == [False, True, False, True]  
+    assert not index.is_revoked(REV_REG_ID, 9)  
+    index.apply_delta(REV_REG_ID, [2])  
+    assert index.revoked_count(REV_REG_ID) == 3  
+  
+@pytest.mark.unit  
+def test_events_mark_slots():  
+    index = RevocationIndex()  
+    bus = EventBus()  
+    index.attach(bus)  
+    bus.publish("issuer_cred_rev", {"state": "issued", "rev_reg_id": REV_REG_ID, "cred_rev_id": "1"})  
+    bus.publish("issuer_cred_rev", {"state": "revoked", "rev_reg_id": REV_REG_ID, "cred_rev_id": "2"})  
+    bus.publish("revocation-notification", {"thread_id": f"anoncreds::{REV_REG_ID}::3"})  
+    assert [index.is_revoked(REV_REG_ID, i) for i in (1, 2, 3)] == [False, True, True]  
+    assert revoked_slot("connections", {"rev_reg_id": REV_REG_ID, "cred_rev_id": "1"}) is None  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_sync_registry(mock_agent):  
+    issuer = mock_agent({f"GET /anoncreds/revocation/registry/{REV_REG_ID}/issued/details": [  
+        {"cred_rev_id": "1", "state": "issued"}, {"cred_rev_id": "2", "state": "revoked"}]})  
+    index = RevocationIndex()  
+    assert await index.sync_registry(issuer, REV_REG_ID) == 1  
+    assert index.is_revoked(REV_REG_ID, 2) and not index.is_revoked(REV_REG_ID, 1)  
+  
+@pytest.mark.verification  
+@pytest.mark.asyncio  
+async def test_prescreen_denies_without_exchange(mock_agent, mock_state_file):  
+    save_credential_record({"cred_ex_id": "cx-1", "connection_id": "conn-1", "rev_reg_id": REV_REG_ID,  
+                            "cred_rev_id": "5", "state": "revoked"})  
+    save_credential_record({"cred_ex_id": "cx-2", "connection_id": "conn-2", "rev_reg_id": REV_REG_ID,  
+                            "cred_rev_id": "6", "state": "issued"})  
+    index = RevocationIndex()  
+    assert index.load_records() == 1  
+    # Records carry the issuer's connection ids: only verifier connections get bound  
+    assert index.prescreen("conn-1") is None  
+    index.bind("bank-conn-1", REV_REG_ID, 5)  
+    index.bind("bank-conn-2", REV_REG_ID, 6)  
+    verifier = mock_agent({})  
+    result = await check_personhood("bank-conn-1", "cred-def", verifier=verifier, index=index)  
+    assert result["verified"] is False and result["prescreened"] is True  
+    assert result["rev_reg_ids"] == [REV_REG_ID]  
+    assert verifier.calls == []  
+    assert index.prescreen("bank-conn-2") is None  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_sync_revocation_list(mock_agent):  
+    verifier = mock_agent({f"GET /anoncreds/revocation/registry/{REV_REG_ID}": {"result": {  
+        "revocation_list": {"revocationList": [0, 1, 0, 0, 1], "timestamp": 1000}}}})  
+    index = RevocationIndex()  
+    index.mark_revoked(REV_REG_ID, 3)  
+    assert await index.sync_revocation_list(verifier, REV_REG_ID) == 2  
+    assert [index.is_revoked(REV_REG_ID, i) for i in range(5)] == [False, True, False, False, True]  
+    assert await index.sync_revocation_list(verifier, "unknown") is None  
+  
+@pytest.mark.verification  
+@pytest.mark.asyncio  
+async def test_prescreen_binds_verifier_connections(mock_state_file):  
+    bus = EventBus()  
+    sim = AdminSimulator(latency=LatencyModel(0), message_latency=LatencyModel(0), bus=bus)  
+    issuer, holder, verifier = sim.client("issuer"), sim.client("holder"), sim.client("verifier")  
+    did = (await issuer.get_public_did()).json()["result"]["did"]  
+    schema = (await issuer.create_schema({"schema": {"name": "p", "version": "1.0", "issuerId": did,  
+                                                     "attrNames": ["person_hash", "biometric_score"]}})).json()  
+    cred_def_id = (await issuer.create_cred_def({  
+        "credential_definition": {"schemaId": schema["schema_state"]["schema_id"], "tag": "t", "issuerId": did},  
+        "options": {"support_revocation": True, "revocation_registry_size": 4}})).json()[  
+        "credential_definition_state"]["credential_definition_id"]  
+    issued = await connect_pair(issuer, holder, "Gov_Bot", "Bot_Gov", bus=bus)  
+    checked = await connect_pair(verifier, holder, "Bank_Bot", "Bot_Bank", bus=bus)  
+    attributes = CredentialAttributes(person_hash="person-hash-1", biometric_score="90.0", controller_did="did:sov:b")  
+    result = await issue_credential(issued["inviter_conn_id"], cred_def_id, attributes, issuer=issuer, holder=holder,  
+                                    bus=bus)  
+    credential = await find_credential(holder, controller_did="did:sov:b")  
+    save_credential_record(credential_record(result, issued["inviter_conn_id"], cred_def_id, credential))  
+  
+    index = RevocationIndex()  
+    assert index.load_records() == 0  
+    first = await check_personhood(checked["inviter_conn_id"], cred_def_id, verifier=verifier, bus=bus, index=index)  
+    assert first["verified"] is True and "prescreened" not in first  
+  
+    await revoke_bulk([(credential.rev_reg_id, credential.cred_rev_id)], issuer=issuer)  
+    assert [r["state"] for r in find_credential_records(rev_reg_id=credential.rev_reg_id)] == ["revoked"]  
+    assert await index.sync_revocation_list(verifier, credential.rev_reg_id) == 1  
+    calls = len(sim.calls)  
+    second = await check_personhood(checked["inviter_conn_id"], cred_def_id, verifier=verifier, bus=bus, index=index)  
+    assert second["verified"] is False and second["prescreened"] is True  
+    assert len(sim.calls) == calls  
+  
+    # Reissued: the next check runs an exchange and binds the new credential  
+    attributes = CredentialAttributes(person_hash="person-hash-1", biometric_score="91.0", controller_did="did:sov:c")  
+    result = await issue_credential(issued["inviter_conn_id"], cred_def_id, attributes, issuer=issuer, holder=holder,  
+                                    bus=bus)  
+    reissued = await find_credential(holder, controller_did="did:sov:c")  
+    assert reissued.cred_rev_id != credential.cred_rev_id  
+    save_credential_record(credential_record(result, issued["inviter_conn_id"], cred_def_id, reissued))  
+    index.load_records()  
+    third = await check_personhood(checked["inviter_conn_id"], cred_def_id, verifier=verifier, bus=bus, index=index)  
+    assert third["verified"] is True and "prescreened" not in third  
+    assert index._bindings[checked["inviter_conn_id"]][:2] == (reissued.rev_reg_id, int(reissued.cred_rev_id))  
+    await sim.aclose()
\ No newline at end of file
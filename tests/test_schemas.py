@@ -1,6 +1,6 @@
 import pytest  
 from pydantic import ValidationError  
-from src.schemas import CredentialAttributes, ProofRequest  
+from src.schemas import CredentialAttributes, ProofRequest, validate_attributes_batch  
   
 @pytest.mark.unit  
 class TestCredentialAttributes:  
@@ -37,6 +37,33 @@ class TestCredentialAttributes:
                 controller_did="did:sov:abc123"  
             )  
   
+@pytest.mark.unit  
+class TestValidateAttributesBatch:  
+    ROWS = [  
+        {"person_hash": "valid-hash-123", "biometric_score": "85.5", "controller_did": "did:sov:abc123"},  
+        {"person_hash": "valid-hash-456", "biometric_score": "150.0", "controller_did": "did:sov:abc456"},  
+        {"person_hash": "short", "biometric_score": "50", "controller_did": "did:sov:abc789"},  
+        {"person_hash": "valid-hash-789", "biometric_score": "100", "controller_did": "did:sov:abc789",  
+         "timestamp": "1700000000", "extra": "ignored"},  
+        {"person_hash": "valid-hash-000", "biometric_score": 50, "controller_did": "did:sov:abc000"},  
+    ]  
+  
+    def test_matches_per_object_validation(self):  
+        valid, errors = validate_attributes_batch(self.ROWS, chunk_size=2)  
+        assert [index for index, _ in valid] == [0, 3]  
+        assert valid[1][1] == {"person_hash": "valid-hash-789", "biometric_score": "100",  
+                               "controller_did": "did:sov:abc789", "timestamp": "1700000000"}  
+        assert valid[0][1]["timestamp"].isdigit()  
+        assert [index for index, _ in errors] == [1, 2, 4]  
+        for index, message in errors:  
+            with pytest.raises(ValidationError) as e:  
+                CredentialAttributes(**self.ROWS[index])  
+            assert message == str(e.value)  
+  
+    def test_all_valid_chunk(self):  
+        valid, errors = validate_attributes_batch([self.ROWS[0]] * 5, chunk_size=2)  
+        assert len(valid) == 5 and errors == []  
+  
 @pytest.mark.unit  
 class TestProofRequest:  
     def test_valid_proof_request(self):  
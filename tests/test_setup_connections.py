@@ -0,0 +1,80 @@
+import asyncio  
+import json  
+import pytest  
+from src.config import ISSUER_URL, HOLDER_URL  
+from src.events import EventBus  
+from src.setup_connections import connect_pair, bootstrap_connections, ConnectionNotReady  
+  
+def make_agents(mock_agent, states_after=2, final_state="active"):  
+    """Inviter and invitee whose connections reach final_state after a few polls."""  
+    polls = {}  
+  
+    def state(conn_id):  
+        polls[conn_id] = polls.get(conn_id, 0) + 1  
+        return final_state if polls[conn_id] > states_after else "request"  
+  
+    inviter = mock_agent({  
+        "POST /out-of-band/create-invitation": lambda r: {  
+            "invi_msg_id": "msg-" + json.loads(r.content)["alias"],  
+            "invitation": {"@id": "inv"}},  
+        "GET /connections": lambda r: {"results": [{  
+            "connection_id": "inviter-" + r.url.params["invitation_msg_id"],  
+            "state": state("inviter-" + r.url.params["invitation_msg_id"])}]},  
+        "GET /connections/inviter-msg-gov": lambda r: {"connection_id": "inviter-msg-gov",  
+                                                       "state": state("inviter-msg-gov")},  
+    }, url=ISSUER_URL)  
+    invitee = mock_agent({  
+        "POST /out-of-band/receive-invitation": lambda r: {"connection_id": "invitee-" + r.url.params["alias"]},  
+        "GET /connections/invitee-bot": lambda r: {"connection_id": "invitee-bot", "state": state("invitee-bot")},  
+    }, url=HOLDER_URL)  
+    return inviter, invitee  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_connect_pair_polls_until_active(mock_agent):  
+    """Both sides are awaited until active, without a fixed sleep"""  
+    inviter, invitee = make_agents(mock_agent)  
+    result = await connect_pair(inviter, invitee, "gov", "bot", poll_interval=0.001)  
+    assert result == {"alias": "gov", "inviter_conn_id": "inviter-msg-gov", "invitee_conn_id": "invitee-bot"}  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_connect_pair_abandoned_connection(mock_agent):  
+    """A closed connection fails fast instead of waiting for the timeout"""  
+    inviter, invitee = make_agents(mock_agent, states_after=0, final_state="abandoned")  
+    with pytest.raises(ConnectionNotReady, match="abandoned"):  
+        await connect_pair(inviter, invitee, "gov", "bot", timeout=5.0, poll_interval=0.001)  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_connect_pair_with_events(mock_agent):  
+    """With an event bus, readiness comes from connection events"""  
+    inviter, invitee = make_agents(mock_agent, states_after=10 ** 6)  
+    bus = EventBus()  
+  
+    async def handshake():  
+        await asyncio.sleep(0.01)  
+        bus.publish("connections", {"connection_id": "invitee-bot", "state": "active"}, agent="holder")  
+        bus.publish("connections", {"connection_id": "inviter-msg-gov", "state": "active"}, agent="issuer")  
+  
+    task = asyncio.create_task(handshake())  
+    result = await connect_pair(inviter, invitee, "gov", "bot", bus=bus, timeout=1.0, poll_interval=0.5)  
+    await task  
+    assert result["inviter_conn_id"] == "inviter-msg-gov"  
+    # one lookup per side, then events only  
+    assert len([c for c, _ in inviter.calls if c == "GET /connections"]) == 1  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_bootstrap_connections_concurrent(mock_agent):  
+    """Many pairs are connected at once and results keep input order"""  
+    inviter, invitee = make_agents(mock_agent, states_after=0)  
+    pairs = [(inviter, invitee, f"gov-{i}", "bot") for i in range(30)]  
+    pairs[5] = (inviter, invitee, "gov-5", "unknown")  
+  
+    results, summary = await bootstrap_connections(pairs, concurrency=10, timeout=0.05, poll_interval=0.001)  
+  
+    assert [item["alias"] for item in results] == [f"gov-{i}" for i in range(30)]  
+    assert results[0]["ok"] and results[0]["inviter_conn_id"] == "inviter-msg-gov-0"  
+    assert results[5]["ok"] is False  
+    assert summary["succeeded"] == 29 and summary["failed"] == 1
\ No newline at end of file
@@ -0,0 +1,89 @@
+import random  
+import pytest  
+from aiohttp.test_utils import TestClient, TestServer  
+from src.bulk_revoke import revoke_bulk  
+from src.events import EventBus  
+from src.issue_cred import issue_credential  
+from src.non_revoked import FromGenesis  
+from src.records import find_credential  
+from src.schemas import CredentialAttributes  
+from src.setup_connections import connect_pair  
+from src.simulator import AdminSimulator, ErrorInjector, LatencyModel  
+from src.verifier_proof import check_personhood  
+  
+def make_sim(**kwargs):  
+    return AdminSimulator(latency=LatencyModel(0), message_latency=LatencyModel(0), seed=7, **kwargs)  
+  
+async def setup_cred_def(issuer):  
+    did = (await issuer.get_public_did()).json()["result"]["did"]  
+    schema_id = (await issuer.create_schema({"schema": {  
+        "name": "personhood", "version": "1.0", "issuerId": did,  
+        "attrNames": ["person_hash", "biometric_score", "timestamp", "controller_did"]}}))  
+    schema_id = schema_id.json()["schema_state"]["schema_id"]  
+    resp = await issuer.create_cred_def({"credential_definition": {"schemaId": schema_id, "tag": "t", "issuerId": did},  
+                                         "options": {"support_revocation": True, "revocation_registry_size": 10}})  
+    return resp.json()["credential_definition_state"]["credential_definition_id"]  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_connect_issue_verify_revoke():  
+    bus = EventBus()  
+    sim = make_sim(bus=bus)  
+    issuer, holder, verifier = sim.client("issuer"), sim.client("holder"), sim.client("verifier")  
+    cred_def_id = await setup_cred_def(issuer)  
+    assert "already exists" in (await issuer.create_cred_def({"credential_definition": {  
+        "schemaId": cred_def_id.split(":")[0] + ":2:personhood:1.0", "tag": "t"}})).text  
+  
+    issued = await connect_pair(issuer, holder, "Gov_Bot", "Bot_Gov", bus=bus)  
+    checked = await connect_pair(verifier, holder, "Bank_Bot", "Bot_Bank", bus=bus)  
+    assert (await holder.get_connection(issued["invitee_conn_id"])).json()["alias"] == "Bot_Gov"  
+  
+    attributes = CredentialAttributes(person_hash="person-hash-1", biometric_score="90.0", controller_did="did:sov:bot1")  
+    result = await issue_credential(issued["inviter_conn_id"], cred_def_id, attributes, issuer=issuer, holder=holder,  
+                                    bus=bus)  
+    await sim.drain()  
+    assert (await issuer.get_cred_ex_record(result["issuer_cred_ex_id"])).json()["cred_ex_record"]["state"] == "done"  
+    credential = await find_credential(holder, controller_did="did:sov:bot1")  
+    assert credential.cred_def_id == cred_def_id and credential.cred_rev_id == "1"  
+  
+    policy = FromGenesis()  
+    proof = await check_personhood(checked["inviter_conn_id"], cred_def_id, verifier=verifier, bus=bus, policy=policy)  
+    assert proof["verified"] is True and proof["rev_reg_ids"] == [credential.rev_reg_id]  
+  
+    summary = await revoke_bulk([(credential.rev_reg_id, credential.cred_rev_id)], issuer=issuer)  
+    assert (summary["revoked"], summary["ledger_writes"]) == (1, 1)  
+    details = (await issuer.get_issued_details(credential.rev_reg_id)).json()  
+    assert [d["state"] for d in details] == ["revoked"]  
+    proof = await check_personhood(checked["inviter_conn_id"], cred_def_id, verifier=verifier, bus=bus, policy=policy)  
+    assert proof["verified"] is False and proof["verified_msgs"]  
+    await sim.aclose()  
+  
+@pytest.mark.unit  
+def test_latency_model():  
+    assert LatencyModel(0).sample("send_offer") == 0.0  
+    model = LatencyModel(0.02, 0.5, {"create_cred_def": (2.0, 0.0)}, rng=random.Random(1))  
+    assert model.sample("create_cred_def") == 2.0  
+    samples = sorted(model.sample("send_offer") for _ in range(1001))  
+    assert 0.015 < samples[500] < 0.025 and samples[990] > samples[500] * 2  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_error_injection_and_report():  
+    sim = make_sim(errors=ErrorInjector(rate=1.0, statuses=(503,), routes={"get_connections"}))  
+    assert (await sim.handle("issuer", "GET", "/connections"))[0] == 503  
+    assert (await sim.handle("issuer", "GET", "/wallet/did/public"))[0] == 200  
+    assert (await sim.handle("issuer", "GET", "/connections/missing"))[0] == 404  
+    assert (await sim.handle("issuer", "GET", "/unknown"))[0] == 404  
+    report = sim.report()  
+    assert report["get_connections"]["errors"] == 1 and report["get_public_did"]["errors"] == 0  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_admin_app():  
+    sim = make_sim()  
+    async with TestClient(TestServer(sim.create_app("issuer"))) as client:  
+        resp = await client.get("/wallet/did/public")  
+        assert resp.status == 200  
+        assert (await resp.json())["result"]["did"] == sim.agents["issuer"].public_did  
+        resp = await client.post("/issue-credential-2.0/send-offer", json={"connection_id": "nope"})  
+        assert resp.status == 400
\ No newline at end of file
@@ -0,0 +1,120 @@
+import json  
+import threading  
+import pytest  
+import src.utils  
+from src.state_store import JsonFileStore, SqliteStore, namespace_for  
+from src.utils import load_state, save_states, state_transaction, save_credential_record, find_credential_records  
+  
+@pytest.fixture(params=["json", "sqlite"])  
+def store(request, tmp_path):  
+    if request.param == "json":  
+        yield JsonFileStore(str(tmp_path / "state.json"))  
+    else:  
+        s = SqliteStore(str(tmp_path / "state.db"))  
+        yield s  
+        s.close()  
+  
+@pytest.mark.unit  
+def test_update_and_load(store):  
+    """Multi-key updates are visible through load() and get()."""  
+    store.update({"a": 1, "b": {"nested": [1, 2]}})  
+    assert store.load() == {"a": 1, "b": {"nested": [1, 2]}}  
+    assert store.get("b") == {"nested": [1, 2]}  
+    assert store.get("missing", "x") == "x"  
+  
+@pytest.mark.unit  
+def test_transaction_rolls_back_on_error(store):  
+    """Nothing from a failed transaction is written."""  
+    store.update({"a": 1})  
+    with pytest.raises(RuntimeError):  
+        with store.transaction() as txn:  
+            txn.set("a", 2)  
+            txn.set("b", 3)  
+            raise RuntimeError("boom")  
+    assert store.load() == {"a": 1}  
+  
+@pytest.mark.unit  
+def test_concurrent_transactions_do_not_lose_updates(store):  
+    """Read-modify-write from many threads is serialized."""  
+    def bump():  
+        for _ in range(20):  
+            with store.transaction() as txn:  
+                txn.set("counter", txn.get("counter", 0) + 1)  
+  
+    threads = [threading.Thread(target=bump) for _ in range(8)]  
+    for t in threads:  
+        t.start()  
+    for t in threads:  
+        t.join()  
+    assert store.get("counter") == 160  
+  
+@pytest.mark.unit  
+def test_json_store_sees_external_writes(tmp_path):  
+    """The in-process cache is revalidated against the file on disk."""  
+    path = tmp_path / "state.json"  
+    store = JsonFileStore(str(path))  
+    store.update({"a": 1})  
+    path.write_text(json.dumps({"a": 1, "written_elsewhere": True, "pad": "x" * 10}))  
+    assert store.load()["written_elsewhere"] is True  
+  
+@pytest.mark.unit  
+def test_sqlite_store_sees_other_connections(tmp_path):  
+    """A second store on the same database invalidates the first one's cache."""  
+    first = SqliteStore(str(tmp_path / "state.db"))  
+    second = SqliteStore(str(tmp_path / "state.db"))  
+    first.update({"a": 1})  
+    assert first.load() == {"a": 1}  
+    second.update({"a": 2})  
+    assert first.load() == {"a": 2}  
+    first.close()  
+    second.close()  
+  
+@pytest.mark.unit  
+def test_utils_sqlite_backend(tmp_path, monkeypatch):  
+    """utils delegates to the configured backend."""  
+    monkeypatch.setattr(src.utils, "STATE_BACKEND", "sqlite")  
+    monkeypatch.setattr(src.utils, "STATE_DB", str(tmp_path / "state.db"))  
+    save_states({"schema_id": "s1", "cred_def_id": "c1"})  
+    with state_transaction() as txn:  
+        txn.delete("schema_id")  
+    assert load_state() == {"cred_def_id": "c1"}  
+  
+@pytest.mark.unit  
+def test_namespaces_are_isolated(store):  
+    """Each tenant/environment/cred def has its own keys; the default namespace is untouched."""  
+    acme = namespace_for("acme", "prod", "cd:1")  
+    assert acme == "acme/prod/cd:1"  
+    store.update({"cred_def_id": "global"})  
+    store.update({"cred_def_id": "cd:1"}, namespace=acme)  
+    store.update({"cred_def_id": "cd:2"}, namespace=namespace_for("acme", "test"))  
+    assert store.load() == {"cred_def_id": "global"}  
+    assert store.load(acme) == {"cred_def_id": "cd:1"}  
+    assert store.get("cred_def_id", namespace="acme/test") == "cd:2"  
+    assert store.namespaces() == ["acme/prod/cd:1", "acme/test"]  
+  
+@pytest.mark.unit  
+def test_credential_records_indexed_lookup(store):  
+    """Records merge on cred_ex_id and are found by indexed fields within their namespace."""  
+    store.put_credential({"cred_ex_id": "ex-1", "thread_id": "th-1", "connection_id": "c1",  
+                          "rev_reg_id": "rr-1", "cred_rev_id": "1", "state": "issued"}, "t1")  
+    store.put_credential({"cred_ex_id": "ex-2", "thread_id": "th-2", "connection_id": "c1",  
+                          "rev_reg_id": "rr-1", "cred_rev_id": "2", "state": "issued"}, "t1")  
+    store.put_credential({"cred_ex_id": "ex-1", "state": "revoked"}, "t1")  
+    store.put_credential({"cred_ex_id": "ex-9", "connection_id": "c1"}, "t2")  
+  
+    assert store.get_credential("ex-1", "t1")["thread_id"] == "th-1"  
+    assert [r["cred_ex_id"] for r in store.find_credentials("t1", rev_reg_id="rr-1", cred_rev_id=1)] == ["ex-1"]  
+    assert store.find_credentials("t1", thread_id="th-1")[0]["state"] == "revoked"  
+    assert sorted(r["cred_ex_id"] for r in store.find_credentials("t1", connection_id="c1")) == ["ex-1", "ex-2"]  
+    assert store.find_credentials("t1", thread_id="unknown") == []  
+    assert store.load("t1") == {}  
+    with pytest.raises(ValueError):  
+        store.find_credentials("t1", referent="x")  
+  
+@pytest.mark.unit  
+def test_utils_credential_records(mock_state_file):  
+    """Credential records share the state file without leaking into load_state()."""  
+    save_states({"cred_def_id": "cd:1"})  
+    save_credential_record({"cred_ex_id": "ex-1", "rev_reg_id": "rr-1", "cred_rev_id": "7"})  
+    assert load_state() == {"cred_def_id": "cd:1"}  
+    assert find_credential_records(rev_reg_id="rr-1", cred_rev_id="7")[0]["cred_ex_id"] == "ex-1"
\ No newline at end of file
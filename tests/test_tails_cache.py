@@ -0,0 +1,157 @@
+import asyncio  
+import hashlib  
+import httpx  
+import pytest  
+from aiohttp.test_utils import TestClient, TestServer  
+from src.schemas import CredentialCatalog  
+from src.tails_cache import (TailsCache, TailsHashMismatch, b58encode, create_tails_app, prefetch_catalog,  
+                             registry_tails_hash, tails_upload_parts)  
+from src.utils import save_states  
+  
+REV_REG_ID = "GovDid:4:GovDid:3:CL:1:gov_revocable_v1:CL_ACCUM:1"  
+TAILS = b"\x00tails-points" * 1000  
+TAILS_HASH = b58encode(hashlib.sha256(TAILS).digest())  
+  
+def make_cache(tmp_path, files=None, requests=None, fail=False, resolve_hash=None, put_status=200):  
+    """TailsCache whose upstream tails server serves `files` ({rev_reg_id: bytes})."""  
+    async def handler(request):  
+        if requests is not None:  
+            requests.append(request)  
+        await asyncio.sleep(0.01)  
+        if fail:  
+            return httpx.Response(503)  
+        rev_reg_id = request.url.path.lstrip("/")  
+        if request.method == "PUT":  
+            return httpx.Response(put_status, content=TAILS_HASH.encode())  
+        if rev_reg_id not in (files or {}):  
+            return httpx.Response(404)  
+        return httpx.Response(200, content=files[rev_reg_id])  
+  
+    cache = TailsCache(str(tmp_path), upstream="http://tails:6543", resolve_hash=resolve_hash)  
+    cache._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))  
+    return cache  
+  
+@pytest.mark.unit  
+def test_ingest_verifies_hash_and_dedupes_content(tmp_path):  
+    cache = TailsCache(str(tmp_path))  
+    digest = cache.ingest(REV_REG_ID, TAILS, TAILS_HASH)  
+    assert digest == hashlib.sha256(TAILS).hexdigest()  
+    assert cache.ingest("other-registry", TAILS, digest) == digest  
+    assert cache.stats()["files"] == 1 and cache.stats()["registries"] == 2  
+    with pytest.raises(TailsHashMismatch):  
+        cache.ingest("bad", b"tampered", TAILS_HASH)  
+    assert "bad" not in cache  
+  
+@pytest.mark.unit  
+def test_reads_are_memory_mapped_and_survive_restart(tmp_path):  
+    TailsCache(str(tmp_path)).ingest(REV_REG_ID, TAILS)  
+    cache = TailsCache(str(tmp_path))  
+    view = cache.get(REV_REG_ID)  
+    assert isinstance(view, memoryview) and view.readonly  
+    assert view.tobytes() == TAILS  
+    assert cache.get(REV_REG_ID) is view  
+    assert cache.get("unknown") is None  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_concurrent_misses_download_once(tmp_path):  
+    requests = []  
+    cache = make_cache(tmp_path, {REV_REG_ID: TAILS}, requests)  
+    views = await asyncio.gather(*(cache.fetch(REV_REG_ID, TAILS_HASH) for _ in range(10)))  
+    assert all(view.tobytes() == TAILS for view in views)  
+    assert len(requests) == 1  
+    await cache.fetch(REV_REG_ID)  
+    assert cache.stats()["downloads"] == 1 and cache.stats()["hits"] == 1  
+    await cache.aclose()  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_cached_tails_served_while_upstream_down(tmp_path):  
+    TailsCache(str(tmp_path)).ingest(REV_REG_ID, TAILS)  
+    requests = []  
+    cache = make_cache(tmp_path, requests=requests, fail=True)  
+    async with TestClient(TestServer(create_tails_app(cache))) as client:  
+        resp = await client.get(f"/{REV_REG_ID}")  
+        assert resp.status == 200  
+        assert await resp.read() == TAILS  
+        resp = await client.get("/unknown-registry")  
+        assert resp.status == 502  
+    assert all(request.url.path == "/unknown-registry" for request in requests)  
+    await cache.aclose()  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_proxy_misses_are_checked_against_the_registry_hash(tmp_path, mock_agent):  
+    """The proxy resolves the tails hash of a registry before ingesting its download"""  
+    issuer = mock_agent({  
+        f"GET /anoncreds/revocation/registry/{REV_REG_ID}": {"result": {"tails_hash": TAILS_HASH}},  
+        "GET /anoncreds/revocation/registry/tampered": {"result": {"tails_hash": TAILS_HASH}},  
+    })  
+    cache = make_cache(tmp_path, {REV_REG_ID: TAILS, "tampered": b"tampered", "unpublished": TAILS},  
+                       resolve_hash=lambda rev_reg_id: registry_tails_hash(rev_reg_id, issuer))  
+    async with TestClient(TestServer(create_tails_app(cache))) as client:  
+        resp = await client.get(f"/{REV_REG_ID}")  
+        assert resp.status == 200  
+        assert await resp.read() == TAILS  
+        for rev_reg_id in ("tampered", "unpublished"):  
+            resp = await client.get(f"/{rev_reg_id}")  
+            assert resp.status == 502  
+    assert "tampered" not in cache and "unpublished" not in cache  
+    assert cache.stats()["downloads"] == 2  
+    await cache.aclose()  
+  
+async def resolve_tails_hash(rev_reg_id):  
+    return TAILS_HASH  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_proxy_upload_ingests_and_forwards(tmp_path):  
+    requests = []  
+    cache = make_cache(tmp_path, requests=requests, resolve_hash=resolve_tails_hash)  
+    form = httpx.Request("PUT", "http://x", files={"genesis": b"genesis", "tails": TAILS})  
+    body = form.read()  
+    async with TestClient(TestServer(create_tails_app(cache))) as client:  
+        resp = await client.put(f"/{REV_REG_ID}", data=body, headers={"Content-Type": form.headers["Content-Type"]})  
+        assert resp.status == 200  
+        tampered = httpx.Request("PUT", "http://x", files={"genesis": b"genesis", "tails": b"tampered"})  
+        resp = await client.put("/tampered", data=tampered.read(),  
+                                headers={"Content-Type": tampered.headers["Content-Type"]})  
+        assert resp.status == 400  
+    assert cache.get(REV_REG_ID).tobytes() == TAILS  
+    assert "tampered" not in cache  
+    assert requests[0].method == "PUT" and requests[0].content == body  
+    await cache.aclose()  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_rejected_upload_is_not_cached(tmp_path):  
+    """An upload the tails server refuses is passed back and never served from the cache"""  
+    cache = make_cache(tmp_path, resolve_hash=resolve_tails_hash, put_status=409)  
+    async with TestClient(TestServer(create_tails_app(cache))) as client:  
+        resp = await client.put(f"/{REV_REG_ID}", data=TAILS)  
+        assert resp.status == 409  
+    assert REV_REG_ID not in cache  
+    await cache.aclose()  
+  
+@pytest.mark.unit  
+def test_upload_parts():  
+    assert tails_upload_parts(TAILS, "application/octet-stream") == (TAILS, None)  
+    form = httpx.Request("PUT", "http://x", files={"genesis": b"genesis"})  
+    with pytest.raises(ValueError):  
+        tails_upload_parts(form.read(), form.headers["Content-Type"])  
+  
+@pytest.mark.unit  
+@pytest.mark.asyncio  
+async def test_prefetch_catalog(tmp_path, mock_agent, mock_state_file):  
+    catalog = CredentialCatalog(schemas=[{"name": "gov_id", "version": "1.0", "attributes": ["name"],  
+                                          "cred_defs": [{"tag": "revocable"}]}])  
+    save_states({"cred_def:gov_id:1.0:revocable": "GovDid:3:CL:1:revocable"}, namespace="issuer")  
+    issuer = mock_agent({  
+        "GET /anoncreds/revocation/registries": {"rev_reg_ids": [REV_REG_ID]},  
+        f"GET /anoncreds/revocation/registry/{REV_REG_ID}": {"result": {"tails_hash": TAILS_HASH}},  
+    })  
+    cache = make_cache(tmp_path, {REV_REG_ID: TAILS})  
+    assert await prefetch_catalog(cache, catalog, issuer) == {REV_REG_ID: None}  
+    assert REV_REG_ID in cache  
+    assert dict(issuer.calls[0][1].url.params) == {"cred_def_id": "GovDid:3:CL:1:revocable"}  
+    await cache.aclose()
\ No newline at end of file
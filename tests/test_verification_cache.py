@@ -0,0 +1,98 @@
+import pytest  
+from unittest.mock import patch  
+from src.events import EventBus  
+from src.revocation_index import RevocationIndex  
+from src.verification_cache import VerificationCache  
+from src.verifier_proof import check_personhood  
+  
+VALID = {"pres_ex_id": "pres-1", "verified": True, "verified_msgs": [], "rev_reg_ids": ["reg-1"]}  
+  
+class FakeClock:  
+    def __init__(self):  
+        self.now = 0.0  
+  
+    def __call__(self):  
+        return self.now  
+  
+@pytest.mark.unit  
+class TestVerificationCache:  
+    def test_hit_and_ttl_expiry(self):  
+        clock = FakeClock()  
+        cache = VerificationCache(ttl=10, clock=clock)  
+        cache.put("conn-1", "cred-def", VALID)  
+  
+        assert cache.get("conn-1", "cred-def") == VALID  
+        clock.now = 10.0  
+        assert cache.get("conn-1", "cred-def") is None  
+        assert (cache.hits, cache.misses) == (1, 1)  
+        assert len(cache) == 0  
+  
+    def test_only_verified_results_are_cached(self):  
+        cache = VerificationCache()  
+        cache.put("conn-1", "cred-def", dict(VALID, verified=False))  
+        cache.put("conn-2", "cred-def", None)  
+        assert len(cache) == 0  
+  
+    def test_lru_eviction(self):  
+        cache = VerificationCache(max_size=2)  
+        cache.put("conn-1", "cred-def", VALID)  
+        cache.put("conn-2", "cred-def", VALID)  
+        cache.get("conn-1", "cred-def")  
+        cache.put("conn-3", "cred-def", VALID)  
+  
+        assert cache.get("conn-2", "cred-def") is None  
+        assert cache.get("conn-1", "cred-def") is not None  
+        assert cache.get("conn-3", "cred-def") is not None  
+  
+    def test_ttl_needs_a_revocation_source(self):  
+        clock = FakeClock()  
+        cache = VerificationCache(ttl=300, unwatched_ttl=5, clock=clock)  
+        cache.put("conn-1", "cred-def", VALID)  
+        clock.now = 5.0  
+        assert cache.get("conn-1", "cred-def") is None  
+  
+        cache.attach(EventBus())  
+        cache.put("conn-1", "cred-def", VALID)  
+        clock.now = 300.0  
+        assert cache.get("conn-1", "cred-def") == VALID  
+        assert VerificationCache(ttl=300, watched=True).effective_ttl() == 300  
+  
+    def test_index_drops_revoked_connections(self):  
+        index = RevocationIndex()  
+        cache = VerificationCache()  
+        cache.attach_index(index)  
+        assert cache.effective_ttl() == cache.ttl  
+        cache.put("conn-1", "cred-def", VALID)  
+        index.bind("conn-1", "reg-1", 3)  
+        assert cache.get("conn-1", "cred-def") == VALID  
+        index.mark_revoked("reg-1", 3)  
+        assert cache.get("conn-1", "cred-def") is None  
+        assert len(cache) == 0  
+  
+    def test_revocation_event_drops_registry(self):  
+        bus = EventBus()  
+        cache = VerificationCache()  
+        cache.attach(bus)  
+        cache.put("conn-1", "cred-def", VALID)  
+        cache.put("conn-2", "cred-def", dict(VALID, rev_reg_ids=["reg-2"]))  
+  
+        bus.publish("issuer_cred_rev", {"rev_reg_id": "reg-1", "cred_rev_id": "1", "state": "issued"}, agent="issuer")  
+        assert len(cache) == 2  
+        bus.publish("issuer_cred_rev", {"rev_reg_id": "reg-1", "cred_rev_id": "1", "state": "revoked"}, agent="issuer")  
+        assert cache.get("conn-1", "cred-def") is None  
+        bus.publish("revocation-notification", {"thread_id": "anoncreds::reg-2::4"}, agent="holder")  
+        assert len(cache) == 0  
+  
+@pytest.mark.verification  
+@pytest.mark.asyncio  
+async def test_check_personhood_uses_cache():  
+    """Test a repeated check is answered from the cache"""  
+    cache = VerificationCache()  
+  
+    with patch('src.verifier_proof.request_and_verify_proof', return_value=VALID) as mock_verify:  
+        first = await check_personhood("conn-1", "cred-def", cache=cache)  
+        second = await check_personhood("conn-1", "cred-def", cache=cache)  
+  
+    assert first == VALID  
+    assert second == dict(VALID, cached=True)  
+    assert mock_verify.call_count == 1
\ No newline at end of file
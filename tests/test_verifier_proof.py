@@ -1,7 +1,8 @@
 import pytest  
 import requests  
-from unittest.mock import patch, Mock  
-from src.verifier_proof import send_proof_request  
+from unittest.mock import patch, Mock, AsyncMock  
+from src.verifier_proof import send_proof_request, request_and_verify_proof  
+from src.events import EventBus  
   
 @pytest.mark.verification  
 def test_send_proof_request():  
@@ -11,7 +12,7 @@ def test_send_proof_request():
         mock_conn.return_value = "test-connection-id"  
   
         # Test successful request  
-        with patch('requests.post') as mock_post:  
+        with patch('requests.Session.post') as mock_post:  
             mock_post.return_value.status_code = 200  
             mock_post.return_value.json.return_value = {"pres_ex_id": "test-id"}  
   
@@ -21,7 +22,7 @@ def test_send_proof_request():
 @pytest.mark.error  
 def test_send_proof_request_api_error():  
     """Test API error"""  
-    with patch('requests.post') as mock_post:  
+    with patch('requests.Session.post') as mock_post:  
         mock_post.return_value.status_code = 500  
         mock_post.return_value.text = "Internal Server Error"  
   
@@ -35,4 +36,62 @@ def test_send_proof_request_connection_not_found():
         mock_conn.return_value = None  
   
         result = send_proof_request(None, "test-cred-def-id")  
-        assert result is None
\ No newline at end of file
+        assert result is None  
+  
+@pytest.mark.verification  
+@pytest.mark.asyncio  
+async def test_request_and_verify_proof(mock_agent):  
+    """Test the async request -> presentation-received -> verify flow"""  
+    states = iter(["request-sent", "presentation-received"])  
+    verifier = mock_agent({  
+        "POST /present-proof-2.0/send-request": {"pres_ex_id": "pres-1"},  
+        "GET /present-proof-2.0/records/pres-1": lambda request: {"state": next(states)},  
+        "POST /present-proof-2.0/records/pres-1/verify-presentation": {  
+            "verified": "true", "verified_msgs": [],  
+            "by_format": {"pres": {"anoncreds": {"identifiers": [{"cred_def_id": "test-cred-def-id", "rev_reg_id": "reg-1"}]}}}  
+        },  
+    })  
+  
+    with patch('asyncio.sleep', new=AsyncMock()):  
+        result = await request_and_verify_proof("test-connection-id", "test-cred-def-id", verifier=verifier)  
+  
+    assert result == {"pres_ex_id": "pres-1", "verified": True, "verified_msgs": [], "rev_reg_ids": ["reg-1"]}  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_request_and_verify_proof_timeout(mock_agent):  
+    """Test that no presentation within the attempts returns None"""  
+    verifier = mock_agent({  
+        "POST /present-proof-2.0/send-request": {"pres_ex_id": "pres-1"},  
+        "GET /present-proof-2.0/records/pres-1": {"state": "request-sent"},  
+    })  
+  
+    with patch('asyncio.sleep', new=AsyncMock()):  
+        result = await request_and_verify_proof("test-connection-id", "test-cred-def-id",  
+                                                verifier=verifier, attempts=3)  
+  
+    assert result is None  
+    assert len(verifier.calls) == 4  
+  
+@pytest.mark.verification  
+@pytest.mark.asyncio  
+async def test_request_and_verify_proof_webhook(mock_agent):  
+    """Test that with an event bus the record is not polled"""  
+    bus = EventBus()  
+  
+    def send_request(request):  
+        bus.publish("present_proof_v2_0", {"pres_ex_id": "pres-1", "state": "presentation-received"})  
+        return {"pres_ex_id": "pres-1"}  
+  
+    verifier = mock_agent({  
+        "POST /present-proof-2.0/send-request": send_request,  
+        "POST /present-proof-2.0/records/pres-1/verify-presentation": {"verified": "false", "verified_msgs": ["revoked"]},  
+    })  
+  
+    result = await request_and_verify_proof("test-connection-id", "test-cred-def-id", verifier=verifier, bus=bus)  
+  
+    assert result == {"pres_ex_id": "pres-1", "verified": False, "verified_msgs": ["revoked"], "rev_reg_ids": []}  
+    assert [key for key, _ in verifier.calls] == [  
+        "POST /present-proof-2.0/send-request",  
+        "POST /present-proof-2.0/records/pres-1/verify-presentation",  
+    ]
\ No newline at end of file
@@ -0,0 +1,86 @@
+import asyncio  
+import pytest  
+from unittest.mock import patch  
+from src.verify_pipeline import VerificationPipeline  
+  
+@pytest.mark.verification  
+@pytest.mark.asyncio  
+async def test_pipeline_bounds_in_flight_and_streams_results():  
+    """Test the in-flight cap, gauges and per-connection results"""  
+    pipeline = VerificationPipeline("test-cred-def", concurrency=3, queue_size=2, verifier=object())  
+    peak, depths = 0, []  
+  
+    async def fake_verify(conn_id, cred_def_id, **kwargs):  
+        nonlocal peak  
+        peak = max(peak, pipeline.in_flight)  
+        depths.append(pipeline.queue_depth)  
+        await asyncio.sleep(0.001)  
+        if conn_id == "conn-5":  
+            return None  
+        return {"pres_ex_id": f"pres-{conn_id}", "verified": conn_id != "conn-2", "verified_msgs": []}  
+  
+    with patch('src.verify_pipeline.check_personhood', side_effect=fake_verify):  
+        results = [result async for result in pipeline.results(f"conn-{i}" for i in range(10))]  
+  
+    assert peak == 3  
+    assert max(depths) <= 2  
+    by_conn = {result["conn_id"]: result for result in results}  
+    assert len(by_conn) == 10  
+    assert by_conn["conn-0"]["verified"] is True  
+    assert by_conn["conn-2"]["verified"] is False and by_conn["conn-2"]["error"] is None  
+    assert by_conn["conn-5"]["error"] == "no presentation received"  
+    assert pipeline.gauges() == {"queue_depth": 0, "in_flight": 0, "completed": 9, "failed": 1}  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_pipeline_accepts_async_source_and_records_errors():  
+    """Test async iterables as input and exceptions turned into results"""  
+    async def source():  
+        for conn_id in ["conn-a", "conn-b"]:  
+            yield conn_id  
+  
+    async def fake_verify(conn_id, cred_def_id, **kwargs):  
+        raise ConnectionError("verifier unreachable")  
+  
+    pipeline = VerificationPipeline("test-cred-def", concurrency=2, verifier=object())  
+    with patch('src.verify_pipeline.check_personhood', side_effect=fake_verify):  
+        results = [result async for result in pipeline.results(source())]  
+  
+    assert sorted(result["conn_id"] for result in results) == ["conn-a", "conn-b"]  
+    assert all(result["error"] == "verifier unreachable" for result in results)  
+    assert pipeline.failed == 2  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_pipeline_reraises_source_errors():  
+    """Test a failing source: queued connections finish, then its error is raised"""  
+    async def source():  
+        yield "conn-a"  
+        yield "conn-b"  
+        raise RuntimeError("source broken")  
+  
+    async def fake_verify(conn_id, cred_def_id, **kwargs):  
+        return {"pres_ex_id": f"pres-{conn_id}", "verified": True, "verified_msgs": []}  
+  
+    seen = []  
+  
+    async def consume():  
+        async for result in pipeline.results(source()):  
+            seen.append(result["conn_id"])  
+  
+    pipeline = VerificationPipeline("test-cred-def", concurrency=3, verifier=object())  
+    with patch('src.verify_pipeline.check_personhood', side_effect=fake_verify):  
+        with pytest.raises(RuntimeError, match="source broken"):  
+            await asyncio.wait_for(consume(), timeout=5)  
+    assert sorted(seen) == ["conn-a", "conn-b"]  
+  
+@pytest.mark.error  
+@pytest.mark.asyncio  
+async def test_pipeline_reports_admin_errors(mock_agent):  
+    """A proof request the agent refuses is reported with its status, not as a missing presentation"""  
+    verifier = mock_agent({"POST /present-proof-2.0/send-request": (400, {"error": "Connection not ready"})})  
+    pipeline = VerificationPipeline("test-cred-def", concurrency=1, verifier=verifier)  
+    results = [result async for result in pipeline.results(["conn-a"])]  
+  
+    assert "Status: 400" in results[0]["error"] and "Connection not ready" in results[0]["error"]  
+    assert pipeline.gauges()["failed"] == 1
\ No newline at end of file